@@ -24,19 +24,23 @@ data class FeatureProviderRoutingConfig(val remote: String)
 
 fun Route.featureProviderRouting(httpClient: HttpClient, config: FeatureProviderRoutingConfig, utilityDatabase: UtilityDatabase) {
 
-    suspend fun getJobDescription(jobDescription: String): Response {
+    // profileId lets FeaturesProvider pre-warm the review and gap analysis of the extracted job;
+    // nextFeature ("review" or "gaps") is the one requested right after, which is not pre-warmed
+    suspend fun getJobDescription(jobDescription: String, profileId: Int? = null, nextFeature: String? = null): Response {
         val response = httpClient.post("${config.remote}/api/extract-job-description") {
             contentType(ContentType.Application.Json)
             setBody(buildJsonObject {
                 put("jobDescription", jobDescription)
             }.toString())
+            parameter("profile_id", profileId)
+            parameter("next_feature", nextFeature)
         }
         return Response(response.status, response.bodyAsText())
     }
 
-    suspend fun extractJobDescription(call: RoutingCall): Response {
+    suspend fun extractJobDescription(call: RoutingCall, profileId: Int? = null, nextFeature: String? = null): Response {
         val jobDescription = call.receive<WithJobDescription>().jobDescription
-        return getJobDescription(jobDescription)
+        return getJobDescription(jobDescription, profileId, nextFeature)
     }
     
     fun Route.baseFeatureProviderRouting(userIdSupplier: suspend RoutingContext.() -> Int) {
@@ -205,14 +209,14 @@ fun Route.featureProviderRouting(httpClient: HttpClient, config: FeatureProvider
         }
 
         post("/match-position") {
-            val extractorResponse = extractJobDescription(call)
+            val profileId = userIdSupplier()
+
+            val extractorResponse = extractJobDescription(call, profileId, "review")
             if (extractorResponse.status != HttpStatusCode.OK) {
                 call.respond(extractorResponse.status, extractorResponse.body)
                 return@post
             }
 
-            val profileId = userIdSupplier()
-
             val response = httpClient.post("${config.remote}/api/match-position") {
                 contentType(ContentType.Application.Json)
                 setBody(
@@ -254,7 +258,7 @@ fun Route.featureProviderRouting(httpClient: HttpClient, config: FeatureProvider
         post("/analyze-gaps") {
             val profileId = userIdSupplier()
 
-            val extractorResponse = extractJobDescription(call)
+            val extractorResponse = extractJobDescription(call, profileId, "gaps")
             if (extractorResponse.status != HttpStatusCode.OK) {
                 call.respond(extractorResponse.status, extractorResponse.body)
                 return@post
@@ -0,0 +1,86 @@
+"""
+Benchmark: cost of recording metrics per request.
+
+Calls a trivial FastAPI route directly through ASGI (no network, no test client), once on an
+app without and once on an app with `MetricsMiddleware`, and times the recording primitives.
+
+Run from the FeaturesProvider directory:
+    python -m benchmarks.bench_metrics [requests]
+"""
+import asyncio
+import sys
+import time
+
+from fastapi import FastAPI
+
+from features import metrics
+
+
+def make_app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+    if with_metrics:
+        app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/api/profile/{profile_id}")
+    def get_profile(profile_id: int) -> dict[str, int]:
+        return {"id": profile_id}
+
+    return app
+
+
+async def call(app: FastAPI, requests: int) -> float:
+    """Seconds per request"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/profile/1",
+        "raw_path": b"/api/profile/1",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "server": ("test", 80),
+        "client": ("test", 1),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+def measure(requests: int) -> tuple[float, float]:
+    """(seconds per request without metrics, seconds per request with metrics), best of three"""
+    plain, instrumented = make_app(False), make_app(True)
+    results = {False: [], True: []}
+    for _ in range(3):
+        for with_metrics, app in ((False, plain), (True, instrumented)):
+            results[with_metrics].append(asyncio.run(call(app, requests)))
+    return min(results[False]), min(results[True])
+
+
+def main(requests: int = 20_000) -> None:
+    plain, instrumented = measure(requests)
+    print(f"without metrics  {plain * 1e6:8.1f} µs/request")
+    print(f"with metrics     {instrumented * 1e6:8.1f} µs/request  (+{(instrumented - plain) * 1e6:.1f} µs)")
+
+    histogram = metrics.Histogram("bench_seconds", "Benchmark", ("feature",))
+    started = time.perf_counter()
+    for i in range(requests):
+        histogram.observe(i / requests, "review")
+    print(f"histogram observe {(time.perf_counter() - started) / requests * 1e9:7.0f} ns")
+    started = time.perf_counter()
+    metrics.render()
+    print(f"render /metrics   {(time.perf_counter() - started) * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,131 @@
+"""
+Benchmark: single-scan `anonymize_text` vs. the former one-`re.sub`-per-pattern implementation.
+
+The input is a stack of synthetic CVs (contact block, experience bullet points, signature)
+cut to 1KB, 10KB, 100KB and 1MB. Both implementations must produce the same output.
+
+A second table masks a growing set of names (recruiter-side flows) in 100KB of text;
+from NAME_AUTOMATON_MIN names on they are matched by a single trie-shaped pattern.
+
+Run from the FeaturesProvider directory:
+    python -m benchmarks.bench_pii [max_size]
+"""
+import random
+import re
+import sys
+import timeit
+
+from features.pii import anonymize_text
+
+_WORDS = (
+    "designed built maintained migrated the a our service services platform data pipeline team customers "
+    "latency throughput reliability python go kubernetes postgres kafka api apis internal external with for "
+    "and of to in on by across reduced improved led mentored engineers quarter release releases tooling"
+).split()
+
+_FIRST_NAMES = ["Jane", "Omar", "Li", "Eva", "Tom", "Anna", "Ivan", "Sara"]
+_LAST_NAMES = ["Smith", "Khan", "Ng", "Brown", "Berg", "Novak", "Silva", "Rossi"]
+
+_LEGACY_EMAIL_RE = re.compile(r"[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}", re.IGNORECASE)
+_LEGACY_PHONE_RE = re.compile(r"(?:\+\d{1,3}[\s-]?)?(?:\(?\d{2,4}\)?[\s-]?)\d{3,4}[\s-]?\d{3,4}")
+_LEGACY_URL_RE = re.compile(r"(?:https?://)?(?:www\.)?[A-Z0-9.-]+\.[A-Z]{2,}(?:/[\w./%#?&=+-]*)?", re.IGNORECASE)
+_LEGACY_ADDRESS_RE = re.compile(
+    r"\b\d{1,5}[\s,.-]+(?:[A-Z][a-z]+\s?){1,4}"
+    r"(?:St|Street|Rd|Road|Ave|Avenue|Blvd|Boulevard|Ln|Lane|Dr|Drive|Ct|Court|Pl|Place)\b(?:[^\n]*)?",
+    re.IGNORECASE,
+)
+_LEGACY_LABEL_RES = [
+    (re.compile(rf"(?i)\b{label}\s*:\s*.+"), f"{name}: [REDACTED]")
+    for label, name in [
+        (r"(Full\s*Name|Name)", "Name"),
+        ("Email", "Email"),
+        ("Phone", "Phone"),
+        ("Location", "Location"),
+        ("Address", "Address"),
+        ("LinkedIn", "LinkedIn"),
+        ("GitHub", "GitHub"),
+        ("Website", "Website"),
+    ]
+]
+
+
+def legacy_anonymize_text(text: str, names_to_mask: list[str]) -> str:
+    """The former implementation: every pattern rescans (and rebuilds) the whole text"""
+    text = _LEGACY_EMAIL_RE.sub(lambda m: "[REDACTED_EMAIL]", text)
+    text = _LEGACY_PHONE_RE.sub(lambda m: "[REDACTED_PHONE]", text)
+    text = _LEGACY_URL_RE.sub(lambda m: "[REDACTED_URL]", text)
+    text = _LEGACY_ADDRESS_RE.sub(lambda m: "[REDACTED_ADDRESS]", text)
+    for pattern, replacement in _LEGACY_LABEL_RES:
+        text = pattern.sub(replacement, text)
+    for name in names_to_mask:
+        first, last = name.split(" ")
+        text = re.compile(rf"\b{re.escape(name)}\b", re.IGNORECASE).sub("[REDACTED_NAME]", text)
+        text = re.compile(rf"\b{re.escape(first[0])}\.\s+{re.escape(last)}\b", re.IGNORECASE).sub(
+            "[REDACTED_NAME]", text
+        )
+    return text
+
+
+def make_cv(rng: random.Random, name: str) -> str:
+    first, last = name.split(" ")
+    lines = [
+        name,
+        f"Email: {first.lower()}.{last.lower()}@example.com | Phone: +1 555-{rng.randrange(100, 999)}-{rng.randrange(1000, 9999)}",
+        f"LinkedIn: https://linkedin.com/in/{first.lower()}-{last.lower()}",
+        f"{rng.randrange(1, 999)} Main Street, Springfield",
+        "",
+        "Experience",
+    ]
+    for _ in range(6):
+        lines.append(f"Senior Engineer, Company {rng.randrange(100)} ({rng.randrange(2010, 2020)} - {rng.randrange(2020, 2025)})")
+        for _ in range(4):
+            lines.append("- " + " ".join(rng.choice(_WORDS) for _ in range(rng.randrange(8, 20))).capitalize() + ".")
+    lines.append(f"References available on request. {first[0]}. {last}")
+    return "\n".join(lines)
+
+
+def make_text(size: int, name: str, seed: int = 1) -> str:
+    rng = random.Random(seed)
+    cvs: list[str] = []
+    length = 0
+    while length < size:
+        cvs.append(make_cv(rng, name))
+        length += len(cvs[-1]) + 2
+    return "\n\n".join(cvs)[:size]
+
+
+def bench_names(size: int = 100_000, counts: tuple[int, ...] = (1, 10, 100, 1000)) -> None:
+    rng = random.Random(2)
+    all_names = sorted({f"{rng.choice(_FIRST_NAMES)}{i} {rng.choice(_LAST_NAMES)}" for i in range(max(counts))})
+    text = make_text(size, all_names[0])
+    print(f"\n{'names':>9} {'legacy':>12} {'single scan':>12}   ({size // 1000}KB)")
+    for count in counts:
+        names = all_names[:count]
+        single = min(timeit.repeat(lambda: anonymize_text(text, names_to_mask=names), number=1, repeat=3))
+        if count <= 100:
+            legacy = min(timeit.repeat(lambda: legacy_anonymize_text(text, names), number=1, repeat=1))
+            legacy_ms = f"{legacy * 1e3:>9.2f} ms"
+        else:
+            legacy_ms = f"{'-':>12}"
+        print(f"{count:>9} {legacy_ms} {single * 1e3:>9.2f} ms")
+
+
+def main(max_size: int = 1_000_000) -> None:
+    names = ["Jane Smith"]
+    print(f"{'size':>9} {'legacy':>12} {'single scan':>12} {'speedup':>8}")
+    size = 1_000
+    while size <= max_size:
+        text = make_text(size, names[0])
+        assert anonymize_text(text, names_to_mask=names) == legacy_anonymize_text(text, names)
+
+        number = max(1, 100_000 // size)
+        legacy = min(timeit.repeat(lambda: legacy_anonymize_text(text, names), number=number, repeat=3)) / number
+        single = min(timeit.repeat(lambda: anonymize_text(text, names_to_mask=names), number=number, repeat=3)) / number
+        print(f"{size:>9} {legacy * 1e3:>9.2f} ms {single * 1e3:>9.2f} ms {legacy / single:>7.2f}x")
+        size *= 10
+
+    bench_names()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,101 @@
+"""
+Benchmark: `anonymize_text` on inputs built to make its patterns backtrack.
+
+Long runs of digits, separators and letters (pasted job boards, tables, base64 blobs) used to make
+the address, URL and email patterns re-read the rest of a run at every position, so one such line
+could take seconds. Every input here must be anonymized within BUDGET_PER_MB seconds per MB, both
+as a whole and streamed in STREAM_CHUNK-character chunks (`anonymize_stream`, where text without a
+safe place to cut used to be re-scanned on every chunk); tests/test_pii.py runs the same inputs at
+a smaller size.
+
+Run from the FeaturesProvider directory:
+    python -m benchmarks.bench_pii_adversarial [size]
+"""
+import random
+import sys
+import time
+from typing import Callable
+
+from features.pii import anonymize_stream, anonymize_text
+
+# Seconds per MB of input; a synthetic CV takes about a tenth of this
+BUDGET_PER_MB = 5.0
+# Characters per chunk of the streamed runs, about one token of a streamed AI response
+STREAM_CHUNK = 4
+
+_FUZZ_ATOMS = ["1", "12", "99999", " ", "  ", "\n", "\t", ",", ".", "-", "+", "(", ")", "@", "/", ":", "a", "ab", "St", "www", "http://", "Name", "John"]
+
+
+def _repeat(unit: str) -> Callable[[int], str]:
+    return lambda size: (unit * (size // len(unit) + 1))[:size]
+
+
+def _fuzz(seed: int) -> Callable[[int], str]:
+    def make(size: int) -> str:
+        rng = random.Random(seed)
+        pieces: list[str] = []
+        length = 0
+        while length < size:
+            pieces.append(rng.choice(_FUZZ_ATOMS) * rng.choice([1, 1, 2, 50]))
+            length += len(pieces[-1])
+        return "".join(pieces)[:size]
+
+    return make
+
+
+ADVERSARIAL_INPUTS: dict[str, Callable[[int], str]] = {
+    "digits": _repeat("1"),
+    "digits and spaces": _repeat("1 "),
+    "digits and dashes": _repeat("12-"),
+    "phone prefixes": _repeat("+1 "),
+    "area codes": _repeat("(12) "),
+    "whitespace": _repeat(" \t"),
+    "street number and long word": _repeat("1 " + "a" * 200 + "\n"),
+    "street number and many words": _repeat("12 " + "Ab " * 60 + "\n"),
+    "domain without tld": _repeat("a."),
+    "dashed domain": _repeat("a-"),
+    "url path": lambda size: "http://a.io/" + "/" * (size - 12),
+    "email without domain": lambda size: "a." * ((size - 1) // 2) + "@",
+    "email without tld": lambda size: "a@" + "a." * ((size - 2) // 2),
+    "at signs": _repeat("a@b."),
+    "label lines": _repeat("Name: " + "x" * 50 + "\n"),
+    "label without colon": lambda size: "Name" + " " * (size - 4),
+    "name without last name": _repeat("John "),
+    "fuzz 1": _fuzz(1),
+    "fuzz 2": _fuzz(2),
+    "fuzz 3": _fuzz(3),
+}
+
+
+def seconds_per_mb(text: str, names: list[str] | None = None) -> float:
+    started = time.perf_counter()
+    anonymize_text(text, names_to_mask=names)
+    return (time.perf_counter() - started) / len(text) * 1e6
+
+
+def stream_seconds_per_mb(text: str, names: list[str] | None = None) -> float:
+    chunks = [text[start : start + STREAM_CHUNK] for start in range(0, len(text), STREAM_CHUNK)]
+    started = time.perf_counter()
+    for _ in anonymize_stream(chunks, names_to_mask=names):
+        pass
+    return (time.perf_counter() - started) / len(text) * 1e6
+
+
+def main(size: int = 1_000_000) -> None:
+    anonymize_text("warm up the matcher", names_to_mask=["John Doe"])
+    print(f"{'input':>30} {'s/MB':>7} {'streamed':>9}")
+    over = []
+    for name, make in ADVERSARIAL_INPUTS.items():
+        text = make(size)
+        elapsed = seconds_per_mb(text, ["John Doe"])
+        streamed = stream_seconds_per_mb(text, ["John Doe"])
+        slow = max(elapsed, streamed) > BUDGET_PER_MB
+        print(f"{name:>30} {elapsed:>7.2f} {streamed:>9.2f}{'  over budget' if slow else ''}")
+        if slow:
+            over.append(name)
+    if over:
+        sys.exit(f"over the budget of {BUDGET_PER_MB} s/MB: {', '.join(over)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,52 @@
+"""
+Benchmark: `anonymize_many` on 1 process vs. a pool of N worker processes.
+
+The input is a set of synthetic CVs (see bench_pii), each masked with its own name. The pool
+is started (and its workers warmed up) before timing, as in a long-running server or batch job.
+Speed-up is bounded by the number of CPU cores; on a single core the pool only adds overhead.
+
+Run from the FeaturesProvider directory:
+    python -m benchmarks.bench_pii_batch [documents] [max_workers]
+"""
+import os
+import random
+import sys
+import time
+
+from benchmarks.bench_pii import _FIRST_NAMES, _LAST_NAMES, make_cv
+from features.pii_batch import anonymize_many, shutdown
+
+
+def make_documents(count: int, seed: int = 3) -> tuple[list[str], list[list[str]]]:
+    rng = random.Random(seed)
+    names = [f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}" for _ in range(count)]
+    return [make_cv(rng, name) for name in names], [[name] for name in names]
+
+
+def main(documents: int = 5_000, max_workers: int = os.cpu_count() or 1) -> None:
+    texts, names = make_documents(documents)
+    megabytes = sum(map(len, texts)) / 1e6
+    print(f"{documents} documents, {megabytes:.1f} MB, {os.cpu_count()} CPU(s)")
+    print(f"{'workers':>7} {'seconds':>8} {'docs/s':>8} {'MB/s':>6} {'speedup':>8}")
+
+    expected = None
+    baseline = None
+    workers = 1
+    while workers <= max(1, max_workers):
+        anonymize_many(texts[: workers * 64], names[: workers * 64], workers=workers)  # start the pool
+        started = time.perf_counter()
+        result = anonymize_many(texts, names, workers=workers)
+        seconds = time.perf_counter() - started
+        expected = expected or result
+        assert result == expected
+        baseline = baseline or seconds
+        print(
+            f"{workers:>7} {seconds:>8.2f} {documents / seconds:>8.0f} {megabytes / seconds:>6.2f}"
+            f" {baseline / seconds:>7.2f}x"
+        )
+        workers *= 2
+    shutdown()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,55 @@
+"""
+Benchmark: near-duplicate lookups in an index of many job postings.
+
+Fills an in-memory index with random signatures plus a few real postings, then times
+lookups of near-duplicates (one changed footer) and of unrelated postings.
+
+Run from the FeaturesProvider directory:
+    python -m benchmarks.bench_posting_dedup [postings]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from features.posting_dedup import NUM_PERM, NearDuplicateIndex, signature
+
+WORDS = (
+    "python engineer team platform data cloud senior remote office salary benefits experience years product "
+    "customers build design services api kubernetes testing mentoring growth hybrid berlin london startup"
+).split()
+
+
+def make_posting(rng: random.Random, words: int = 400) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def main(postings: int = 100_000, lookups: int = 1000) -> None:
+    rng = random.Random(1)
+    index = NearDuplicateIndex(capacity=postings + lookups)
+    filler = np.random.default_rng(1).integers(0, 2**32, (postings, NUM_PERM), dtype=np.uint32)
+    started = time.perf_counter()
+    index._insert([f"{i:064x}" for i in range(postings)], filler)
+    print(f"indexed {postings} signatures in {time.perf_counter() - started:.2f}s")
+
+    originals = [make_posting(rng) for _ in range(lookups)]
+    for i, text in enumerate(originals):
+        index.add(f"{postings + i:064x}", signature(text))
+    copies = [signature(text + "\nApply at https://board.example/?utm_source=x. Follow us!") for text in originals]
+    unrelated = [signature(make_posting(rng)) for _ in range(lookups)]
+
+    for name, queries in (("near-duplicates", copies), ("unrelated", unrelated)):
+        started = time.perf_counter()
+        found = sum(index.find(query) is not None for query in queries)
+        per_lookup = (time.perf_counter() - started) / len(queries) * 1e6
+        print(f"{name:16} {per_lookup:8.1f} µs/lookup, {found}/{len(queries)} matched")
+
+    started = time.perf_counter()
+    for text in originals[:100]:
+        signature(text)
+    print(f"signature of a 400-word posting: {(time.perf_counter() - started) / 100 * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,106 @@
+"""
+Micro-benchmark: cached prompt fragments vs. the former per-call helpers.
+
+Run from the FeaturesProvider directory:
+    python -m benchmarks.bench_prompt_fragments [entries]
+"""
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+
+from database.db_interface import Education, Experience, Profile
+from features.prompt_fragments import clear_fragment_cache, format_education, format_experience, format_profile_summary
+
+
+def _legacy_format_education(educations):
+    if not educations:
+        return "No formal education provided"
+
+    edu_text = []
+    for edu in educations:
+        end_date = edu.end_date.strftime("%Y-%m") if edu.end_date is not None else "Present"
+        edu_text.append(
+            f"- {edu.institution}, {edu.degree}, {edu.start_date.strftime('%Y-%m')} to {end_date}"
+            + (f", {edu.additional_info}" if edu.additional_info is not None else "")
+        )
+
+    return "\n".join(edu_text)
+
+
+def _legacy_format_experience(experiences):
+    if not experiences:
+        return "No work experience provided"
+
+    exp_text = []
+    for exp in experiences:
+        end_date = exp.end_date if exp.end_date is not None else "Present"
+        exp_text.append(
+            f"- {exp.company}, {exp.job_title}, {exp.start_date} to {end_date}"
+            + (f"\n  {exp.description}" if exp.description is not None else "")
+        )
+
+    return "\n".join(exp_text)
+
+
+def _legacy_render(profile, educations, experiences):
+    return (
+        f"Name: {profile.first_name} {profile.last_name}\nAbout: {profile.about_me or 'Not provided'}",
+        _legacy_format_education(educations),
+        _legacy_format_experience(experiences),
+    )
+
+
+def _cached_render(profile, educations, experiences):
+    return format_profile_summary(profile), format_education(educations), format_experience(experiences)
+
+
+def make_profile(entries: int):
+    updated_at = datetime(2024, 1, 1)
+    profile = Profile(id=1, first_name="Jane", last_name="Doe", about_me="Engineer. " * 40, updated_at=updated_at)
+    educations = [
+        Education(
+            id=i,
+            profile_id=1,
+            institution=f"University {i}",
+            degree="Computer Science",
+            start_date=date(2000, 1, 1) + timedelta(days=30 * i),
+            end_date=date(2004, 1, 1) + timedelta(days=30 * i),
+            additional_info="Graduated with honors, thesis on distributed systems",
+            updated_at=updated_at,
+        )
+        for i in range(entries)
+    ]
+    experiences = [
+        Experience(
+            id=i,
+            profile_id=1,
+            job_title="Software Engineer",
+            company=f"Company {i}",
+            start_date=date(2005, 1, 1) + timedelta(days=30 * i),
+            end_date=None if i == entries - 1 else date(2006, 1, 1) + timedelta(days=30 * i),
+            description="Designed and shipped backend services in Python; mentored juniors. " * 3,
+            updated_at=updated_at,
+        )
+        for i in range(entries)
+    ]
+    return profile, educations, experiences
+
+
+def main(entries: int = 60, number: int = 2000) -> None:
+    profile, educations, experiences = make_profile(entries)
+    assert _legacy_render(profile, educations, experiences) == _cached_render(profile, educations, experiences)
+
+    legacy = timeit.timeit(lambda: _legacy_render(profile, educations, experiences), number=number)
+    clear_fragment_cache()
+    cold = timeit.timeit(
+        lambda: (clear_fragment_cache(), _cached_render(profile, educations, experiences)), number=number // 10
+    ) * 10
+    warm = timeit.timeit(lambda: _cached_render(profile, educations, experiences), number=number)
+
+    print(f"{entries} education + {entries} experience entries, {number} renders")
+    for name, seconds in [("legacy helpers", legacy), ("cached (cold)", cold), ("cached (warm)", warm)]:
+        print(f"  {name:<15} {seconds / number * 1e6:9.1f} us/render")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 60)
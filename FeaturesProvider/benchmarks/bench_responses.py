@@ -0,0 +1,133 @@
+"""
+Benchmark: response encoding with FastAPI's defaults vs. `features.responses`.
+
+Two payloads: a profile's 200 experiences (ORM objects behind `List[ExperienceResponse]`) and
+a 10 KB markdown CV (`GeneratedCV`). Each is served by a default FastAPI app (response
+model validation, `jsonable` dump, stdlib `json`) and by an app like the service's
+(`ORJSONResponse` default, `orm_response()` for the ORM rows), called directly through ASGI.
+A second table shows what gzip and brotli cost and save on the same bodies.
+
+Run from the FeaturesProvider directory:
+    python -m benchmarks.bench_responses [requests]
+"""
+import asyncio
+import sys
+import time
+from datetime import date
+from typing import List
+
+from fastapi import FastAPI
+
+from database.db_interface import Experience
+from features import responses
+from models import ExperienceResponse, GeneratedCV
+
+_PARAGRAPH = (
+    "Led the migration of the billing platform to event sourcing, cutting month-end close from "
+    "three days to four hours. Mentored five engineers and introduced contract tests between "
+    "twelve services. "
+)
+
+
+def experiences(count: int = 200) -> list[Experience]:
+    return [
+        Experience(
+            id=i,
+            profile_id=1,
+            job_title=f"Senior Software Engineer {i}",
+            company=f"Company {i % 17}",
+            start_date=date(2010 + i % 12, 1 + i % 12, 1),
+            end_date=None if i % 5 == 0 else date(2012 + i % 12, 1 + i % 12, 28),
+            description=_PARAGRAPH * 2,
+        )
+        for i in range(count)
+    ]
+
+
+def cv_text(size: int = 10_000) -> str:
+    text = "# Jane Doe\n\n## Experience\n\n"
+    while len(text) < size:
+        text += f"### Engineer at Company {len(text) % 97}\n\n- {_PARAGRAPH}\n\n"
+    return text[:size]
+
+
+def make_app(optimized: bool) -> FastAPI:
+    rows, cv = experiences(), GeneratedCV(cv_text=cv_text())
+    if not optimized:
+        app = FastAPI()
+
+        @app.get("/experiences", response_model=List[ExperienceResponse])
+        def get_experiences():
+            return rows
+
+    else:
+        app = FastAPI(default_response_class=responses.JSONResponse)
+
+        @app.get("/experiences", response_model=List[ExperienceResponse])
+        def get_experiences():
+            return responses.orm_response(List[ExperienceResponse], rows)
+
+    @app.get("/cv", response_model=GeneratedCV)
+    def get_cv():
+        return cv
+
+    return app
+
+
+async def call(app, path: str, requests: int, accept_encoding: str = "") -> tuple[float, int]:
+    """(seconds per request, body size)"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else [],
+        "server": ("test", 80),
+        "client": ("test", 1),
+    }
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        size = 0
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests, size
+
+
+def measure(requests: int) -> dict[tuple[str, str], tuple[float, int]]:
+    """(path, variant) -> (best seconds per request of three runs, body size)"""
+    apps = {"default": make_app(False), "optimized": make_app(True)}
+    apps["gzip"] = apps["br"] = responses.CompressionMiddleware(apps["optimized"], minimum_size=1000)
+    results = {}
+    for path in ("/experiences", "/cv"):
+        for variant, app in apps.items():
+            if variant == "br" and responses.brotli is None:
+                continue
+            encoding = variant if variant in ("gzip", "br") else ""
+            runs = [asyncio.run(call(app, path, requests, encoding)) for _ in range(3)]
+            results[path, variant] = min(runs)
+    return results
+
+
+def main(requests: int = 500) -> None:
+    results = measure(requests)
+    print(f"{'payload':<14}{'variant':<11}{'µs/request':>12}{'bytes':>10}")
+    for (path, variant), (seconds, size) in results.items():
+        print(f"{path:<14}{variant:<11}{seconds * 1e6:12.0f}{size:10d}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,65 @@
+"""
+Benchmark: cold start, i.e. the time to import `main` in a fresh interpreter.
+
+Runs `python -X importtime -c "import main"` and reads its report: the cumulative import
+time of `main` (everything the service loads before it can start serving), the modules that
+cost the most on their own, and which feature modules were loaded. Feature modules load on
+first use, so none but the logging, metrics and profiling ones should be in the list.
+
+Run from the FeaturesProvider directory:
+    python -m benchmarks.bench_startup [runs]
+"""
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def import_report(module: str = "main") -> tuple[dict[str, tuple[int, int]], list[str]]:
+    """(module -> (own, cumulative) import time in microseconds, all modules loaded) in a fresh interpreter
+
+    `-X importtime` leaves out modules imported through `importlib` (the lazy feature modules),
+    so the loaded modules come from `sys.modules`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys, {module}; print(*sys.modules, sep='\\n')"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(own), int(cumulative))
+    return times, result.stdout.split()
+
+
+def measure(runs: int) -> tuple[float, dict[str, tuple[int, int]], list[str]]:
+    """(best import time of `main` in seconds, import times and loaded modules of that run)"""
+    best, report = float("inf"), ({}, [])
+    for _ in range(runs):
+        times, modules = import_report()
+        if times["main"][1] < best:
+            best, report = times["main"][1], (times, modules)
+    return best / 1e6, *report
+
+
+def main(runs: int = 5) -> None:
+    started = time.perf_counter()
+    seconds, times, modules = measure(runs)
+    wall = (time.perf_counter() - started) / runs
+    print(f"import main      {seconds * 1000:7.1f} ms  (interpreter start included: {wall * 1000:.0f} ms)")
+    print("most expensive modules (own time):")
+    for name, (own, _) in sorted(times.items(), key=lambda item: -item[1][0])[:12]:
+        print(f"  {own / 1000:7.1f} ms  {name}")
+    loaded = sorted(name for name in modules if name.startswith("features."))
+    print(f"feature modules loaded: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
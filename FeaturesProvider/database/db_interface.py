@@ -1,11 +1,15 @@
 from typing import List
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, Date, ForeignKey, DateTime, func
+from sqlalchemy import create_engine, Column, Integer, String, Text, Date, ForeignKey, DateTime, func, select
+from sqlalchemy.exc import OperationalError, ProgrammingError
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
 import os
 
 Base = declarative_base()
 
+# Bump when a model changes, so that the next start (or `python -m database.db_interface`) creates the new tables
+SCHEMA_VERSION = 1
+
 
 class Profile(Base):
     __tablename__ = "profiles"
@@ -29,6 +33,7 @@ class Profile(Base):
     # Relationships
     education = relationship("Education", back_populates="profile", cascade="all, delete-orphan")
     experience = relationship("Experience", back_populates="profile", cascade="all, delete-orphan")
+    job_postings = relationship("JobPosting", back_populates="profile", cascade="all, delete-orphan")
 
 
 class Education(Base):
@@ -65,6 +70,32 @@ class Experience(Base):
     profile = relationship("Profile", back_populates="experience")
 
 
+class JobPosting(Base):
+    __tablename__ = "job_postings"
+
+    id = Column(Integer, primary_key=True)
+    profile_id = Column(Integer, ForeignKey("profiles.id", ondelete="CASCADE"), nullable=False)
+    company_name = Column(String(255), nullable=False, default="")
+    company_address = Column(String(255), nullable=False, default="")
+    company_city = Column(String(100), nullable=False, default="")
+    company_postal_code = Column(String(20), nullable=False, default="")
+    recruiter_name = Column(String(255), nullable=False, default="")
+    title = Column(String(255), nullable=False, default="")
+    description = Column(Text, nullable=False, default="")
+    created_at = Column(DateTime, nullable=False, default=func.now())
+    updated_at = Column(DateTime, nullable=False, default=func.now(), onupdate=func.now())
+
+    # Relationship
+    profile = relationship("Profile", back_populates="job_postings")
+
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+
+
 class DatabaseManager:
     def __init__(self, db_url=None, test_mode=False):
         """Initialize database connection and session maker.
@@ -88,8 +119,39 @@ class DatabaseManager:
         self.Session = sessionmaker(bind=self.engine)
 
     def create_tables(self):
-        """Create all tables in the database if they don't exist."""
+        """Create all tables in the database if they don't exist and record the schema version."""
         Base.metadata.create_all(self.engine)
+        session = self.get_session()
+        try:
+            session.merge(SchemaVersion(version=SCHEMA_VERSION))
+            session.commit()
+        finally:
+            self.close_session(session)
+
+    def schema_version(self):
+        """Get the newest schema version recorded in the database.
+
+        Returns:
+            int or None: The version, or None if the tables were never created.
+        """
+        try:
+            with self.engine.connect() as connection:
+                return connection.execute(select(func.max(SchemaVersion.version))).scalar()
+        except (OperationalError, ProgrammingError):  # no schema_version table
+            return None
+
+    def ensure_schema(self):
+        """Create the tables unless the database already has the current schema version.
+
+        One query when it does, instead of the table-by-table checks of `create_tables`.
+
+        Returns:
+            bool: True if the tables were created.
+        """
+        if self.schema_version() == SCHEMA_VERSION:
+            return False
+        self.create_tables()
+        return True
 
     def get_session(self):
         """Get a new database session.
@@ -288,6 +350,83 @@ class DatabaseManager:
         """
         return session.query(Experience).filter(Experience.profile_id == profile_id).all()
 
+    def add_job_posting(self, session, profile_id, job_posting_data):
+        """Store a parsed job posting for a profile.
+
+        Args:
+            session: SQLAlchemy session.
+            profile_id (int): ID of the profile the posting is saved for.
+            job_posting_data (dict): Dictionary with the JobDescriptionResponse fields.
+
+        Returns:
+            JobPosting: The created job posting object, or None if profile not found.
+        """
+        profile = session.query(Profile).filter(Profile.id == profile_id).first()
+        if not profile:
+            return None
+
+        job_posting_data["profile_id"] = profile_id
+        job_posting = JobPosting(**job_posting_data)
+        session.add(job_posting)
+        session.commit()
+        return job_posting
+
+    def delete_job_posting(self, session, job_posting_id):
+        """Delete a stored job posting by ID.
+
+        Args:
+            session: SQLAlchemy session.
+            job_posting_id (int): ID of the job posting to delete.
+
+        Returns:
+            True if deleted successfully, False otherwise.
+        """
+        job_posting = session.query(JobPosting).filter(JobPosting.id == job_posting_id).first()
+        if not job_posting:
+            return False
+
+        session.delete(job_posting)
+        session.commit()
+        return True
+
+    def get_job_postings(self, session, profile_id) -> List[JobPosting]:
+        """Get all stored job postings for a profile.
+
+        Args:
+            session: SQLAlchemy session.
+            profile_id (int): ID of the profile to get job postings for.
+
+        Returns:
+            list: List of JobPosting objects ordered by id.
+        """
+        return session.query(JobPosting).filter(JobPosting.profile_id == profile_id).order_by(JobPosting.id).all()
+
+    def get_job_postings_by_ids(self, session, job_posting_ids) -> List[JobPosting]:
+        """Get stored job postings by their IDs.
+
+        Args:
+            session: SQLAlchemy session.
+            job_posting_ids (list[int]): IDs of the job postings to retrieve.
+
+        Returns:
+            list: List of JobPosting objects (in no particular order).
+        """
+        if not job_posting_ids:
+            return []
+        return session.query(JobPosting).filter(JobPosting.id.in_(list(job_posting_ids))).all()
+
+    def count_job_postings(self, session, profile_id) -> int:
+        """Count stored job postings for a profile.
+
+        Args:
+            session: SQLAlchemy session.
+            profile_id (int): ID of the profile to count job postings for.
+
+        Returns:
+            int: Number of stored job postings.
+        """
+        return session.query(func.count(JobPosting.id)).filter(JobPosting.profile_id == profile_id).scalar() or 0
+
     # Additional convenience methods that don't require an explicit session
     # These methods create a session, perform the operation, and close the session
 
@@ -367,3 +506,9 @@ class DatabaseManager:
             return self.get_experiences(session, profile_id)
         finally:
             self.close_session(session)
+
+
+if __name__ == "__main__":
+    # One-shot schema setup before starting the workers: python -m database.db_interface
+    created = DatabaseManager().ensure_schema()
+    print(f"Schema version {SCHEMA_VERSION}: {'created' if created else 'up to date'}")
@@ -54,6 +54,25 @@ CREATE TABLE experience (
 -- Add index on profile_id for faster joins
 CREATE INDEX idx_experience_profile_id ON experience(profile_id);
 
+-- Job postings saved by a user (parsed job descriptions, many per profile)
+CREATE TABLE job_postings (
+    id SERIAL PRIMARY KEY,
+    profile_id INTEGER NOT NULL,
+    company_name VARCHAR(255) NOT NULL DEFAULT '',
+    company_address VARCHAR(255) NOT NULL DEFAULT '',
+    company_city VARCHAR(100) NOT NULL DEFAULT '',
+    company_postal_code VARCHAR(20) NOT NULL DEFAULT '',
+    recruiter_name VARCHAR(255) NOT NULL DEFAULT '',
+    title VARCHAR(255) NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (profile_id) REFERENCES profiles(id) ON DELETE CASCADE
+);
+
+-- Add index on profile_id for faster joins
+CREATE INDEX idx_job_postings_profile_id ON job_postings(profile_id);
+
 -- Create trigger function to update the "updated_at" timestamp automatically
 CREATE OR REPLACE FUNCTION update_modified_column()
 RETURNS TRIGGER AS $$
@@ -77,4 +96,9 @@ EXECUTE FUNCTION update_modified_column();
 CREATE TRIGGER update_experience_timestamp
 BEFORE UPDATE ON experience
 FOR EACH ROW
+EXECUTE FUNCTION update_modified_column();
+
+CREATE TRIGGER update_job_postings_timestamp
+BEFORE UPDATE ON job_postings
+FOR EACH ROW
 EXECUTE FUNCTION update_modified_column();
\ No newline at end of file
@@ -1,16 +1,63 @@
-__all__ = [
-    "md_cv_from_user_and_job",
-    "request_model",
-    "review_from_user_and_job",
-    "job_description_from_text",
-    "text_job_position_from_link",
-    "generate_cover_letter_data",
-    "analyze_gaps",
-]
+"""
+Feature functions of the service.
 
-from .ai_api import request_model
-from .cover_letter_generator import generate_cover_letter_data
-from .gap_analyzer import analyze_gaps
-from .job_description import job_description_from_text, text_job_position_from_link
-from .md_cv_generator import md_cv_from_user_and_job
-from .review_user_application import review_from_user_and_job
+The feature modules (and what they pull in: `requests`, `httpx`, `numpy`, `dotenv`, the PII
+word lists, ...) are imported on first use rather than with the package, so starting the
+service only pays for the modules its first requests need. `features.analyze_gaps` or
+`from features import analyze_gaps` imports `features.gap_analyzer` at that point;
+submodules (`features.job_fetcher`) load the same way.
+"""
+import importlib
+
+# Exported name -> (module, name in the module)
+_EXPORTS = {
+    "md_cv_from_user_and_job": ("md_cv_generator", "md_cv_from_user_and_job"),
+    "request_model": ("ai_api", "request_model"),
+    "review_from_user_and_job": ("review_user_application", "review_from_user_and_job"),
+    "job_description_from_text": ("job_description", "job_description_from_text"),
+    "job_description_from_link": ("job_description", "job_description_from_link"),
+    "text_job_position_from_link": ("job_description", "text_job_position_from_link"),
+    "generate_cover_letter_data": ("cover_letter_generator", "generate_cover_letter_data"),
+    "analyze_gaps": ("gap_analyzer", "analyze_gaps"),
+    "rank_job_postings": ("job_ranking", "rank_job_postings"),
+    "rerank_job_postings": ("job_ranking", "rerank_job_postings"),
+    "index_job_posting": ("job_ranking", "index_job_posting"),
+    "remove_job_posting": ("job_ranking", "remove_job_posting"),
+    "drop_job_posting_index": ("job_ranking", "drop_job_posting_index"),
+    "find_skill_gaps": ("skills_index", "find_skill_gaps"),
+    "index_profile": ("skills_index", "index_profile"),
+    "index_education": ("skills_index", "index_education"),
+    "index_experience": ("skills_index", "index_experience"),
+    "remove_education": ("skills_index", "remove_education"),
+    "remove_experience": ("skills_index", "remove_experience"),
+    "drop_profile_skills": ("skills_index", "drop_profile_skills"),
+    "load_templates": ("letter_templates", "load_templates"),
+    "render_cover_letter": ("letter_templates", "render_cover_letter"),
+    "prewarm_analyses": ("prewarm", "prewarm_analyses"),
+    "prewarm_enabled": ("prewarm", "enabled"),
+    "prewarm_stats": ("prewarm", "prewarm_stats"),
+    "prewarm_follow_up": ("prewarm", "follow_up"),
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        module_name, attribute = _EXPORTS[name]
+        value = getattr(importlib.import_module(f".{module_name}", __name__), attribute)
+    elif not name.startswith("_"):
+        try:
+            value = importlib.import_module(f".{name}", __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -1,50 +1,188 @@
 import os
+import time
 
 import requests
 from dotenv import load_dotenv
 from loguru import logger
+from pydantic import BaseModel
+
+from . import metrics, prewarm, profiling
+from .log_config import payload
+from .pseudonyms import INSTRUCTION as PSEUDONYM_INSTRUCTION
+from .pseudonyms import Pseudonyms
+from .shared_cache import make_cache
+from .structured_output import response_format
 
 # Load environment variables from .env file
 load_dotenv()
 
-API_URL = "https://openrouter.ai/api/v1/chat/completions"
+API_URL = os.getenv("AI_API_URL", "https://openrouter.ai/api/v1/chat/completions")
 API_KEY = os.getenv("API_KEY")
 
+# One session for all model calls: its connection pool keeps the TLS connections to the provider
+# open between requests (see `warm_connection`)
+_session = requests.Session()
+
 # MODEL_NAME = "deepseek/deepseek-v3-base:free"
 MODEL_NAME = "google/gemini-2.0-flash-exp:free"
 # MODEL_NAME = "nousresearch/deephermes-3-mistral-24b-preview:free"
 
 
-def request_model(prompt: str) -> str | None:
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json",
-    }
+# Providers that only cache a prompt prefix when it is marked with `cache_control`;
+# the others (OpenAI, DeepSeek, ...) cache long prefixes automatically
+CACHE_CONTROL_MODEL_PREFIXES = ("anthropic/", "google/gemini")
+
+# Responses kept per exact request (model + messages) for this many seconds; 0 disables the cache.
+# With pseudonymized prompts the entries are free of personal details and shared between candidates.
+RESPONSE_CACHE_TTL = float(os.getenv("AI_RESPONSE_CACHE_TTL", "0"))
+_responses = make_cache("ai-responses", maxsize=1024, ttl=RESPONSE_CACHE_TTL)
+
+
+def build_messages(prompt: str, shared_prefix: str | None = None, model: str = MODEL_NAME) -> list[dict]:
+    """
+    Chat messages for a prompt. A `shared_prefix` (the same for every feature working on
+    one profile and job) goes first, in its own system message, so the provider can reuse
+    its cache across features; only the task-specific `prompt` follows as the user message.
+    """
+    messages = []
+    if shared_prefix:
+        prefix_part = {"type": "text", "text": shared_prefix}
+        if model.startswith(CACHE_CONTROL_MODEL_PREFIXES):
+            prefix_part["cache_control"] = {"type": "ephemeral"}
+        messages.append({"role": "system", "content": [prefix_part]})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def request_model(
+    prompt: str,
+    *,
+    shared_prefix: str | None = None,
+    feature: str = "default",
+    pseudonyms: Pseudonyms | None = None,
+    output_model: type[BaseModel] | None = None,
+) -> str | None:
+    """
+    Ask the AI model. With `pseudonyms` (see features/pseudonyms.py) the candidate's personal details
+    are replaced by tokens in everything sent and put back into the response.
+    With `output_model`, providers that support it are asked for JSON matching that pydantic model;
+    parse the answer with `structured_output.parse_or_repair`.
+    """
+    if pseudonyms:
+        prompt = pseudonyms.apply(prompt)
+        if shared_prefix:
+            shared_prefix = f"{pseudonyms.apply(shared_prefix)}\n\n{PSEUDONYM_INSTRUCTION}"
+        else:
+            prompt = f"{PSEUDONYM_INSTRUCTION}\n\n{prompt}"
+
+    response = _request(prompt, shared_prefix, feature, output_model)
+    if response is not None and pseudonyms:
+        response = pseudonyms.restore(response)
+    return response
+
+
+def warm_connection(timeout: float = 5) -> int:
+    """Open the kept-alive connection (DNS, TCP, TLS) to the provider ahead of the first request; HTTP status"""
+    return _session.head(API_URL, timeout=timeout).status_code
+
+
+def clear_response_cache() -> None:
+    _responses.clear()
+
 
+def _request(
+    prompt: str, shared_prefix: str | None, feature: str, output_model: type[BaseModel] | None = None
+) -> str | None:
     data = {
         "model": MODEL_NAME,
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt,
-            }
-        ],
+        "messages": build_messages(prompt, shared_prefix),
         "stream": False,
+        "usage": {"include": True},
+    }
+    if output_model is not None and (structured := response_format(output_model, MODEL_NAME)):
+        data["response_format"] = structured
+
+    if not prewarm.enabled() and not RESPONSE_CACHE_TTL:
+        return _post(data, feature)
+
+    key = prewarm.request_key(data["model"], data["messages"])
+    if RESPONSE_CACHE_TTL:
+        cached = _responses.get(key)
+        if cached is not None:
+            logger.info(f"{feature}: answered from the response cache")
+            return cached
+
+    if not prewarm.enabled():
+        response = _post(data, feature)
+    else:
+        response = _prewarmed_post(key, data, feature)
+    if response is not None and RESPONSE_CACHE_TTL:
+        _responses.set(key, response)
+    return response
+
+
+def _prewarmed_post(key: str, data: dict, feature: str) -> str | None:
+    # Serve the request from a speculative run of the very same request, if there was one
+    cached = prewarm.cached_response(key, feature)
+    if cached is not None:
+        logger.info(f"{feature}: answered from the speculative pre-warm cache")
+        return cached
+
+    future = prewarm.begin_request(key, feature)
+    response = None
+    try:
+        response = _post(data, feature)
+    finally:
+        prewarm.finish_request(key, future, response)
+    return response
+
+
+def _post(data: dict, feature: str) -> str | None:
+    headers = {
+        "Authorization": f"Bearer {API_KEY}",
+        "Content-Type": "application/json",
     }
 
+    outcome = "connection_error"
+    usage = None
+    started = time.perf_counter()
     try:
-        response = requests.post(API_URL, headers=headers, json=data, timeout=5)
+        with metrics.AI_IN_PROGRESS.track(feature), profiling.span(f"llm:{feature}"):
+            response = _session.post(API_URL, headers=headers, json=data, timeout=5)
 
+        outcome = "http_error"
         if response.status_code == 200:
             json_response = response.json()
+            outcome = "bad_response"
             if "choices" in json_response:
-                return json_response["choices"][0]["message"]["content"]
+                usage = json_response.get("usage") or {}
+                metrics.ai_usage(feature, usage)
+                content = json_response["choices"][0]["message"]["content"]
+                outcome = "ok"
+                return content
 
-        logger.error(f"API Error: {response.status_code}, Response: {response.text}")
+        # Error bodies can be large and echo the prompt
+        logger.opt(lazy=True).error(
+            "API Error: {}, Response: {}", lambda: response.status_code, lambda: payload(response.text)
+        )
 
     except Exception as e:
         logger.error(f"Connection error: {e}")
 
+    finally:
+        latency = time.perf_counter() - started
+        metrics.AI_REQUESTS.observe(latency, feature, data["model"], outcome)
+        tokens = {}
+        if usage:
+            tokens = {
+                "prompt_tokens": usage.get("prompt_tokens"),
+                "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0,
+                "completion_tokens": usage.get("completion_tokens"),
+            }
+        logger.bind(
+            feature=feature, model=data["model"], outcome=outcome, latency_ms=round(latency * 1000), **tokens
+        ).info("AI request {}", outcome)
+
     return None
 
 
@@ -1,65 +1,45 @@
 from datetime import datetime
 from typing import Literal
 
-from database.db_interface import Profile
+from database.db_interface import Education, Experience, Profile
 from loguru import logger
 from models import JobDescriptionResponse
 from sqlalchemy.orm import Session
 
+from . import metrics
 from .ai_api import request_model
+from .letter_templates import render_cover_letter
+from .log_config import payload
+from .prompt_fragments import format_shared_prefix
+from .pseudonyms import for_profile
 
 LetterStyle = Literal["professional", "creative", "technical"]
 
 
 def generate_ai_content(
-    profile: Profile, job_description: JobDescriptionResponse, style: LetterStyle, notes: str
+    profile: Profile,
+    job_description: JobDescriptionResponse,
+    style: LetterStyle,
+    notes: str,
+    experiences: list[Experience] | None = None,
+    educations: list[Education] | None = None,
 ) -> str:
     """Generate the full cover letter using AI"""
 
     applicant_name = f"{profile.first_name} {profile.last_name}"
     applicant_email = profile.email or "not specified"
     applicant_phone = profile.phone or "not specified"
-
-    location_parts = [str(part) for part in [profile.city, profile.state, profile.country] if part is not None]
-    applicant_location = ", ".join(location_parts) if location_parts else "not specified"
     applicant_summary = profile.about_me or "a summary of my qualifications and experience."
 
     job_title = job_description.title or "the advertised position"
     company_name = job_description.company_name or "your esteemed company"
 
-    job_details_list = []
-    if job_description.title:
-        job_details_list.append(f"- Job Title: {job_description.title}")
-    if job_description.company_name:
-        job_details_list.append(f"- Company: {job_description.company_name}")
-    if job_description.company_city:
-        job_details_list.append(f"- Location: {job_description.company_city}")
-    if job_description.description:
-        job_details_list.append(f"- Description: {job_description.description}")
-
-    job_details_str = "\n".join(job_details_list)
-    if not job_details_str:
-        job_details_str = "Details about the job were not fully specified. Please refer to the job posting."
-
     recruiter_name = job_description.recruiter_name or "Hiring Manager"
     current_date_str = datetime.now().strftime("%B %d, %Y")
 
+    shared_prefix = format_shared_prefix(profile, educations or [], experiences or [], job_description)
     prompt = f"""
-    Please write a complete cover letter in a {style} style.
-
-    **Applicant Information:**
-    - Name: {applicant_name}
-    - Email: {applicant_email}
-    - Phone: {applicant_phone}
-    - Current Location: {applicant_location}
-    - Personal Summary/About Me: {applicant_summary}
-    
-    **Job Details:**
-    {job_details_str}
-
-    **Company Contact (for salutation):**
-    - Contact Person: {recruiter_name}
-    - Company Name: {company_name}
+    Please write a complete cover letter in a {style} style for the candidate and job described above.
 
     **Additional Notes/Instructions from Applicant, what they want to add to the cover letter:**
     {notes if notes else "No specific notes provided."}
@@ -86,27 +66,15 @@ def generate_ai_content(
     - The output should be ONLY the cover letter text. No extra explanations, introductions, or markdown formatting like "```" surrounding the letter.
     - Ensure the letter is professional, grammatically correct, and flows naturally.
     
-    The final version must look polished and ready to use as-isю
+    The final version must look polished and ready to use as-is.
     """
 
-    response = request_model(prompt)
+    response = request_model(prompt, shared_prefix=shared_prefix, feature="cover_letter", pseudonyms=for_profile(profile))
     if response is None:
-        # Provide a more comprehensive default fallback message if AI fails
-        return (
-            f"{applicant_name}\n"
-            f"{applicant_email}\n"
-            f"{applicant_phone}\n\n"
-            f"{current_date_str}\n\n"
-            f"{recruiter_name}\n"
-            f"{company_name}\n\n"
-            f"Dear {recruiter_name},\n\n"
-            f"I am writing to express my keen interest in the {job_title} position at {company_name}, as advertised. "
-            f"My background includes: {applicant_summary}.\n\n"
-            f"I am confident that my skills and experience align well with your requirements and I am eager to contribute to your team. "
-            f"Thank you for considering my application. I look forward to hearing from you.\n\n"
-            f"Sincerely,\n"
-            f"{applicant_name}"
-        )
+        # Fall back to the template letter if AI fails
+        logger.warning("AI model unavailable, rendering cover letter from template")
+        metrics.fallback("cover_letter", "ai_unavailable")
+        return render_cover_letter(profile, job_description, style, notes, experiences)
     return response
 
 
@@ -116,13 +84,25 @@ def generate_cover_letter_data(
     job_description: JobDescriptionResponse,
     style: LetterStyle = "professional",
     notes: str = "",
+    experiences: list[Experience] | None = None,
+    instant: bool = False,
+    educations: list[Education] | None = None,
 ) -> str:
-    """Generate a full cover letter based on profile and job description"""
+    """
+    Generate a full cover letter based on profile and job description.
+    With `instant` the letter is rendered from the local template right away, without the AI model.
+    """
+
+    if instant:
+        logger.info("Rendering cover letter from template...")
+        return render_cover_letter(profile, job_description, style, notes, experiences)
 
     # Generate AI-powered full cover letter
     logger.info("Generating AI-powered full cover letter...")
-    full_cover_letter = generate_ai_content(profile, job_description, style, notes)
+    full_cover_letter = generate_ai_content(profile, job_description, style, notes, experiences, educations)
 
-    logger.info(f"Generated letter: {full_cover_letter}")
+    logger.bind(feature="cover_letter", profile_id=profile.id).opt(lazy=True).info(
+        "Generated letter: {}", lambda: payload(full_cover_letter)
+    )
 
     return full_cover_letter
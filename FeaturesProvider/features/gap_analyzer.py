@@ -1,8 +1,37 @@
+from typing import Any
+
 from database.db_interface import Education, Experience, Profile
 from loguru import logger
 from models import JobDescriptionResponse
+from pydantic import BaseModel, field_validator
 
+from . import metrics
 from .ai_api import request_model
+from .log_config import payload
+from .prompt_fragments import format_shared_prefix
+from .pseudonyms import for_profile
+from .skills_index import extract_skills, find_skill_gaps, merge_gaps
+from .structured_output import parse_or_repair
+
+_SEVERITIES = {"critical": "Critical", "important": "Important", "nice-to-have": "Nice-to-have"}
+
+
+class _GapAnswer(BaseModel):
+    gap_text: str
+    severity: str = "Important"
+    suggestion: str = ""
+
+    @field_validator("severity", mode="before")
+    @classmethod
+    def _known_severity(cls, value: Any) -> str:
+        """"CRITICAL", "nice to have" and the like; anything unknown counts as important"""
+        return _SEVERITIES.get(str(value).strip().lower().replace(" ", "-").replace("_", "-"), "Important")
+
+
+class _GapsAnswer(BaseModel):
+    """The AI model's gap analysis"""
+
+    gaps: list[_GapAnswer]
 
 
 def analyze_gaps(
@@ -10,6 +39,7 @@ def analyze_gaps(
     educations: list[Education],
     experiences: list[Experience],
     job_description: JobDescriptionResponse,
+    skill_gaps: list[dict] | None = None,
 ) -> dict:
     """
     Analyzes gaps between the candidate's profile and job requirements.
@@ -20,24 +50,20 @@ def analyze_gaps(
     - list of all user education entries
     - list of all user experience entries
     - job_description (parsed)
+    - skill_gaps: gaps already found by the local skills index (computed here if not given)
+
+    The deterministic skill gaps always come first; the AI model only adds the nuanced ones.
     """
+    if skill_gaps is None:
+        skill_gaps = find_skill_gaps(profile, educations, experiences, job_description)
+    known_gaps = ", ".join(sorted({skill for gap in skill_gaps for skill in extract_skills(gap["gap_text"])})) or "None"
+
     # Create a prompt to identify experience gaps
+    shared_prefix = format_shared_prefix(profile, educations, experiences, job_description)
     prompt = f"""
     Analyze this candidate's profile against the job requirements and identify experience or responsibility gaps.
 
-    Job Title: {job_description.title}
-    Company: {job_description.company_name}
-    Job Description: {job_description.description}
-
-    Candidate Information:
-    Name: {profile.first_name} {profile.last_name}
-    About: {profile.about_me or "Not provided"}
-
-    Education:
-    {_format_education(educations)}
-
-    Experience:
-    {_format_experience(experiences)}
+    Skills already reported as missing (do NOT repeat them): {known_gaps}
 
     Identify SMALL experience or responsibility gaps where the candidate is missing information.
     Focus on borderline opportunities - gaps that could be filled with more details in their profile.
@@ -53,25 +79,28 @@ def analyze_gaps(
 
     Provide 3-7 total gaps across all severity levels.
 
-    Format your response EXACTLY as follows:
-    CRITICAL:
-    - [gap description] | [specific suggestion]
-
-    IMPORTANT:
-    - [gap description] | [specific suggestion]
-    - [gap description] | [specific suggestion]
-
-    NICE-TO-HAVE:
-    - [gap description] | [specific suggestion]
+    Respond with a JSON object only, formatted EXACTLY as follows:
+    {{"gaps": [
+        {{"gap_text": "[gap description]", "severity": "Critical", "suggestion": "[specific suggestion]"}},
+        {{"gap_text": "[gap description]", "severity": "Important", "suggestion": "[specific suggestion]"}},
+        {{"gap_text": "[gap description]", "severity": "Nice-to-have", "suggestion": "[specific suggestion]"}}
+    ]}}
     """
 
-    logger.info(f"Gap analysis prompt: {prompt}")
+    log = logger.bind(feature="gaps", profile_id=profile.id)
+    log.opt(lazy=True).info("Gap analysis prompt: {}", lambda: payload(prompt))
 
     # Call the AI model
-    response = request_model(prompt)
+    pseudonyms = for_profile(profile)
+    response = request_model(
+        prompt, shared_prefix=shared_prefix, feature="gaps", pseudonyms=pseudonyms, output_model=_GapsAnswer
+    )
 
     if not response:
         # Fallback if API fails
+        metrics.fallback("gaps", "ai_unavailable")
+        if skill_gaps:
+            return {"gaps": skill_gaps}
         return {
             "gaps": [
                 {
@@ -82,68 +111,20 @@ def analyze_gaps(
             ]
         }
 
-    logger.info(f"Gap analysis received response: {response}")
-
-    # Parse the response
-    try:
-        gaps = []
-        current_severity = None
-
-        lines = response.strip().split("\n")
-        for line in lines:
-            line = line.strip()
-
-            # Check for severity headers
-            if line.startswith("CRITICAL:"):
-                current_severity = "Critical"
-                continue
-            elif line.startswith("IMPORTANT:"):
-                current_severity = "Important"
-                continue
-            elif line.startswith("NICE-TO-HAVE:"):
-                current_severity = "Nice-to-have"
-                continue
-
-            # Parse gap lines (format: "- gap text | suggestion")
-            if line.startswith("-") and current_severity and "|" in line:
-                line_content = line[1:].strip()  # Remove the "-" prefix
-                parts = line_content.split("|", 1)
-
-                if len(parts) == 2:
-                    gap_text = parts[0].strip()
-                    suggestion = parts[1].strip()
-
-                    if gap_text and suggestion:
-                        gaps.append({
-                            "gap_text": gap_text,
-                            "severity": current_severity,
-                            "suggestion": suggestion
-                        })
-
-        # If no gaps were parsed, provide fallback gaps
-        if not gaps:
-            gaps = [
-                {
-                    "gap_text": f"Review alignment with {job_description.title} requirements",
-                    "severity": "Important",
-                    "suggestion": "Compare your experience descriptions against the key requirements listed in the job posting."
-                },
-                {
-                    "gap_text": f"Highlight relevant achievements for {job_description.company_name}",
-                    "severity": "Important",
-                    "suggestion": "Add specific metrics and outcomes to your experience entries that relate to the job requirements."
-                },
-                {
-                    "gap_text": "Expand technical skills section",
-                    "severity": "Nice-to-have",
-                    "suggestion": "Include more details about specific tools, technologies, or methodologies mentioned in the job description."
-                }
-            ]
-
-        return {"gaps": gaps}
-
-    except Exception as e:
-        logger.error(f"Error parsing AI gap analysis response: {e}")
+    log.opt(lazy=True).info("Gap analysis received response: {}", lambda: payload(response))
+
+    # Parse the response; the repair request needs no candidate data, only the answer to correct
+    answer = parse_or_repair(
+        response,
+        _GapsAnswer,
+        lambda repair: request_model(repair, feature="gaps", pseudonyms=pseudonyms, output_model=_GapsAnswer),
+        feature="gaps",
+        fallback_parser=_parse_gap_lines,
+    )
+    if answer is None:
+        metrics.fallback("gaps", "unparsable")
+        if skill_gaps:
+            return {"gaps": skill_gaps}
         return {
             "gaps": [
                 {
@@ -154,34 +135,54 @@ def analyze_gaps(
             ]
         }
 
-
-def _format_education(educations: list[Education]) -> str:
-    """Helper function to format education information for the prompt"""
-    if not educations:
-        return "No formal education provided"
-
-    edu_text = []
-    for edu in educations:
-        end_date = edu.end_date.strftime("%Y-%m") if edu.end_date is not None else "Present"
-        edu_text.append(
-            f"- {edu.institution}, {edu.degree}, {edu.start_date.strftime('%Y-%m')} to {end_date}"
-            + (f", {edu.additional_info}" if edu.additional_info is not None else "")
-        )
-
-    return "\n".join(edu_text)
-
-
-def _format_experience(experiences: list[Experience]) -> str:
-    """Helper function to format experience information for the prompt"""
-    if not experiences:
-        return "No work experience provided"
-
-    exp_text = []
-    for exp in experiences:
-        end_date = exp.end_date if exp.end_date is not None else "Present"
-        exp_text.append(
-            f"- {exp.company}, {exp.job_title}, {exp.start_date} to {end_date}"
-            + (f"\n  {exp.description}" if exp.description is not None else "")
-        )
-
-    return "\n".join(exp_text)
+    gaps = [gap.model_dump() for gap in answer.gaps if gap.gap_text.strip() and gap.suggestion.strip()]
+
+    # If no gaps were parsed, provide fallback gaps
+    if not gaps and skill_gaps:
+        return {"gaps": skill_gaps}
+    if not gaps:
+        gaps = [
+            {
+                "gap_text": f"Review alignment with {job_description.title} requirements",
+                "severity": "Important",
+                "suggestion": "Compare your experience descriptions against the key requirements listed in the job posting."
+            },
+            {
+                "gap_text": f"Highlight relevant achievements for {job_description.company_name}",
+                "severity": "Important",
+                "suggestion": "Add specific metrics and outcomes to your experience entries that relate to the job requirements."
+            },
+            {
+                "gap_text": "Expand technical skills section",
+                "severity": "Nice-to-have",
+                "suggestion": "Include more details about specific tools, technologies, or methodologies mentioned in the job description."
+            }
+        ]
+
+    return {"gaps": merge_gaps(skill_gaps, gaps)}
+
+
+def _parse_gap_lines(response: str) -> _GapsAnswer | None:
+    """The former plain-text answer format: severity headers and "- gap | suggestion" lines"""
+    gaps = []
+    current_severity = None
+    for line in response.strip().split("\n"):
+        line = line.strip()
+
+        # Check for severity headers
+        if line.startswith("CRITICAL:"):
+            current_severity = "Critical"
+            continue
+        elif line.startswith("IMPORTANT:"):
+            current_severity = "Important"
+            continue
+        elif line.startswith("NICE-TO-HAVE:"):
+            current_severity = "Nice-to-have"
+            continue
+
+        # Parse gap lines (format: "- gap text | suggestion")
+        if line.startswith("-") and current_severity and "|" in line:
+            gap_text, suggestion = (part.strip() for part in line[1:].split("|", 1))
+            if gap_text and suggestion:
+                gaps.append(_GapAnswer(gap_text=gap_text, severity=current_severity, suggestion=suggestion))
+    return _GapsAnswer(gaps=gaps) if gaps else None
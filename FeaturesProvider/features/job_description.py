@@ -1,27 +1,100 @@
+import asyncio
+from typing import Any
+
 from loguru import logger
 from models import JobDescriptionResponse
+from pydantic import BaseModel, field_validator
 
+from . import job_heuristics, metrics, posting_cache, posting_dedup
 from .ai_api import request_model
+from .job_fetcher import fetch_posting_text
+from .job_heuristics import HeuristicFields, extract_fields
+from .log_config import payload
+from .structured_output import parse_or_repair
+
+# Fields of JobDescriptionResponse the rules and the AI model look for; the rest is the description
+EXTRACTED_FIELDS = ("company_name", "company_address", "company_city", "company_postal_code", "recruiter_name", "title")
+
+
+class _JobFields(BaseModel):
+    """The AI model's answer: missing fields are empty, numbers (postal codes) become text"""
+
+    company_name: str = ""
+    company_address: str = ""
+    company_city: str = ""
+    company_postal_code: str = ""
+    recruiter_name: str = ""
+    title: str = ""
+    description: str = ""
 
+    @field_validator("*", mode="before")
+    @classmethod
+    def _as_text(cls, value: Any) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, list):  # requirements as a list
+            return "\n".join(map(str, value))
+        return value if isinstance(value, str) else str(value)
 
-def text_job_position_from_link(link_as_text: str) -> str:
+
+async def text_job_position_from_link(link_as_text: str) -> str:
     """
     Fetches given link to the job position and extracts text description of the position
-    and the company which posted the position.
-    If the link provided is unreachable or does not contain a job position, throw an error
-    Otherwise provide job description as a text description.
-    The job description should contain:
-    - Company name, address, (city, postal code and a recruiter's name if possible)
-    - Job title
-    - Job description
-    All in text form, possible to parse for human and an LLM
+    and the company which posted the position, as text possible to parse for human and an LLM.
+    If the link provided is unreachable or is not a readable page, raises `FetchError`.
     """
-    # FIXME: Your code goes here...
-    return """
-    SomeCorp Ltd, located on Mockers avenue 48, 03523 Berlin, looks for a Senior Software Engineer for their project SuperMocker. 
-    
-    Minimum 10 years of experience with Python is mandatory, architectural knowledge is highly recommended. 
-    """.strip()
+    return await fetch_posting_text(link_as_text.strip())
+
+
+async def job_description_from_link(link_as_text: str) -> JobDescriptionResponse:
+    """
+    Fetch the job position behind a link and parse it with `job_description_from_text`.
+    A posting whose text is unchanged since it was last parsed is answered from the posting
+    cache without asking the AI model again.
+    """
+    return await job_description_from_posting(await text_job_position_from_link(link_as_text))
+
+
+async def job_description_from_posting(text: str) -> JobDescriptionResponse:
+    """
+    `job_description_from_text` on a thread; a posting text parsed before, or a near-duplicate
+    of one (the same posting from another board) whose field values are unchanged, comes from
+    the posting cache.
+    """
+    # The posting cache and the near-duplicate index are on disk: use them on a thread
+    cached = await asyncio.to_thread(posting_cache.load_parsed, text)
+    if cached is not None:
+        logger.info("Job posting text unchanged, reusing its parsed description")
+        return _extracted_by(JobDescriptionResponse(**cached), "cache")
+
+    signature = await asyncio.to_thread(posting_dedup.signature, text) if posting_dedup.ENABLED else None
+    duplicate = await asyncio.to_thread(posting_dedup.find_duplicate, signature) if signature is not None else None
+    if duplicate is not None:
+        text_digest, similarity = duplicate
+        entry = await asyncio.to_thread(posting_cache.load_parsed_posting, text_digest)
+        if entry is not None:
+            cached, original = entry
+            values = [cached.get(name) or "" for name in EXTRACTED_FIELDS]
+            if posting_dedup.same_values(original, text, values):
+                logger.info(f"Job posting is a near-duplicate ({similarity:.2f}) of a parsed one, reusing its fields")
+                return _extracted_by(JobDescriptionResponse(**cached), "near_duplicate")
+            logger.info(f"Job posting is a near-duplicate ({similarity:.2f}) with other field values, parsing it")
+
+    job_description = await asyncio.to_thread(job_description_from_text, text)
+    # The fallback (AI model unavailable) is not worth keeping
+    if job_description._extracted_by != "fallback":
+        await asyncio.to_thread(_remember, text, job_description.model_dump(), signature)
+    return job_description
+
+
+def _remember(text: str, fields: dict[str, Any], signature: Any) -> None:
+    posting_cache.store_parsed(text, fields)
+    posting_dedup.remember(posting_cache.digest(text), signature)
+
+
+def _extracted_by(job_description: JobDescriptionResponse, path: str) -> JobDescriptionResponse:
+    job_description._extracted_by = path
+    return job_description
 
 
 def job_description_from_text(job_description_as_text: str) -> JobDescriptionResponse:
@@ -32,7 +105,19 @@ def job_description_from_text(job_description_as_text: str) -> JobDescriptionRes
     Everything that does not fit into specific fields of the object should be concisely
     put into the `description` field (things like requirements or such).
     If the text does not appear to be a job description, throw an error
+
+    The fields are first looked for with local rules (`job_heuristics`); the AI model is only
+    asked when a required one is missing or uncertain, and fills in what the rules did not find.
     """
+    fields = extract_fields(job_description_as_text) if job_heuristics.ENABLED else HeuristicFields()
+    found = {name: fields.value(name) for name in EXTRACTED_FIELDS}
+    missing = fields.missing()
+    if job_heuristics.ENABLED and not missing:
+        logger.info(f"Job description fields found without the AI model: {fields.confidences()}")
+        description = job_heuristics.description(job_description_as_text)
+        return _extracted_by(JobDescriptionResponse(**found, description=description), "heuristics")
+    logger.info(f"Asking the AI model for the job description fields, not found confidently: {missing}")
+
     prompt = f"""Please analyze this job description and extract the following information in a structured way:
     - Company name
     - Company address
@@ -60,54 +145,24 @@ def job_description_from_text(job_description_as_text: str) -> JobDescriptionRes
     Put all requirements and detailed job description in the "description" field.
     """
 
-    fallback = JobDescriptionResponse(
-        company_name="",
-        company_address="",
-        company_city="",
-        company_postal_code="",
-        recruiter_name="",
-        title="",
-        description=job_description_as_text,
-    )
+    # Whatever the rules found, with the whole text as the description: nothing is lost without the model
+    fallback = _extracted_by(JobDescriptionResponse(**found, description=job_description_as_text), "fallback")
 
-    response = request_model(prompt)
-    logger.info(f"Response: {response}")
+    def request(prompt: str) -> str | None:
+        return request_model(prompt, feature="job_description", output_model=_JobFields)
+
+    response = request(prompt)
+    logger.bind(feature="job_description").opt(lazy=True).info("Response: {}", lambda: payload(response))
 
     if not response:
+        metrics.fallback("job_description", "ai_unavailable")
         return fallback
 
-    try:
-        # Extract JSON from the response
-        import json
-        import re
-
-        # Find JSON object in the response
-        json_match = re.search(r"\{.*\}", response, re.DOTALL)
-        if not json_match:
-            return fallback
-
-        parsed = json.loads(json_match.group())
-
-        # Validate required fields
-        required_fields = [
-            "company_name",
-            "company_address",
-            "company_city",
-            "company_postal_code",
-            "recruiter_name",
-            "title",
-            "description",
-        ]
-
-        for field in required_fields:
-            if field not in parsed:
-                parsed[field] = ""
-            elif not isinstance(parsed[field], str):
-                parsed[field] = str(parsed[field])
-
-        return JobDescriptionResponse(**parsed)
-
-    except json.JSONDecodeError:
-        raise ValueError("Failed to parse LLM response as JSON")
-    except Exception as e:
-        raise ValueError(f"Error processing job description: {str(e)}")
+    parsed = parse_or_repair(response, _JobFields, request, feature="job_description")
+    if parsed is None:
+        metrics.fallback("job_description", "unparsable")
+        return fallback
+    answer = parsed.model_dump()
+    for field in EXTRACTED_FIELDS:
+        answer[field] = answer[field] or fields.value(field)
+    return _extracted_by(JobDescriptionResponse(**answer), "ai")
@@ -0,0 +1,369 @@
+"""
+Fetching job postings from the web and reducing them to their text.
+
+`fetch_posting_text(url)` downloads a page through one pooled `httpx.AsyncClient` and feeds the
+body, chunk by chunk as it arrives, to an `html.parser` based extractor that keeps only the
+visible text: scripts, styles, navigation, headers, footers, forms and the like are dropped
+while parsing, so no document tree is built even for pages of several MB.
+
+Limits, all configurable from the environment:
+- `JOB_FETCH_MAX_BYTES` (default 5 MB) of (decompressed) body per page; larger pages are refused
+- `JOB_FETCH_MAX_REDIRECTS` (default 5) redirects per fetch
+- `JOB_FETCH_PER_HOST` (default 2) requests running at a time against one host, across all callers
+- `JOB_FETCH_TIMEOUT` (default 10) seconds per connect/read
+
+Links are user input, so before every request (the link itself and each redirect) the host is
+resolved and refused if any of its addresses is not public: loopback, private networks, link-local
+(where cloud metadata services answer), multicast and reserved ranges. A new connection then goes
+to the checked addresses (the next one if connecting fails), so a second DNS answer can not lead
+it elsewhere, while the URL keeps the host name: connections are pooled per host, and TLS (SNI
+and certificate) and the Host header name it. `JOB_FETCH_ALLOW_PRIVATE=1` lifts the check, for
+local stand-in servers.
+
+Every failure (unreachable host, error status, not an HTML page, too large, no text) raises
+`FetchError`. Fetched texts are kept and revalidated through `posting_cache`.
+"""
+import asyncio
+import codecs
+import ipaddress
+import os
+import re
+import socket
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from html.parser import HTMLParser
+from typing import AsyncIterator, Iterator
+
+import httpcore
+import httpx
+from loguru import logger
+
+from . import posting_cache
+from .profiling import spanned
+
+MAX_BYTES = int(os.getenv("JOB_FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+MAX_REDIRECTS = int(os.getenv("JOB_FETCH_MAX_REDIRECTS", "5"))
+PER_HOST = int(os.getenv("JOB_FETCH_PER_HOST", "2"))
+TIMEOUT = float(os.getenv("JOB_FETCH_TIMEOUT", "10"))
+ALLOW_PRIVATE = os.getenv("JOB_FETCH_ALLOW_PRIVATE", "0").lower() in ("1", "true", "yes")
+MAX_CONNECTIONS = 20
+MAX_TEXT = 50_000  # characters of extracted text handed on; more does not fit a prompt anyway
+USER_AGENT = "TrackMyOffer job posting reader"
+
+_TEXT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+# Elements whose content is never posting text; void elements (img, input, ...) have no content
+_SKIPPED = frozenset(
+    "script style noscript template svg canvas iframe object nav header footer aside form button select dialog".split()
+)
+_SKIPPED_ROLES = frozenset("navigation banner contentinfo search menu menubar dialog".split())
+# Elements that start a new line of text
+_BLOCKS = frozenset(
+    "p div br li ul ol dl dt dd tr table section article main title h1 h2 h3 h4 h5 h6 blockquote pre hr address "
+    "figcaption summary details".split()
+)
+_SPACES = re.compile(r"[^\S\n]+")
+_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w-]+)""", re.IGNORECASE)
+
+
+class FetchError(ValueError):
+    """The link could not be read as a job posting"""
+
+
+class TextExtractor(HTMLParser):
+    """
+    Incremental HTML to text conversion: `feed()` markup as it arrives, `close()` at the end and
+    read `text`. Only the text lines are kept, at most `limit` characters of them.
+    """
+
+    def __init__(self, limit: int = MAX_TEXT):
+        super().__init__(convert_charrefs=True)
+        self._limit = limit
+        self._lines: list[str] = []
+        self._line: list[str] = []
+        self._length = 0
+        # Element being skipped and how many elements of its kind are open inside it
+        self._skip_tag: str | None = None
+        self._skip_depth = 0
+
+    @property
+    def full(self) -> bool:
+        return self._length >= self._limit
+
+    @property
+    def text(self) -> str:
+        self._end_line()
+        return "\n".join(self._lines)[: self._limit]
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if self._skip_tag is not None:
+            self._skip_depth += tag == self._skip_tag
+            return
+        if tag in _SKIPPED or dict(attrs).get("role") in _SKIPPED_ROLES or ("hidden", None) in attrs:
+            self._skip_tag, self._skip_depth = tag, 1
+        elif tag in _BLOCKS:
+            self._end_line()
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        # <div/> and the like do not open an element
+        if self._skip_tag is None and tag in _BLOCKS:
+            self._end_line()
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if not self._skip_depth:
+                    self._skip_tag = None
+            return
+        if tag in _BLOCKS:
+            self._end_line()
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_tag is None and not self.full:
+            self._line.append(data)
+
+    def _end_line(self) -> None:
+        if not self._line:
+            return
+        for line in "".join(self._line).splitlines():
+            line = _SPACES.sub(" ", line).strip()
+            if line:
+                self._lines.append(line)
+                self._length += len(line) + 1
+        self._line = []
+
+
+# (host, checked addresses) of the request being sent, for `_PinnedBackend`
+_checked: ContextVar[tuple[str, list[str]] | None] = ContextVar("job_fetcher_checked", default=None)
+
+
+@contextmanager
+def _pinned(url: httpx.URL, addresses: list[str]) -> Iterator[None]:
+    token = _checked.set((url.raw_host.decode("ascii").lower(), addresses))
+    try:
+        yield
+    finally:
+        _checked.reset(token)
+
+
+class _PinnedBackend(httpcore.AsyncNetworkBackend):
+    """Opens connections to the checked addresses of their host instead of resolving it again"""
+
+    def __init__(self) -> None:
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host: str, port: int, timeout=None, local_address=None, socket_options=None):
+        checked = _checked.get()
+        if checked is None or checked[0] != host.lower():
+            raise httpcore.ConnectError(f"{host} was not checked")
+        error: Exception | None = None
+        for address in checked[1]:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        raise error
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+class _PinnedTransport(httpx.AsyncHTTPTransport):
+    """httpx's transport, connecting through `_PinnedBackend`"""
+
+    def __init__(self, limits: httpx.Limits) -> None:
+        super().__init__(limits=limits)
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            network_backend=_PinnedBackend(),
+        )
+
+
+class _Pool:
+    """HTTP client and per-host request limits of one event loop"""
+
+    def __init__(self) -> None:
+        limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+        self.client = httpx.AsyncClient(
+            transport=_PinnedTransport(limits),
+            timeout=TIMEOUT,
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml;q=0.9,text/plain;q=0.8"},
+            follow_redirects=False,
+        )
+        self.hosts: dict[str, asyncio.Semaphore] = {}
+
+    def host_limit(self, host: str) -> asyncio.Semaphore:
+        if host not in self.hosts:
+            self.hosts[host] = asyncio.Semaphore(PER_HOST)
+        return self.hosts[host]
+
+
+# Clients are bound to the event loop they were created on, so there is one pool per loop
+_pools: dict[asyncio.AbstractEventLoop, _Pool] = {}
+
+
+def _pool() -> _Pool:
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        for other in [other for other in _pools if other.is_closed()]:
+            del _pools[other]
+        pool = _pools[loop] = _Pool()
+    return pool
+
+
+async def aclose() -> None:
+    """Close the pooled connections of the running event loop (on application shutdown)"""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.client.aclose()
+
+
+def _decoder(response: httpx.Response, head: bytes) -> codecs.IncrementalDecoder:
+    charset = response.charset_encoding
+    if charset is None and (match := _CHARSET.search(head)):
+        charset = match.group(1).decode("ascii")
+    try:
+        return codecs.getincrementaldecoder(charset or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def _public(address: ipaddress.IPv4Address | ipaddress.IPv6Address) -> bool:
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    return address.is_global and not address.is_multicast
+
+
+async def _checked_addresses(url: httpx.URL) -> list[str]:
+    """
+    The addresses of the link's host to connect to. Raises `FetchError` if any of them is not
+    public (see module docstring), `OSError` if the host can not be resolved.
+    """
+    port = url.port or (443 if url.scheme == "https" else 80)
+    infos = await asyncio.get_running_loop().getaddrinfo(url.host, port, type=socket.SOCK_STREAM)
+    # IPv6 addresses may carry a zone ("fe80::1%eth0")
+    addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+    if not addresses:
+        raise OSError(f"no address for {url.host}")
+    if not ALLOW_PRIVATE:
+        for address in addresses:
+            if not _public(address):
+                raise FetchError(f"cannot fetch {url}: {url.host} is not a public address ({address})")
+    return list(dict.fromkeys(str(address) for address in addresses))
+
+
+async def _read_text(response: httpx.Response, chunks: AsyncIterator[bytes], url: httpx.URL | None = None) -> str:
+    """Extract the text of a streamed body, refusing bodies over MAX_BYTES; `url` names the page in errors"""
+    url = url or response.url
+    content_type = response.headers.get("content-type", "text/html").split(";")[0].strip().lower()
+    if content_type not in _TEXT_TYPES:
+        raise FetchError(f"{url} is not a web page ({content_type})")
+    declared = response.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_BYTES:
+        raise FetchError(f"{url} is larger than {MAX_BYTES} bytes")
+
+    plain = content_type == "text/plain"
+    extractor = TextExtractor()
+    plain_parts: list[str] = []
+    decoder = None
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > MAX_BYTES:
+            raise FetchError(f"{url} is larger than {MAX_BYTES} bytes")
+        if decoder is None:
+            decoder = _decoder(response, chunk[:1024])
+        text = decoder.decode(chunk)
+        if plain:
+            plain_parts.append(text)
+        else:
+            extractor.feed(text)
+            if extractor.full:
+                break
+    if decoder is not None:
+        text = decoder.decode(b"", final=True)
+        if plain:
+            plain_parts.append(text)
+        else:
+            extractor.feed(text)
+    if plain:
+        return "\n".join(line.strip() for line in "".join(plain_parts).splitlines() if line.strip())[:MAX_TEXT]
+    extractor.close()
+    return extractor.text
+
+
+@spanned("fetch")
+async def fetch_posting_text(url: str) -> str:
+    """
+    Text of the page at `url`, following up to MAX_REDIRECTS redirects to public addresses only.
+    Fresh copies come from the posting cache; stale ones are revalidated and, while the host
+    is throttling us or down, still served.
+    """
+    # The cache is on disk: read and write it on a thread, not on the event loop
+    cached = await asyncio.to_thread(posting_cache.load_page, url)
+    if cached is not None and cached.fresh:
+        logger.info(f"Job posting {url} served from the cache")
+        return cached.text
+
+    pool = _pool()
+    try:
+        target = httpx.URL(cached.final_url if cached is not None else url)
+    except httpx.InvalidURL as e:
+        raise FetchError(f"invalid link: {e}") from e
+    headers = cached.validators() if cached is not None else {}
+
+    for _ in range(MAX_REDIRECTS + 1):
+        if target.scheme not in ("http", "https") or not target.host:
+            raise FetchError(f"cannot fetch {target}: only http(s) links are supported")
+        async with pool.host_limit(target.host):
+            try:
+                addresses = await _checked_addresses(target)
+                with _pinned(target, addresses):
+                    async with pool.client.stream("GET", target, headers=headers) as response:
+                        if cached is not None and response.status_code == 304:
+                            cached.fetched_at = time.time()
+                            await asyncio.to_thread(posting_cache.store_page, cached)
+                            logger.info(f"Job posting {url} not modified")
+                            return cached.text
+                        if response.is_redirect:
+                            location = response.headers.get("location")
+                            if not location:
+                                raise FetchError(f"{target} redirects without a location")
+                            # Validators belong to the page the cached text came from
+                            target, headers = target.join(location), {}
+                            continue
+                        if cached is not None and (response.status_code == 429 or response.status_code >= 500):
+                            status = response.status_code
+                            logger.warning(f"{target} answered with HTTP {status}, serving the cached copy")
+                            return cached.text
+                        if response.status_code >= 400:
+                            raise FetchError(f"{target} answered with HTTP {response.status_code}")
+                        text = await _read_text(response, response.aiter_bytes(), target)
+            except (httpx.HTTPError, OSError) as e:
+                if cached is not None:
+                    logger.warning(f"Could not revalidate {target} ({e}), serving the cached copy")
+                    return cached.text
+                raise FetchError(f"could not fetch {target}: {e}") from e
+        if not text.strip():
+            raise FetchError(f"{target} has no text")
+        logger.info(f"Fetched {len(text)} characters of text from {target}")
+        if "no-store" not in response.headers.get("cache-control", "").lower():
+            await asyncio.to_thread(
+                posting_cache.store_page,
+                posting_cache.CachedPage(
+                    url=url,
+                    final_url=str(target),
+                    text=text,
+                    etag=response.headers.get("etag"),
+                    last_modified=response.headers.get("last-modified"),
+                    fetched_at=time.time(),
+                ),
+            )
+        return text
+    raise FetchError(f"{url} redirects more than {MAX_REDIRECTS} times")
@@ -0,0 +1,348 @@
+"""
+Rule-based extraction of the structured job description fields, without the AI model.
+
+Company name, address, city, postal code, recruiter and title are often spelled out in a
+predictable way ("Job title: ...", "SomeCorp GmbH", "Hauptstraße 5, 10115 Berlin",
+"Contact: Jane Doe"). `extract_fields(text)` applies a handful of patterns and a gazetteer of
+known cities (`data/cities.txt`, loaded once) and returns every field it found with a
+confidence between 0 and 1; when several rules find a field, the most confident one wins.
+
+`job_description_from_text` only asks the AI model when one of the `REQUIRED` fields is
+missing or below `MIN_CONFIDENCE` (`JD_HEURISTIC_MIN_CONFIDENCE`, default 0.8);
+`JD_HEURISTICS=0` always asks the model. The description is then `description(text)`: the
+posting from its first section heading ("Responsibilities", "Your tasks", ...) on, at most
+`JD_MAX_DESCRIPTION` characters (default 4000), as the model would have condensed it.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+from .profiling import spanned
+
+ENABLED = os.getenv("JD_HEURISTICS", "1").lower() in ("1", "true", "yes")
+MIN_CONFIDENCE = float(os.getenv("JD_HEURISTIC_MIN_CONFIDENCE", "0.8"))
+REQUIRED = ("company_name", "title")
+CITIES_FILE = Path(__file__).resolve().parent.parent / "data" / "cities.txt"
+MAX_SCAN = 20_000  # characters looked at; the fields are near the top or the bottom of a posting
+MAX_DESCRIPTION = int(os.getenv("JD_MAX_DESCRIPTION", "4000"))
+HEAD_LINES = 3  # non-empty lines at the top where a company name with a legal form is the employer
+
+_LEGAL_FORMS = (
+    r"GmbH(?: & Co\. KG)?|gGmbH|AG|SE|KG|KGaA|UG|e\.V\.|Ltd\.?|Limited|Inc\.?|LLC|LLP|PLC|plc|Corp\.?|Corporation"
+    r"|S\.A\.|SA|SAS|SARL|S\.r\.l\.|SpA|S\.p\.A\.|B\.V\.|BV|N\.V\.|NV|Oy|AB|ApS|AS|A/S|Pty Ltd|Co\. KG"
+)
+_COMPANY_WORD = r"[A-Z0-9][\w&'.-]*"
+# Up to four capitalized words in front of a legal form: "SomeCorp Ltd", "Acme Data Systems GmbH"
+_COMPANY = re.compile(rf"\b((?:{_COMPANY_WORD} ){{0,4}}?{_COMPANY_WORD}),? (?:{_LEGAL_FORMS})(?![\w])")
+_COMPANY_LEAD_WORDS = {"At", "About", "Join", "Welcome", "For", "With", "By", "From", "We", "Our", "The", "To", "And"}
+# Lowercase words that may follow a company name: its verb ("builds", "sucht") or a joining word;
+# any other one makes the name part of a noun phrase ("the Apple Inc. ecosystem")
+_COMPANY_FOLLOWERS = frozenset(
+    "is are was has have and or in with for at as of to from we ist sucht hat bietet und mit im".split()
+)
+_NEXT_WORD = re.compile(r"[^\S\n]+([a-zäöüß]+)\b")
+_COMPANY_ACTS = re.compile(
+    rf"\b((?:{_COMPANY_WORD} ){{0,3}}?{_COMPANY_WORD}) (?:is looking for|looks for|is hiring|is seeking|seeks|"
+    r"is searching for|sucht)\b"
+)
+
+_ROLE_NOUNS = (
+    r"engineer|developer|programmer|architect|manager|designer|analyst|scientist|consultant|administrator"
+    r"|specialist|lead|director|intern|researcher|tester|technician|officer|coordinator|devops|sre"
+    r"|product owner|scrum master|accountant|assistant|associate|representative|recruiter|editor|writer"
+    r"|marketer|entwickler(?:in)?|berater(?:in)?|ingenieur(?:in)?"
+)
+_TITLE_WORD = r"[\w+#/.()-]+"
+_TITLE_AFTER_VERB = re.compile(
+    rf"\b(?:looking for|looks for|seeking|seeks|hiring|searching for|recruiting|sucht)(?: an?| our| einen?)? "
+    rf"((?:{_TITLE_WORD} ){{0,5}}?(?i:{_ROLE_NOUNS})s?)\b"
+)
+_ROLE_NOUN = re.compile(rf"\b(?:{_ROLE_NOUNS})s?\b", re.IGNORECASE)
+# Heading lines that start the description proper
+_SECTION = re.compile(
+    r"^[^\S\n]*(?:about (?:the|this) (?:role|position|job)|(?:job |position )?description|(?:the|your) role"
+    r"|(?:your |key )?(?:tasks|responsibilities)|what you(?:'ll| will) do|requirements|qualifications"
+    r"|(?:your )?profile|what we(?:'re| are) looking for|what you bring|(?:ihre |deine )?aufgaben"
+    r"|(?:ihr |dein )?profil|anforderungen|stellenbeschreibung)[^\S\n]*:?[^\S\n]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+# " - SomeCorp", " | Careers", " at SomeCorp", "(m/w/d)" after a title
+_TITLE_TAIL = re.compile(r"\s*(?:\((?:[mwfdx]\s*/\s*)+[mwfdx]\)|\s[-–|]\s.*|\sat\s.*|\sbei\s.*)$", re.IGNORECASE)
+
+# "Label: value" lines; the label decides the field
+_LABELED = re.compile(
+    r"^\s*(job title|position|role|title|stellenbezeichnung|company|employer|organization|unternehmen|firma"
+    r"|contact person|your contact|contact|recruiter|hiring manager|ansprechpartner(?:in)?|kontakt"
+    r"|address|adresse|anschrift|location|standort|office|city|ort)\s*[:–-]\s*(.+?)\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_LABEL_FIELDS = {
+    "job title": "title", "position": "title", "role": "title", "title": "title", "stellenbezeichnung": "title",
+    "company": "company_name", "employer": "company_name", "organization": "company_name",
+    "unternehmen": "company_name", "firma": "company_name",
+    "contact person": "recruiter_name", "your contact": "recruiter_name", "contact": "recruiter_name",
+    "recruiter": "recruiter_name", "hiring manager": "recruiter_name", "ansprechpartner": "recruiter_name",
+    "ansprechpartnerin": "recruiter_name", "kontakt": "recruiter_name",
+    "address": "address", "adresse": "address", "anschrift": "address",
+    "location": "location", "standort": "location", "office": "location", "city": "location", "ort": "location",
+}  # fmt: skip
+
+_PERSON = re.compile(
+    r"(?:(?:Mr|Ms|Mrs|Dr|Prof|Herr|Frau)\.? )?"
+    r"([A-ZÄÖÜ][a-zäöüß'-]+(?: (?:van |von |de |der )?[A-ZÄÖÜ][a-zäöüß'-]+){1,2})"
+)
+_RECRUITER_PHRASE = re.compile(
+    r"\b(?i:contact|reach out to|write to|send your application to|your contact person is|questions\? ask)"
+    rf" {_PERSON.pattern}"
+)
+
+_STREET_SUFFIXES = (
+    r"street|st\.|avenue|ave\.?|road|rd\.|boulevard|blvd\.?|lane|drive|way|square|place|platz|allee|weg|ring"
+    r"|damm|ufer|gasse|chaussee|straße|strasse|str\.|markt|kai|steig|pfad"
+)
+_STREET = re.compile(
+    # "Mockers avenue 48", "Am Markt 1", "Hauptstraße 5a"
+    rf"\b([A-ZÄÖÜ][\w.'-]*(?: [\w.'-]+){{0,3}}? (?i:{_STREET_SUFFIXES}) \d{{1,5}}[a-zA-Z]?"
+    rf"|[A-ZÄÖÜ][a-zäöüß-]+(?i:straße|strasse|str\.|weg|platz|allee|ring|damm|gasse|ufer) \d{{1,5}}[a-zA-Z]?"
+    # "221 Baker Street"
+    rf"|\d{{1,5}} [A-Z][\w.'-]*(?: [\w.'-]+){{0,3}}? (?i:{_STREET_SUFFIXES}))(?![\w])"
+)
+_POSTAL_DE = r"\d{5}"
+_POSTAL_NUMERIC4 = r"\d{4}"
+_POSTAL_NL = r"\d{4} ?[A-Z]{2}"
+_POSTAL_UK = r"[A-Z]{1,2}\d[A-Z\d]? ?\d[A-Z]{2}"
+_POSTAL_US = r"\d{5}(?:-\d{4})?"
+
+
+@dataclass
+class Candidate:
+    value: str
+    confidence: float
+
+
+@dataclass
+class HeuristicFields:
+    """Fields found by the rules, with their confidence"""
+
+    found: dict[str, Candidate] = field(default_factory=dict)
+
+    def offer(self, name: str, value: str, confidence: float) -> None:
+        value = value.strip(" \t,;:-–|")
+        if not value:
+            return
+        confidence = round(min(confidence, 1.0), 2)
+        current = self.found.get(name)
+        if current is None or confidence > current.confidence:
+            self.found[name] = Candidate(value, confidence)
+
+    def value(self, name: str) -> str:
+        candidate = self.found.get(name)
+        return candidate.value if candidate else ""
+
+    def confidence(self, name: str) -> float:
+        candidate = self.found.get(name)
+        return candidate.confidence if candidate else 0.0
+
+    def confidences(self) -> dict[str, float]:
+        return {name: candidate.confidence for name, candidate in self.found.items()}
+
+    def missing(self, required: tuple[str, ...] = REQUIRED, minimum: float | None = None) -> list[str]:
+        """Required fields that were not found or not confidently enough"""
+        minimum = MIN_CONFIDENCE if minimum is None else minimum
+        return [name for name in required if self.confidence(name) < minimum]
+
+
+@lru_cache(maxsize=1)
+def _gazetteer() -> re.Pattern:
+    """Pattern matching any spelling of a listed city"""
+    spellings: set[str] = set()
+    for line in CITIES_FILE.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            spellings.update(spelling.strip() for spelling in line.split("|"))
+    alternatives = "|".join(re.escape(spelling) for spelling in sorted(spellings, key=len, reverse=True))
+    return re.compile(rf"(?<![\w-])(?:{alternatives})(?![\w-])")
+
+
+def load_gazetteer() -> None:
+    """Read the city list now instead of on the first extraction"""
+    _gazetteer()
+
+
+def _postal_patterns(city: str) -> list[tuple[re.Pattern, float, bool]]:
+    """(pattern, confidence, whether the city comes first) of postal code and city"""
+    return [
+        # "03523 Berlin", "D-10115 Berlin", "75008 Paris"
+        (re.compile(rf"\b({_POSTAL_DE}) ({city})(?![\w-])"), 0.95, False),
+        # "8001 Zürich", "1010 Wien", "1012 AB Amsterdam"
+        (re.compile(rf"\b({_POSTAL_NL}|{_POSTAL_NUMERIC4}) ({city})(?![\w-])"), 0.9, False),
+        # "Austin, TX 78701"
+        (re.compile(rf"({city}),? [A-Z]{{2}} ({_POSTAL_US})\b"), 0.9, True),
+        # "London EC1A 1BB"
+        (re.compile(rf"({city}),? ({_POSTAL_UK})\b"), 0.9, True),
+    ]
+
+
+@lru_cache(maxsize=1)
+def _address_patterns() -> list[tuple[re.Pattern, float, bool]]:
+    cities = _gazetteer()
+    unknown = r"[A-ZÄÖÜ][a-zäöüß]+(?:[ -][A-ZÄÖÜ][a-zäöüß]+)?"
+    return _postal_patterns(cities.pattern) + [(re.compile(rf"\b({_POSTAL_DE}) ({unknown})\b"), 0.6, False)]
+
+
+def _clean_title(title: str) -> str:
+    return _TITLE_TAIL.sub("", title).strip()
+
+
+def _short(line: str) -> bool:
+    return 0 < len(line) <= 80 and len(line.split()) <= 8
+
+
+def _person(value: str) -> str:
+    match = _PERSON.search(value)
+    return match.group(1) if match else ""
+
+
+def _labeled(text: str, fields: HeuristicFields) -> None:
+    cities = _gazetteer()
+    for match in _LABELED.finditer(text):
+        label, value = match.group(1).lower(), match.group(2)
+        kind = _LABEL_FIELDS[label]
+        if kind in ("title", "company_name") and not _short(value):
+            continue  # "Role: you will build ..." is a sentence, not a title
+        if kind == "title":
+            fields.offer("title", _clean_title(value), 0.95)
+        elif kind == "company_name":
+            fields.offer("company_name", value, 0.95)
+        elif kind == "recruiter_name":
+            fields.offer("recruiter_name", _person(value), 0.9)
+        elif kind in ("address", "location"):
+            _address(value, fields, boost=0.05)
+            if city := cities.search(value):
+                fields.offer("company_city", city.group(), 0.9)
+
+
+def _address(text: str, fields: HeuristicFields, boost: float = 0.0) -> None:
+    for pattern, confidence, city_first in _address_patterns():
+        for match in pattern.finditer(text):
+            city, postal = match.groups() if city_first else reversed(match.groups())
+            fields.offer("company_postal_code", postal, confidence + boost)
+            fields.offer("company_city", city, confidence + boost)
+            # A street right in front of the postal code: "Mockers avenue 48, 03523 Berlin"
+            before = text[max(0, match.start() - 80) : match.start()]
+            streets = list(_STREET.finditer(before))
+            if streets and not before[streets[-1].end() :].strip(" ,"):
+                fields.offer("company_address", streets[-1].group(1), confidence + boost)
+    for match in _STREET.finditer(text):
+        fields.offer("company_address", match.group(1), 0.7 + boost)
+
+
+def _without_lead_words(name: str) -> list[str]:
+    words = name.split(" ")
+    while words and words[0] in _COMPANY_LEAD_WORDS:
+        words.pop(0)
+    return words
+
+
+def _attributive(text: str, match: re.Match) -> bool:
+    """Whether the company name matched qualifies a noun ("Join the Apple Inc. ecosystem")"""
+    following = _NEXT_WORD.match(text, match.end())
+    if following is None:
+        return False
+    if text[max(0, match.start() - 4) : match.start()].lower() == "the ":
+        return True
+    word = following.group(1)
+    return word not in _COMPANY_FOLLOWERS and not word.endswith("s")
+
+
+def _backed(text: str, match: re.Match, name: str, acting: str) -> bool:
+    """
+    Whether more than the legal form says `name` is the employer: it heads one of the first
+    HEAD_LINES lines (or stands on a short line there), a street address follows it on its line,
+    or it is the company the posting says is hiring. Clients and partners named in the body are not.
+    """
+    line_start = text.rfind("\n", 0, match.start()) + 1
+    line_end = text.find("\n", match.end())
+    line = text[line_start : len(text) if line_end == -1 else line_end]
+    if acting and (acting in name or name in acting):
+        return True
+    if _STREET.search(line, match.end() - line_start):
+        return True
+    heading = sum(1 for previous in text[:line_start].splitlines() if previous.strip()) < HEAD_LINES
+    return heading and (_short(line.strip()) or not text[line_start : match.start()].strip())
+
+
+def _company(text: str, fields: HeuristicFields) -> None:
+    # "SomeCorp is looking for"
+    acting = ""
+    for match in _COMPANY_ACTS.finditer(text):
+        if words := _without_lead_words(match.group(1)):
+            acting = " ".join(words)
+            fields.offer("company_name", acting, 0.75)
+            break
+    # "SomeCorp Ltd": the name with its legal form, which alone is no name. Confident only when
+    # something backs it up; otherwise the first one found, below MIN_CONFIDENCE
+    first = ""
+    for match in _COMPANY.finditer(text):
+        words = _without_lead_words(match.group(0))
+        if len(words) < 2 or _attributive(text, match):
+            continue
+        name = " ".join(words)
+        if _backed(text, match, name, acting):
+            fields.offer("company_name", name, 0.9)
+            return
+        first = first or name
+    if first:
+        fields.offer("company_name", first, 0.7)
+
+
+def _title(text: str, fields: HeuristicFields) -> None:
+    match = _TITLE_AFTER_VERB.search(text)
+    if match:
+        words = match.group(1).split(" ")
+        # "an experienced Python Engineer": the title starts with the first capitalized word
+        while len(words) > 1 and words[0].islower() and any(word[0].isupper() for word in words[1:]):
+            words.pop(0)
+        fields.offer("title", " ".join(words), 0.85)
+    # A short heading-like line near the top naming a role: "Senior Python Engineer (m/w/d)",
+    # most likely the title when it is the very first line
+    for number, line in enumerate(text.strip().splitlines()[:8]):
+        line = _clean_title(line.strip())
+        if _short(line) and _ROLE_NOUN.search(line) and not line.endswith("."):
+            fields.offer("title", line, 0.9 if number == 0 else 0.8)
+            break
+
+
+def _recruiter(text: str, fields: HeuristicFields) -> None:
+    match = _RECRUITER_PHRASE.search(text)
+    if match:
+        fields.offer("recruiter_name", match.group(1), 0.75)
+
+
+def description(text: str) -> str:
+    """
+    The posting text from its first description section heading on (all of it without one),
+    cut to MAX_DESCRIPTION characters at a line end where possible.
+    """
+    match = _SECTION.search(text)
+    text = (text[match.start() :] if match else text).strip()
+    if len(text) > MAX_DESCRIPTION:
+        cut = text.rfind("\n", 0, MAX_DESCRIPTION + 1)
+        text = text[: cut if cut > MAX_DESCRIPTION // 2 else MAX_DESCRIPTION].rstrip()
+    return text
+
+
+@spanned("heuristics")
+def extract_fields(text: str) -> HeuristicFields:
+    """Structured job description fields found in `text` by the rules, with confidences"""
+    fields = HeuristicFields()
+    if len(text) > MAX_SCAN:
+        text = text[: MAX_SCAN // 2] + "\n" + text[-MAX_SCAN // 2 :]
+    _labeled(text, fields)
+    _address(text, fields)
+    _company(text, fields)
+    _title(text, fields)
+    _recruiter(text, fields)
+    return fields
@@ -0,0 +1,107 @@
+"""
+Bulk extraction of job descriptions from many links and texts (e.g. an imported spreadsheet).
+
+Every input goes through two stages: links are fetched (at most `FETCH_CONCURRENCY` at a time,
+on top of the fetcher's per-host limit), then every posting text is parsed by the AI model (at
+most `PARSE_CONCURRENCY` at a time, on threads). The stages overlap: parsing starts on the
+first fetched posting while the others are still downloading. Results are yielded as they
+complete, not in input order.
+
+Identical inputs (after trimming whitespace) are processed once and reported with all their
+positions. A failing input yields an error entry; the other inputs are not affected.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Sequence
+
+from loguru import logger
+
+from .job_description import job_description_from_posting, job_description_from_text, text_job_position_from_link
+
+FETCH_CONCURRENCY = int(os.getenv("JOB_INGEST_FETCH_CONCURRENCY", "8"))
+PARSE_CONCURRENCY = int(os.getenv("JOB_INGEST_PARSE_CONCURRENCY", "4"))
+
+
+@dataclass
+class IngestStats:
+    """Totals of one bulk extraction, reported as its last line"""
+
+    items: int = 0
+    unique: int = 0
+    parsed: int = 0
+    errors: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "items": self.items,
+            "unique": self.unique,
+            "parsed": self.parsed,
+            "errors": self.errors,
+            "seconds": round(time.perf_counter() - self.started, 3),
+        }
+
+
+def is_link(item: str) -> bool:
+    return item.startswith("https://") or item.startswith("http://")
+
+
+def dedupe(items: Sequence[str]) -> dict[str, list[int]]:
+    """Distinct trimmed inputs with the positions they occur at, in order of first occurrence"""
+    positions: dict[str, list[int]] = {}
+    for index, item in enumerate(items):
+        positions.setdefault(item.strip(), []).append(index)
+    return positions
+
+
+async def extract_job_descriptions(
+    items: Sequence[str],
+    fetch_concurrency: int | None = None,
+    parse_concurrency: int | None = None,
+    stats: IngestStats | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Job descriptions of `items` (links or texts) as they complete:
+    {"indices": [...], "job_description": {...}, "extracted_by": "..."} or {"indices": [...], "error": "..."}.
+    """
+    stats = stats if stats is not None else IngestStats()
+    fetching = asyncio.Semaphore(fetch_concurrency or FETCH_CONCURRENCY)
+    parsing = asyncio.Semaphore(parse_concurrency or PARSE_CONCURRENCY)
+
+    async def extract(item: str, indices: list[int]) -> dict[str, Any]:
+        try:
+            if not item:
+                raise ValueError("empty job description")
+            if is_link(item):
+                async with fetching:
+                    text = await text_job_position_from_link(item)
+                async with parsing:
+                    job_description = await job_description_from_posting(text)
+            else:
+                async with parsing:
+                    job_description = await asyncio.to_thread(job_description_from_text, item)
+        except ValueError as e:  # FetchError included
+            stats.errors += 1
+            return {"indices": indices, "error": str(e)}
+        except Exception as e:
+            logger.exception(f"Extracting job description {indices} failed")
+            stats.errors += 1
+            return {"indices": indices, "error": f"unexpected error: {e.__class__.__name__}"}
+        stats.parsed += 1
+        return {
+            "indices": indices,
+            "job_description": job_description.model_dump(),
+            "extracted_by": job_description._extracted_by,
+        }
+
+    positions = dedupe(items)
+    stats.items, stats.unique = len(items), len(positions)
+    tasks = [asyncio.create_task(extract(item, indices)) for item, indices in positions.items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,285 @@
+"""
+Vectorized ranking of stored job postings against a profile.
+
+Every posting is turned into a signed, hashed term-frequency vector (a fixed number of
+buckets, so no vocabulary has to be kept around) and stored as one row of a per-profile
+NumPy matrix. Ranking is a single matrix-vector product plus a partial sort, so answering
+"which jobs fit me best" stays well under a second even for ten thousand saved postings.
+The matrix is updated in place whenever a posting is stored or deleted; an optional AI
+re-rank is only ever applied to the first few results.
+
+With several worker processes, every write bumps the profile's shared generation
+(`shared_cache.invalidate`), so the other workers rebuild their copy of the index on its next use.
+"""
+import math
+import re
+import threading
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Callable
+
+import numpy as np
+from database.db_interface import Education, Experience, JobPosting, Profile
+from loguru import logger
+
+from . import shared_cache
+from .ai_api import request_model
+from .prompt_fragments import format_experience, format_profile_summary
+
+N_FEATURES = 1024  # must be a power of two, see _hash_term
+RERANK_DESCRIPTION_CHARS = 600
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+(?:\.[a-z0-9+#]+)*")
+_STOP_WORDS = frozenset(
+    """
+    a about an and are as at be been but by can do for from has have i if in into is it its
+    of on or our so than that the their them then there these they this to up us we were what
+    when which who will with you your
+    """.split()
+)
+
+
+@lru_cache(maxsize=65536)
+def _hash_term(term: str) -> tuple[int, float]:
+    """Map a term to a (bucket, sign) pair; crc32 keeps it stable across processes."""
+    digest = zlib.crc32(term.encode("utf-8"))
+    return digest & (N_FEATURES - 1), (1.0 if digest & 0x80000000 else -1.0)
+
+
+def _terms(text: str) -> list[str]:
+    """Lowercased unigrams plus bigrams of neighbouring non-stop-words"""
+    tokens = [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOP_WORDS]
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+
+def vectorize(text: str) -> np.ndarray:
+    """Return the L2-normalized hashed term vector of `text` (all zeros for empty text)."""
+    vector = np.zeros(N_FEATURES, dtype=np.float32)
+    counts = Counter(_terms(text or ""))
+    if not counts:
+        return vector
+
+    indices = np.empty(len(counts), dtype=np.intp)
+    weights = np.empty(len(counts), dtype=np.float32)
+    for position, (term, frequency) in enumerate(counts.items()):
+        bucket, sign = _hash_term(term)
+        indices[position] = bucket
+        weights[position] = sign * (1.0 + math.log(frequency))  # sublinear tf
+
+    np.add.at(vector, indices, weights)
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def job_posting_text(job_posting: JobPosting) -> str:
+    """Text of a stored posting that takes part in the ranking"""
+    return "\n".join(
+        part for part in (job_posting.title, job_posting.company_name, job_posting.description) if part
+    )
+
+
+def profile_text(profile: Profile, educations: list[Education], experiences: list[Experience]) -> str:
+    """Text describing the candidate, used as the ranking query"""
+    parts = [profile.about_me or ""]
+    for exp in experiences:
+        parts.append(exp.job_title or "")
+        parts.append(exp.description or "")
+    for edu in educations:
+        parts.append(edu.degree or "")
+        parts.append(edu.additional_info or "")
+    return "\n".join(part for part in parts if part)
+
+
+class JobPostingIndex:
+    """Matrix of posting vectors for one profile, one row per posting."""
+
+    def __init__(self, n_features: int = N_FEATURES, capacity: int = 64):
+        self._matrix = np.zeros((capacity, n_features), dtype=np.float32)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._rows: dict[int, int] = {}
+        self._size = 0
+        self.generation = 0  # shared generation of the profile's postings the index reflects
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, job_posting_id: int) -> bool:
+        return job_posting_id in self._rows
+
+    def add(self, job_posting_id: int, vector: np.ndarray) -> None:
+        """Insert or replace the vector of a posting (amortized O(1))."""
+        row = self._rows.get(job_posting_id)
+        if row is None:
+            if self._size == len(self._ids):
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._rows[job_posting_id] = row
+            self._ids[row] = job_posting_id
+        self._matrix[row] = vector
+
+    def remove(self, job_posting_id: int) -> bool:
+        """Drop a posting by moving the last row into its place."""
+        row = self._rows.pop(job_posting_id, None)
+        if row is None:
+            return False
+
+        last = self._size - 1
+        if row != last:
+            moved_id = int(self._ids[last])
+            self._matrix[row] = self._matrix[last]
+            self._ids[row] = moved_id
+            self._rows[moved_id] = row
+        self._matrix[last] = 0.0
+        self._size = last
+        return True
+
+    def top_k(self, query: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """Return up to `k` (job_posting_id, score) pairs, best match first."""
+        if self._size == 0 or k <= 0:
+            return []
+
+        scores = self._matrix[: self._size] @ query
+        k = min(k, self._size)
+        if k < self._size:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(self._size)
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(self._ids[row]), max(0.0, float(scores[row]))) for row in order]
+
+    def _grow(self) -> None:
+        capacity = max(1, len(self._ids)) * 2
+        matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32)
+        matrix[: self._size] = self._matrix[: self._size]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[: self._size] = self._ids[: self._size]
+        self._matrix, self._ids = matrix, ids
+
+
+def build_job_posting_index(job_postings: list[JobPosting]) -> JobPostingIndex:
+    index = JobPostingIndex(capacity=max(64, len(job_postings)))
+    for job_posting in job_postings:
+        index.add(job_posting.id, vectorize(job_posting_text(job_posting)))
+    return index
+
+
+# Per-profile indexes of this process, built lazily on the first ranking request
+_indexes: dict[int, JobPostingIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _scope(profile_id: int) -> str:
+    return f"job-postings:{profile_id}"
+
+
+def _update_existing(profile_id: int, update: Callable[[JobPostingIndex], object] | None) -> None:
+    """Apply a write to the profile's index, or drop the index if other workers wrote in between."""
+    generation = shared_cache.invalidate(_scope(profile_id))
+    with _indexes_lock:
+        index = _indexes.get(profile_id)
+        if index is None:
+            return
+        if update is None or index.generation != generation - 1:
+            del _indexes[profile_id]
+            return
+        update(index)
+        index.generation = generation
+
+
+def index_job_posting(job_posting: JobPosting) -> None:
+    """Add a freshly stored posting to its profile's index (if the index was built already)."""
+    vector = vectorize(job_posting_text(job_posting))
+    _update_existing(job_posting.profile_id, lambda index: index.add(job_posting.id, vector))
+
+
+def remove_job_posting(profile_id: int, job_posting_id: int) -> None:
+    _update_existing(profile_id, lambda index: index.remove(job_posting_id))
+
+
+def drop_job_posting_index(profile_id: int) -> None:
+    _update_existing(profile_id, None)
+
+
+def rank_job_postings(
+    profile: Profile,
+    educations: list[Education],
+    experiences: list[Experience],
+    posting_count: int,
+    load_postings: Callable[[], list[JobPosting]],
+    top_k: int = 10,
+) -> list[tuple[int, float]]:
+    """
+    Rank all stored postings of the profile by similarity to the candidate.
+    `posting_count` is the number of postings in the db; when the cached index
+    disagrees with it or is older than the shared generation (cold start, writes from
+    elsewhere or in another worker) it is rebuilt from `load_postings()`.
+    Returns (job_posting_id, score) pairs, best match first.
+    """
+    generation = shared_cache.generation(_scope(profile.id))
+    with _indexes_lock:
+        index = _indexes.get(profile.id)
+
+    if index is None or len(index) != posting_count or index.generation != generation or generation < 0:
+        logger.info(f"Building job posting index for profile {profile.id} ({posting_count} postings)")
+        index = build_job_posting_index(load_postings())
+        index.generation = generation
+        with _indexes_lock:
+            _indexes[profile.id] = index
+
+    query = vectorize(profile_text(profile, educations, experiences))
+    with _indexes_lock:
+        return index.top_k(query, top_k)
+
+
+def rerank_job_postings(
+    profile: Profile,
+    experiences: list[Experience],
+    job_postings: list[JobPosting],
+) -> list[JobPosting] | None:
+    """
+    Ask the AI model to re-order a handful of already shortlisted postings.
+    Returns the postings in the new order, or None if the model is unavailable
+    or its answer can not be understood.
+    """
+    if len(job_postings) < 2:
+        return None
+
+    postings_text = "\n".join(
+        f"[{number}] {posting.title} at {posting.company_name}: "
+        f"{(posting.description or '')[:RERANK_DESCRIPTION_CHARS]}"
+        for number, posting in enumerate(job_postings, start=1)
+    )
+    prompt = f"""
+    Rank the following job postings by how well they fit this candidate, best fit first.
+
+    Candidate Information:
+    {format_profile_summary(profile)}
+
+    Experience:
+    {format_experience(experiences)}
+
+    Job postings:
+    {postings_text}
+
+    Respond with ONLY the posting numbers, best fit first, separated by commas (for example: 2, 1, 3).
+    """
+
+    response = request_model(prompt, feature="job_ranking")
+    if not response:
+        return None
+
+    order: list[int] = []
+    for number in re.findall(r"\d+", response):
+        position = int(number) - 1
+        if 0 <= position < len(job_postings) and position not in order:
+            order.append(position)
+    if not order:
+        logger.warning(f"Could not parse job posting re-rank response: {response}")
+        return None
+
+    order += [position for position in range(len(job_postings)) if position not in order]
+    return [job_postings[position] for position in order]
@@ -0,0 +1,205 @@
+"""
+Compiled cover letter templates from the `templates/` directory.
+
+Every `*.txt` file under `templates/` is parsed once into a list of lines made of literal
+text and field names, so that rendering a letter is a handful of dict lookups and one join -
+no parsing, no AI model. A template is compiled the first time it is used; the warm-up
+compiles all of them ahead of time via `load_templates()`.
+Lines that contain fields and end up with nothing but whitespace and punctuation
+(for example an empty company address) are dropped from the output, and a separator
+between two fields (`{company_city}, {company_postal_code}`) is dropped with an empty field.
+
+The field names are documented in `templates/README.md`; the content blocks
+(`why_interested`, `key_achievements`, ...) are derived locally from the profile,
+its experience entries and the job description.
+"""
+import re
+import string
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+from database.db_interface import Experience, Profile
+from models import JobDescriptionResponse
+
+from .skills_index import extract_job_requirements, extract_skills
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+DEFAULT_TEMPLATE = "cover_letter_basic"
+
+# Cover letter style -> template name; styles without an own template use DEFAULT_TEMPLATE
+STYLE_TEMPLATES = {
+    "professional": "cover_letter_basic",
+    "creative": "cover_letter_creative",
+    "technical": "cover_letter_technical",
+}
+
+_BLANK_LINE_RE = re.compile(r"^[\s,.;:-]*$")
+_SEPARATOR_RE = re.compile(r"^\s*[,;/|-]\s*$")
+_FIRST_SENTENCE_RE = re.compile(r"^(.+?[.!?])(?:\s|$)", re.DOTALL)
+
+
+class CompiledTemplate:
+    """A template split into lines of (literal, field name or None) segments."""
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.lines: list[tuple[tuple[tuple[str, str | None], ...], bool]] = []
+        fields = set()
+        for line in text.split("\n"):
+            segments = []
+            for literal, field_name, format_spec, conversion in string.Formatter().parse(line):
+                if format_spec or conversion:
+                    raise ValueError(f"Template {name}: format specs are not supported ({field_name})")
+                segments.append((literal, field_name or None))
+                if field_name:
+                    fields.add(field_name)
+            self.lines.append((tuple(segments), any(field for _, field in segments)))
+        self.fields = frozenset(fields)
+
+    def render(self, values: dict[str, str]) -> str:
+        """Substitute `values` (missing fields render empty) and drop lines left without content."""
+        rendered = []
+        for segments, has_fields in self.lines:
+            if not has_fields:
+                rendered.append("".join(literal for literal, _ in segments))
+                continue
+            line = self._render_line(segments, values)
+            if not _BLANK_LINE_RE.match(line):
+                rendered.append(line.rstrip())
+        return "\n".join(rendered)
+
+    @staticmethod
+    def _render_line(segments: tuple[tuple[str, str | None], ...], values: dict[str, str]) -> str:
+        parts = []
+        filled = False  # a field before this one, after the last plain literal, has a value
+        for position, (literal, field) in enumerate(segments):
+            value = values.get(field, "") if field else ""
+            if position and field and _SEPARATOR_RE.match(literal):
+                # "{city}, {zip}" renders "Oslo" rather than "Oslo," when the postal code is missing
+                if not (filled and value):
+                    literal = ""
+            elif literal:
+                filled = False
+            parts.append(literal)
+            parts.append(value)
+            filled = filled or bool(value)
+        return "".join(parts)
+
+
+@lru_cache(maxsize=None)
+def _compile(name: str) -> CompiledTemplate | None:
+    path = TEMPLATES_DIR / f"{name}.txt"
+    return CompiledTemplate(name, path.read_text(encoding="utf-8")) if path.is_file() else None
+
+
+def load_templates() -> dict[str, CompiledTemplate]:
+    """Read and compile all templates; each is compiled once for the lifetime of the process."""
+    return {path.stem: _compile(path.stem) for path in sorted(TEMPLATES_DIR.glob("*.txt"))}
+
+
+def get_template(style: str = "professional") -> CompiledTemplate:
+    """Template of `style`, compiled on first use"""
+    return _compile(STYLE_TEMPLATES.get(style, DEFAULT_TEMPLATE)) or _compile(DEFAULT_TEMPLATE)
+
+
+def _join(items: list[str]) -> str:
+    if len(items) < 2:
+        return "".join(items)
+    return f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+def _first_sentence(text: str) -> str:
+    text = " ".join(text.split())
+    match = _FIRST_SENTENCE_RE.match(text)
+    return match.group(1) if match else f"{text}."
+
+
+def _latest_experience(experiences: list[Experience]) -> Experience | None:
+    if not experiences:
+        return None
+    # Entries without an end date are the current positions
+    return max(experiences, key=lambda exp: (exp.end_date is None, exp.end_date or exp.start_date))
+
+
+def cover_letter_fields(
+    profile: Profile,
+    job_description: JobDescriptionResponse,
+    experiences: list[Experience] | None = None,
+    notes: str = "",
+) -> dict[str, str]:
+    """All template fields (see `templates/README.md`) derived from the profile and the job"""
+    experiences = experiences or []
+    company_name = job_description.company_name or "your company"
+    job_title = job_description.title or "advertised"
+
+    requirements = extract_job_requirements(job_description)
+    profile_skills = extract_skills(profile.about_me, strict=False) | {
+        skill
+        for exp in experiences
+        for skill in extract_skills(f"{exp.job_title or ''}\n{exp.description or ''}", strict=False)
+    }
+    # Must-haves first, then alphabetically
+    required = sorted(requirements, key=lambda skill: (not requirements[skill], skill))
+    matching = [skill for skill in required if skill in profile_skills]
+
+    focus = required[:3]
+    why_interested = f"The role at {company_name} caught my attention"
+    why_interested += f" because of its focus on {_join(focus)}." if focus else " because it matches what I want to do next."
+
+    latest = _latest_experience(experiences)
+    if latest is None:
+        current_position_description = "looking for my next position"
+    elif latest.end_date is None:
+        current_position_description = f"working as a {latest.job_title} at {latest.company}"
+    else:
+        current_position_description = f"finishing my time as a {latest.job_title} at {latest.company}"
+
+    # Whole sentences: the description is quoted as written, not fitted into a verb phrase
+    if latest is not None and latest.description:
+        key_achievements = f"A highlight of my work at {latest.company}: {_first_sentence(latest.description)}"
+    else:
+        key_achievements = "During my work, I have built up experience that is directly relevant to this role."
+
+    if matching:
+        technical_skills_description = f"My experience with {_join(matching[:5])} matches what you are looking for."
+    else:
+        technical_skills_description = ""
+
+    why_good_candidate = " ".join(
+        part
+        for part in (
+            (profile.about_me or "").strip(),
+            notes.strip(),
+        )
+        if part
+    ) or f"I am confident that I can make a meaningful contribution as {job_title} at {company_name}."
+
+    return {
+        "current_date": datetime.now().strftime("%d/%m/%Y"),
+        "company_name": company_name,
+        "company_address": job_description.company_address or "",
+        "company_city": job_description.company_city or "",
+        "company_postal_code": job_description.company_postal_code or "",
+        "recruiter_name": job_description.recruiter_name or "Hiring Manager",
+        "job_title": job_title,
+        "applicant_full_name": f"{profile.first_name} {profile.last_name}",
+        "applicant_phone": profile.phone or "",
+        "applicant_email": profile.email or "",
+        "why_interested": why_interested,
+        "current_position_description": current_position_description,
+        "key_achievements": key_achievements,
+        "technical_skills_description": technical_skills_description,
+        "why_good_candidate": why_good_candidate,
+    }
+
+
+def render_cover_letter(
+    profile: Profile,
+    job_description: JobDescriptionResponse,
+    style: str = "professional",
+    notes: str = "",
+    experiences: list[Experience] | None = None,
+) -> str:
+    """Cover letter rendered from the template of `style`, without the AI model"""
+    return get_template(style).render(cover_letter_fields(profile, job_description, experiences, notes))
@@ -0,0 +1,71 @@
+"""
+Logging setup: a non-blocking loguru sink and short, structured log lines.
+
+`configure()` (called once by `main.py`) replaces loguru's default handler with one that is
+`enqueue`d: a log call only puts the record on a queue and a background thread formats and
+writes it, so a slow terminal or log collector never holds up a request. `LOG_LEVEL` sets the
+level (INFO) and `LOG_JSON=1` writes one JSON object per line, including the bound fields
+(`feature`, `profile_id`, `latency_ms`, `prompt_tokens`, ...), instead of text.
+
+Prompts, AI answers and generated documents are never logged whole by default: `payload()`
+gives their length, a short hash (to match identical prompts) and the first
+`LOG_PAYLOAD_CHARS` characters (200); `LOG_PAYLOAD_MODE=hash` leaves the text out entirely.
+A fraction `LOG_PAYLOAD_SAMPLE_RATE` (default 0) of the payloads is logged in full. Log them
+lazily, so nothing is formatted when the level is disabled:
+
+    logger.opt(lazy=True).info("Review prompt: {}", lambda: payload(prompt))
+"""
+import hashlib
+import os
+import random
+import sys
+from typing import Any, TextIO
+
+from loguru import logger
+
+LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+JSON = os.getenv("LOG_JSON", "0").lower() in ("1", "true", "yes")
+PAYLOAD_MODE = os.getenv("LOG_PAYLOAD_MODE", "truncate").lower()  # "truncate", "hash" or "full"
+PAYLOAD_CHARS = int(os.getenv("LOG_PAYLOAD_CHARS", "200"))
+PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0"))
+
+_TEXT_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+)
+
+
+def _text_format(record: dict[str, Any]) -> str:
+    # Bound fields follow the message as key=value pairs
+    fields = " ".join(f"{key}={{extra[{key}]}}" for key in record["extra"])
+    return _TEXT_FORMAT + (f" | {fields}" if fields else "") + "\n{exception}"
+
+
+def configure(
+    sink: TextIO | None = None, level: str | None = None, json: bool | None = None, enqueue: bool = True
+) -> int:
+    """Replace all loguru handlers with one (enqueued) handler; returns its id"""
+    logger.remove()
+    return logger.add(
+        sink if sink is not None else sys.stderr,
+        level=level or LEVEL,
+        serialize=JSON if json is None else json,
+        format=_text_format,
+        enqueue=enqueue,
+        backtrace=False,
+        diagnose=False,  # variable values in tracebacks may contain personal data
+    )
+
+
+def payload(text: str | None) -> str:
+    """Short description of a prompt or answer for the log (see the module docstring)"""
+    if text is None:
+        return "<none>"
+    if PAYLOAD_MODE == "full" or (PAYLOAD_SAMPLE_RATE > 0 and random.random() < PAYLOAD_SAMPLE_RATE):
+        return text
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+    if PAYLOAD_MODE == "hash":
+        return f"<{len(text)} chars, sha256 {digest}>"
+    preview = text[:PAYLOAD_CHARS].replace("\n", "\\n")
+    more = "..." if len(text) > PAYLOAD_CHARS else ""
+    return f"<{len(text)} chars, sha256 {digest}> {preview}{more}"
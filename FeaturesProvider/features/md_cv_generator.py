@@ -2,8 +2,10 @@ from database.db_interface import Education, Experience, Profile
 from loguru import logger
 from models import GeneratedCV, JobDescriptionResponse
 
+from . import metrics
 from .ai_api import request_model
-from .review_user_application import _format_education, _format_experience
+from .prompt_fragments import format_education, format_experience, format_shared_prefix
+from .pseudonyms import for_profile
 
 
 def md_cv_from_user_and_job(
@@ -22,31 +24,10 @@ def md_cv_from_user_and_job(
     """
 
     # Create a comprehensive prompt for the AI model
-    prompt = f"""
-    Create a professional, tailored Markdown CV for a job application based on the following information:
-    
-    CANDIDATE INFORMATION:
-    Full Name: {profile.first_name} {profile.last_name}
-    Email: {profile.email}
-    Location: {profile.city or ""}, {profile.state or ""}, {profile.country or ""}
-    Phone: {profile.phone or "Not provided"}
-    LinkedIn: {profile.linkedin_url or "Not provided"}
-    GitHub: {profile.github_url or "Not provided"}
-    Personal Website: {profile.personal_website or "Not provided"}
-    Other URL: {profile.other_url or "Not provided"}
-    About Me: {profile.about_me or "Not provided"}
-    
-    EDUCATION:
-    {_format_education(educations)}
-    
-    WORK EXPERIENCE:
-    {_format_experience(experiences)}
-    
-    TARGET JOB:
-    Company: {job_description.company_name}
-    Position: {job_description.title}
-    Job Description: {job_description.description}
-    
+    shared_prefix = format_shared_prefix(profile, educations, experiences, job_description)
+    prompt = """
+    Create a professional, tailored Markdown CV for a job application based on the candidate and job information above.
+
     INSTRUCTIONS:
     1. Create a professional-looking Markdown CV tailored specifically for this job position.
     2. Highlight skills and experiences that are most relevant to the job description.
@@ -60,11 +41,12 @@ def md_cv_from_user_and_job(
     """
 
     # Call the AI model
-    cv_text = request_model(prompt)
+    cv_text = request_model(prompt, shared_prefix=shared_prefix, feature="cv", pseudonyms=for_profile(profile))
 
     # Handle potential API failures
     if not cv_text:
         logger.warning("AI model failed to generate CV, using fallback template")
+        metrics.fallback("cv", "ai_unavailable")
         # Provide a basic fallback template
         cv_text = f"""# {profile.first_name} {profile.last_name}
 
@@ -80,10 +62,10 @@ def md_cv_from_user_and_job(
 {profile.about_me or "Professional looking to contribute skills and experience to a new opportunity."}
 
 ## Education
-{_format_education(educations)}
+{format_education(educations)}
 
 ## Work Experience
-{_format_experience(experiences)}
+{format_experience(experiences)}
 
 ## Skills
 - Technical skills relevant to {job_description.title}
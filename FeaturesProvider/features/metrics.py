@@ -0,0 +1,359 @@
+"""
+Prometheus metrics, served as text at `/metrics`.
+
+A deliberately small implementation of counters, gauges and histograms (no client library):
+recording a value is a dict lookup and a few additions under a lock, cheap enough to stay
+on in production (`python -m benchmarks.bench_metrics` measures the cost per request).
+Labels are passed positionally, in the order of the metric's `labelnames`.
+
+Recorded here:
+- HTTP requests per route template, method and status (`MetricsMiddleware`), plus the
+  requests in progress;
+- AI model calls per feature, model and outcome, plus the calls in progress (`ai_api`);
+- tokens of those calls per feature: prompt, cached (prompt tokens the provider served from
+  its prompt cache) and completion tokens, as reported in the responses' `usage`;
+- fallbacks to a generic or template result per feature and reason;
+- database statements per kind (SQLAlchemy engine events, `instrument_database()`).
+
+With several worker processes (`WEB_CONCURRENCY` > 1) every worker writes its values to
+`METRICS_DIR` every `METRICS_FLUSH_INTERVAL` seconds (and when it is scraped), and `/metrics`
+adds up the values of all running workers.
+"""
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from loguru import logger
+
+from . import profiling
+
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+METRICS_DIR = os.getenv(
+    "METRICS_DIR", os.path.join(tempfile.gettempdir(), "trackmyoffer-metrics") if WORKERS > 1 else ""
+)
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+AI_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+_registry: dict[str, "_Metric"] = {}
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def snapshot(self) -> dict[tuple[str, ...], float | list[float]]:
+        with self._lock:
+            return {labels: list(value) if isinstance(value, list) else value for labels, value in self._values.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def value(self, *labels: str) -> float:
+        """Current value (for a histogram: the number of observations)"""
+        with self._lock:
+            value = self._values.get(labels, 0.0)
+        return value[-1] if isinstance(value, list) else value
+
+    def samples(self, labels: tuple[str, ...], value) -> Iterator[str]:
+        yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    @contextmanager
+    def track(self, *labels: str) -> Iterator[None]:
+        """Count the block as in progress while it runs"""
+        self.inc(*labels)
+        try:
+            yield
+        finally:
+            self.dec(*labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=HTTP_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, amount: float, *labels: str) -> None:
+        # Per label set: a count per bucket (not cumulative), then the sum, then the count
+        index = bisect.bisect_left(self.buckets, amount)
+        with self._lock:
+            values = self._values.get(labels)
+            if values is None:
+                values = self._values[labels] = [0.0] * (len(self.buckets) + 3)
+            values[index] += 1
+            values[-2] += amount
+            values[-1] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self, labels: tuple[str, ...], value) -> Iterator[str]:
+        cumulative = 0.0
+        for bound, count in zip(self.buckets + (float("inf"),), value):
+            cumulative += count
+            le = _labels(self.labelnames + ("le",), labels + ("+Inf" if bound == float("inf") else _number(bound),))
+            yield f"{self.name}_bucket{le} {_number(cumulative)}"
+        yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(value[-2])}"
+        yield f"{self.name}_count{_labels(self.labelnames, labels)} {_number(value[-1])}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+HTTP_REQUESTS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being handled", ("method",))
+AI_REQUESTS = Histogram(
+    "ai_request_duration_seconds", "AI model call latency by feature", ("feature", "model", "outcome"), AI_BUCKETS
+)
+AI_IN_PROGRESS = Gauge("ai_requests_in_progress", "AI model calls waiting for an answer", ("feature",))
+AI_TOKENS = Counter(
+    "ai_tokens_total", "Tokens of AI model calls by feature and kind (prompt, cached, completion)", ("feature", "kind")
+)
+FALLBACKS = Counter(
+    "feature_fallbacks_total", "Generic or template results instead of the AI answer", ("feature", "reason")
+)
+DB_QUERIES = Histogram("db_query_duration_seconds", "Database statement latency by kind", ("statement",), DB_BUCKETS)
+DB_ERRORS = Counter("db_query_errors_total", "Database statements that failed", ("statement",))
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by its route template ("/api/profile/{profile_id}")"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"  # unless a response is started
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_PROGRESS.dec(method)
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.observe(time.perf_counter() - started, method, route, status)
+
+
+def fallback(feature: str, reason: str) -> None:
+    """Count a fallback result of `feature` ("ai_unavailable", "unparsable", ...)"""
+    FALLBACKS.inc(feature, reason)
+
+
+def ai_usage(feature: str, usage: dict | None) -> None:
+    """Count the tokens of the `usage` block of an AI model response"""
+    if not usage:
+        return
+    AI_TOKENS.inc(feature, "prompt", amount=usage.get("prompt_tokens") or 0)
+    AI_TOKENS.inc(feature, "cached", amount=(usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0)
+    AI_TOKENS.inc(feature, "completion", amount=usage.get("completion_tokens") or 0)
+
+
+_STATEMENT_KINDS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "CREATE", "DROP", "ALTER", "PRAGMA"})
+
+
+def _statement_kind(statement: str) -> str:
+    word = statement.lstrip()[:6].upper()
+    return word if word in _STATEMENT_KINDS else "OTHER"
+
+
+def instrument_database() -> None:
+    """Time every statement of every SQLAlchemy engine (idempotent)"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.get("metrics_started")
+    if started:
+        start = started.pop()
+        elapsed = time.perf_counter() - start
+        DB_QUERIES.observe(elapsed, _statement_kind(statement))
+        profiling.record("db", start, elapsed)
+
+
+def _handle_error(exception_context) -> None:
+    conn = exception_context.connection
+    started = conn.info.get("metrics_started") if conn is not None else None
+    if started:
+        started.pop()
+    DB_ERRORS.inc(_statement_kind(exception_context.statement or ""))
+
+
+def snapshot() -> dict[str, dict[tuple[str, ...], float | list[float]]]:
+    return {name: metric.snapshot() for name, metric in _registry.items()}
+
+
+def reset() -> None:
+    for metric in _registry.values():
+        metric.reset()
+
+
+def render(snapshots: list[dict[str, dict]] | None = None) -> str:
+    """Prometheus text exposition of this process's metrics, or of the sum of `snapshots`"""
+    merged = snapshot() if snapshots is None else _merge(snapshots)
+    lines = []
+    for name, metric in _registry.items():
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for labels, value in sorted(merged.get(name, {}).items()):
+            lines.extend(metric.samples(labels, value))
+    return "\n".join(lines) + "\n"
+
+
+def _merge(snapshots: list[dict[str, dict]]) -> dict[str, dict]:
+    merged: dict[str, dict] = {}
+    for values in snapshots:
+        for name, samples in values.items():
+            target = merged.setdefault(name, {})
+            for labels, value in samples.items():
+                current = target.get(labels)
+                if current is None:
+                    target[labels] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    target[labels] = [a + b for a, b in zip(current, value)]
+                else:
+                    target[labels] = current + value
+    return merged
+
+
+# Workers' files: METRICS_DIR/<pid>.json, written by a daemon thread of each worker
+_flusher: threading.Thread | None = None
+_flusher_lock = threading.Lock()
+
+
+def _write_snapshot(directory: str) -> None:
+    data = {name: [[list(labels), value] for labels, value in values.items()] for name, values in snapshot().items()}
+    path = Path(directory, f"{os.getpid()}.json")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(temporary, path)
+    except OSError as e:
+        logger.warning(f"Could not write metrics to {path}: {e}")
+
+
+def _read_snapshots(directory: str) -> list[dict[str, dict]]:
+    snapshots = []
+    for path in Path(directory).glob("*.json"):
+        try:
+            os.kill(int(path.stem), 0)  # only workers that are still running
+        except (ValueError, ProcessLookupError):
+            continue
+        except PermissionError:
+            pass
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        snapshots.append(
+            {
+                name: {tuple(labels): value for labels, value in samples}
+                for name, samples in data.items()
+                if name in _registry
+            }
+        )
+    return snapshots
+
+
+def _flush_forever(directory: str) -> None:
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        _write_snapshot(directory)
+
+
+def start_flushing() -> None:
+    """Share this worker's metrics with the others (only with a METRICS_DIR; once per process)"""
+    global _flusher
+    if not METRICS_DIR:
+        return
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_forever, args=(METRICS_DIR,), name="metrics-flush", daemon=True)
+            _flusher.start()
+
+
+def exposition() -> str:
+    """Text served at /metrics: all workers' metrics when they share a METRICS_DIR"""
+    if not METRICS_DIR:
+        return render()
+    _write_snapshot(METRICS_DIR)
+    return render(_read_snapshots(METRICS_DIR))
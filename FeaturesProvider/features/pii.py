@@ -4,90 +4,427 @@ PII anonymization utilities.
 Provides a single function `anonymize_text` that masks/removes personally identifiable information (PII)
 from arbitrary text. The function is conservative and idempotent: applying it multiple times yields the
 same result and it aims to avoid over-redacting normal prose where possible.
+
+All patterns (emails, phones, URLs, addresses, labeled fields and the candidate's names) are joined into
+one alternation regex, so the text is scanned once and the output is built once. Patterns are listed in
+priority order, and the result is the one of masking the patterns one after another: where matches
+interact (a higher-priority match starting inside another one, or a match flush against a word),
+that stretch of text is masked pattern by pattern.
+
+No pattern may re-read an unbounded stretch of text at every position: runs are possessive or capped
+at the RFC limits (64 characters for an email's local part, 253 for a host name), and texts longer
+than MAX_CHUNK are scanned in parts, so the time is linear in the length of the text whatever it
+contains (see benchmarks/bench_pii_adversarial.py).
 """
 from __future__ import annotations
 
+import bisect
 import re
-from typing import Callable
+from functools import lru_cache
+from typing import Iterable, Iterator
 
+from .profiling import spanned
 
-# Precompiled regex patterns for performance and clarity
-_EMAIL_RE = re.compile(r"""
-    (?P<email>
-        [A-Z0-9._%+-]+      # local part
-        @
-        [A-Z0-9.-]+         # domain
-        \.                  # dot
-        [A-Z]{2,}           # TLD
-    )
-""", re.IGNORECASE | re.VERBOSE)
+# Pattern sources in priority order; each becomes one named group of the combined regex.
+# They are matched case-insensitively, but instead of a global IGNORECASE (which slows every
+# character class down) letters are spelled out: _ALPHA is what [A-Z] matches under IGNORECASE,
+# and keywords use scoped (?i:...) groups.
+_ALPHA = "A-Za-z\u0130\u0131\u017f\u212a"
+
+_EMAIL = rf"""
+    [{_ALPHA}0-9._%+-]{{1,64}}+     # local part (possessive: it can not contain the @ anyway)
+    @
+    [{_ALPHA}0-9.-]{{1,253}}        # domain
+    \.                              # dot
+    [{_ALPHA}]{{2,}}                 # TLD
+"""
 
 # International-ish phone numbers, allowing spaces, dashes, parentheses
-_PHONE_RE = re.compile(r"""
-    (?P<phone>
-        (?:\+\d{1,3}[\s-]?)?           # country code
-        (?:\(?\d{2,4}\)?[\s-]?)       # area code
-        \d{3,4}[\s-]?\d{3,4}           # local number
-    )
-""", re.VERBOSE)
+_PHONE = r"""
+    (?=[+(\d])                     # cheap check of the first character
+    (?:\+\d{1,3}[\s-]?)?           # country code
+    (?:\(?\d{2,4}\)?[\s-]?)       # area code
+    \d{3,4}[\s-]?\d{3,4}           # local number
+"""
 
 # URLs and social profiles
-_URL_RE = re.compile(r"""
-    (?P<url>
-        (?:https?://)?
-        (?:www\.)?
-        [A-Z0-9.-]+\.[A-Z]{2,}          # domain
-        (?:/[\w./%#?&=+-]*)?            # path
-    )
-""", re.IGNORECASE | re.VERBOSE)
+_URL = rf"""
+    (?:(?i:https?)://)?
+    (?:(?i:www)\.)?
+    [{_ALPHA}0-9.-]{{1,253}}\.[{_ALPHA}]{{2,}}     # domain
+    (?:/[\w./%\#?&=+-]*)?                # path
+"""
+
+_STREET_SUFFIXES = ("St", "Street", "Rd", "Road", "Ave", "Avenue", "Blvd", "Boulevard", "Ln", "Lane", "Dr", "Drive", "Ct", "Court", "Pl", "Place")
+
+
+def _street_source() -> str:
+    """
+    Street name words and suffix, as `(?:[A-Z][a-z]+\\s?){1,4}` + suffix would match them.
+
+    There a word may end anywhere inside a run of letters, so a long run is split every possible way.
+    But a split only helps where the suffix is glued to the last word ("Mainst"), and of all parses the
+    backtracking takes the one whose suffix ends last. So here the words are whole runs of letters
+    (possessive), as many as possible, followed by the suffix as the next word or glued to the last one.
+    """
+    letters = rf"[{_ALPHA}]"
+    suffix = rf"(?i:{'|'.join(_STREET_SUFFIXES)})"
+    by_length: dict[int, list[str]] = {}
+    for name in _STREET_SUFFIXES:
+        by_length.setdefault(len(name), []).append(name)
+    # Lookbehinds need a fixed width: one per suffix length, after the two letters a word has at least
+    glued = "|".join(rf"(?<={letters}{{2}}(?i:{'|'.join(names)}))" for names in by_length.values())
+    return rf"{letters}{{2,}}+(?:\s{letters}{{2,}}+){{0,3}}(?:\s{suffix}|{glued})\b"
+
 
 # Street addresses (very heuristic)
-_ADDRESS_RE = re.compile(r"""
-    (?P<address>
-        \b\d{1,5}                      # street number
-        [\s,.-]+
-        (?:[A-Z][a-z]+\s?){1,4}        # street name words
-        (?:St|Street|Rd|Road|Ave|Avenue|Blvd|Boulevard|Ln|Lane|Dr|Drive|Ct|Court|Pl|Place)\b
-        (?:[^\n]*)?                    # rest of line until newline (city/state/zip often follow)
-    )
-""", re.IGNORECASE | re.VERBOSE)
+_ADDRESS = rf"""
+    \b\d{{1,5}}                     # street number
+    [\s,.-]++
+    {_street_source()}                # street name words and suffix
+    (?P<address_tail>[^\n]*)       # rest of line until newline (city/state/zip often follow)
+"""
 
 # Email/phone labels variations (helps when models produce labeled fields)
-_LABEL_VALUE_RES: list[tuple[re.Pattern[str], str]] = [
-    (re.compile(r"(?i)\b(Full\s*Name|Name)\s*:\s*.+"), "Name: [REDACTED]")
-    ,(re.compile(r"(?i)\bEmail\s*:\s*.+"), "Email: [REDACTED]")
-    ,(re.compile(r"(?i)\bPhone\s*:\s*.+"), "Phone: [REDACTED]")
-    ,(re.compile(r"(?i)\bLocation\s*:\s*.+"), "Location: [REDACTED]")
-    ,(re.compile(r"(?i)\bAddress\s*:\s*.+"), "Address: [REDACTED]")
-    ,(re.compile(r"(?i)\bLinkedIn\s*:\s*.+"), "LinkedIn: [REDACTED]")
-    ,(re.compile(r"(?i)\bGitHub\s*:\s*.+"), "GitHub: [REDACTED]")
-    ,(re.compile(r"(?i)\bWebsite\s*:\s*.+"), "Website: [REDACTED]")
+_LABEL_VALUES: list[tuple[str, str]] = [
+    (r"\b(?i:Full\s*Name|Name)\s*:\s*.+", "Name: [REDACTED]"),
+    (r"\b(?i:Email)\s*:\s*.+", "Email: [REDACTED]"),
+    (r"\b(?i:Phone)\s*:\s*.+", "Phone: [REDACTED]"),
+    (r"\b(?i:Location)\s*:\s*.+", "Location: [REDACTED]"),
+    (r"\b(?i:Address)\s*:\s*.+", "Address: [REDACTED]"),
+    (r"\b(?i:LinkedIn)\s*:\s*.+", "LinkedIn: [REDACTED]"),
+    (r"\b(?i:GitHub)\s*:\s*.+", "GitHub: [REDACTED]"),
+    (r"\b(?i:Website)\s*:\s*.+", "Website: [REDACTED]"),
 ]
 
-def _mask(match: re.Match[str], placeholder: str) -> str:
-    return placeholder
+# An email, or a URL without scheme, that starts right after a character it could have started with
+# would also have matched one position earlier. A left-to-right scan that got past that position
+# can skip these starts, which saves re-reading every word of prose once per character.
+_GUARDS = {
+    "email": rf"(?<![{_ALPHA}0-9._%+-])",
+    "url": rf"(?:(?<![{_ALPHA}0-9.-])|(?=(?i:https?)://))",
+}
+
+_FLAGS = re.VERBOSE
 
+# From this many names on they are matched by one trie-shaped pattern instead of one pattern each
+NAME_AUTOMATON_MIN = 8
+# Compiled matchers kept per set of names
+MATCHER_CACHE_SIZE = 64
+# Longer texts are scanned in parts of about this many characters (see StreamingAnonymizer), so the
+# work on one part stays bounded whatever the input looks like. Parts end where no match can run
+# across; only a line or word longer than this is cut without such a place.
+MAX_CHUNK = 32_768
+# Stands for a masked span where the patterns are matched one after another: like a placeholder,
+# it is no word character and only the rest of a line (`.`) runs over it
+_MASK = "\ufffc"
+_LEADING_BOUNDARY_RE = re.compile(r"^(\s*)\\b")
+_WORD_RE = re.compile(r"\w")
 
-def _build_name_patterns(names: list[str]) -> list[re.Pattern[str]]:
-    patterns: list[re.Pattern[str]] = []
+
+def _flush(text: str, pos: int) -> bool:
+    """True if `pos` lies between two word characters (no word boundary there)"""
+    return bool(pos and _WORD_RE.match(text, pos - 1) and _WORD_RE.match(text, pos))
+
+
+def _normalize_names(names: list[str] | tuple[str, ...]) -> tuple[str, ...]:
+    """
+    Names as they are matched (whitespace collapsed), without blanks and case-insensitive duplicates.
+    Small sets keep their order, which decides overlaps between names; large sets are sorted so
+    that any order of the same names shares one cached matcher.
+    """
+    normalized: dict[str, str] = {}
     for raw in names:
-        name = raw.strip()
-        if not name:
-            continue
         # Exact full name (collapse multiple spaces)
-        collapsed = re.sub(r"\s+", " ", name)
-        escaped = re.escape(collapsed)
-        patterns.append(re.compile(rf"\b{escaped}\b", re.IGNORECASE))
-        # If two or more parts, also support first-initial + last-name (e.g., J. Doe)
-        parts = collapsed.split(" ")
-        if len(parts) >= 2 and all(p for p in parts[:2]):
-            first, last = parts[0], parts[-1]
-            first_initial = re.escape(first[0])
-            last_escaped = re.escape(last)
-            patterns.append(re.compile(rf"\b{first_initial}\.\s+{last_escaped}\b", re.IGNORECASE))
-    return patterns
+        name = re.sub(r"\s+", " ", raw.strip())
+        if name:
+            normalized.setdefault(name.lower(), name)
+    if len(normalized) >= NAME_AUTOMATON_MIN:
+        return tuple(normalized[key] for key in sorted(normalized))
+    return tuple(normalized.values())
+
+
+def _name_variants(name: str) -> list[tuple[str | None, ...]]:
+    """The full name plus, for two or more parts, first-initial + last-name (e.g., J. Doe) as atoms; None is `\\s+`"""
+    variants: list[tuple[str | None, ...]] = [tuple(name)]
+    parts = name.split(" ")
+    if len(parts) >= 2 and all(p for p in parts[:2]):
+        first, last = parts[0], parts[-1]
+        variants.append((first[0], ".", None, *last))
+    return variants
+
+
+def _atom_source(atom: str | None) -> str:
+    return r"\s+" if atom is None else re.escape(atom)
+
+
+def _name_patterns(names: tuple[str, ...]) -> list[str]:
+    """One pattern per name variant, matched in order of the names"""
+    return [
+        rf"\b(?i:{''.join(_atom_source(atom) for atom in variant)})\b"
+        for name in names
+        for variant in _name_variants(name)
+    ]
+
+
+def _name_automaton(names: tuple[str, ...]) -> str:
+    """
+    All name variants as one pattern shaped like their prefix trie (an Aho-Corasick goto function
+    that the regex engine walks), so the work per position depends on the length of the names,
+    not on how many there are. Longer names are preferred where several match at one position.
+    """
+    trie: dict = {}
+    for name in names:
+        for variant in _name_variants(name):
+            node = trie
+            for atom in variant:
+                node = node.setdefault(atom.lower() if atom else atom, (atom, {}))[1]
+            node[""] = True
+
+    def source(node: dict) -> str:
+        branches = [_atom_source(entry[0]) + source(entry[1]) for key, entry in node.items() if key != ""]
+        if "" in node:
+            branches.append(r"\b")  # last, so that a longer name is tried first
+        return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+    return rf"\b(?i:{source(trie)})"
+
+
+# Keywords of _LABEL_VALUES (plus the "Full" of "Full Name") that `\s*` may separate from the colon
+_LABEL_KEYWORDS = ("Full", "Name", "Email", "Phone", "Location", "Address", "LinkedIn", "GitHub", "Website")
+
+
+def _crossing_source(names: tuple[str, ...]) -> str:
+    """
+    Pattern matched against the reversed text, starting at a whitespace character: it matches when
+    a pattern could still run across that whitespace, judging only by the text in front of it.
+    Emails and URLs never contain whitespace; the others can only bridge it in these ways.
+    """
+    reverse = lambda text: re.escape(text[::-1])  # noqa: E731
+    ways = [
+        r"\s[\d)]",  # a phone number separator after a digit group
+        rf"\s(?:[{_ALPHA}]{{2,}}+(?:\s[{_ALPHA}]{{2,}}+){{0,3}}[\s,.-]++|[\s,.-]*+)\d",  # an address after its number
+        rf"\s++(?::|{'|'.join(reverse(keyword) for keyword in _LABEL_KEYWORDS)})",  # a label before its value
+    ]
+    initials = {name[0] for name in names if " " in name}
+    if initials:
+        ways.append(rf"\s++\.[{''.join(re.escape(initial) for initial in initials)}]")  # "J.  Doe"
+    prefixes = {name[:space] for name in names for space, char in enumerate(name) if char == " "}
+    if prefixes:
+        ways.append(rf" (?:{'|'.join(reverse(prefix) for prefix in sorted(prefixes, key=len, reverse=True))})")
+    return "|".join(ways)
+
 
+class _Level:
+    """One pattern of the scanner: its priority, what it is replaced with, and its own compiled regexes."""
 
+    __slots__ = ("index", "kind", "label", "regex", "scan_regex")
+
+    def __init__(self, index: int, kind: str, source: str, label: str | None = None):
+        self.index = index
+        self.kind = kind
+        self.label = label
+        self.regex = re.compile(source, _FLAGS)
+        self.scan_regex = re.compile(_GUARDS.get(kind, "") + source, _FLAGS)
+
+
+class _Matcher:
+    """
+    Combined single-pass regex for a set of names to mask.
+
+    Masking the patterns one after another means a lower-priority pattern sees the placeholders
+    of the higher-priority ones: it can not run into them, they count as word boundaries, and a
+    labeled field or address running to the end of the line takes them along. A match of the
+    combined regex gives the same result as long as it does not interact with another one: no
+    higher-priority match starts inside it and it is not flush against a word character. Where one
+    does, that stretch of text is masked pattern by pattern (`_sequential`) up to a place where no
+    match can run across, and the single pass goes on from there.
+    """
+
+    def __init__(self, names: tuple[str, ...]):
+        sources = [("email", _EMAIL, None), ("phone", _PHONE, None), ("url", _URL, None), ("address", _ADDRESS, None)]
+        sources += [("label", source, label) for source, label in _LABEL_VALUES]
+        name_sources = _name_patterns(names) if len(names) < NAME_AUTOMATON_MIN else [_name_automaton(names)]
+        sources += [("name", source, None) for source in name_sources]
+
+        self.levels = [_Level(index, *source) for index, source in enumerate(sources)]
+        self.sources = [source for _, source, _ in sources]
+        self.crossing_regex = re.compile(_crossing_source(names), re.IGNORECASE)
+        self.regex = re.compile(self._alternation(range(len(sources))), _FLAGS)
+        self.scan_regex = re.compile(self._alternation(range(len(sources)), guarded=True), _FLAGS)
+        self._finders: dict[tuple[int, int, bool, int], re.Pattern] = {}
+
+    def _alternation(self, indices, guarded: bool = False) -> str:
+        """
+        Named-group alternation of the given levels. Runs of sources starting with `\\b` share one
+        leading `\\b` (checked once per position instead of once per alternative).
+        `guarded` adds the _GUARDS, for searches where no level matched one position before the start.
+        """
+        parts: list[str] = []
+        bounded: list[str] = []
+        for index in indices:
+            source = self.sources[index]
+            if guarded:
+                source = _GUARDS.get(self.levels[index].kind, "") + source
+            stripped = _LEADING_BOUNDARY_RE.sub("", source, 1)
+            if stripped != source:
+                bounded.append(f"(?P<p{index}>{stripped})")
+                continue
+            if bounded:
+                parts.append(rf"\b(?:{'|'.join(bounded)})")
+                bounded = []
+            parts.append(f"(?P<p{index}>{source})")
+        if bounded:
+            parts.append(rf"\b(?:{'|'.join(bounded)})")
+        return "|".join(parts)
+
+    def _first_start(
+        self, first: int, last: int, text: str, pos: int, limit: int, endpos: int, guarded: bool = False
+    ) -> int:
+        """
+        Start of the leftmost match of any of the levels first..last-1 in [pos, limit), or `limit`.
+        The match itself may run up to `endpos`: the regex only probes the starts with a lookahead,
+        so the cost depends on limit - pos and not on how far away the next match is.
+        """
+        if pos >= limit or first >= last:
+            return limit
+        # Round the probed length up to a power of two to keep the number of compiled finders small
+        bits = (limit - pos).bit_length()
+        key = (first, last, guarded, bits)
+        finder = self._finders.get(key)
+        if finder is None:
+            lookahead = self._alternation(range(first, last), guarded=guarded)
+            finder = re.compile(rf"[\s\S]{{0,{(1 << bits) - 1}}}?(?={lookahead})", _FLAGS)
+            self._finders[key] = finder
+        found = finder.match(text, pos, endpos)
+        return min(found.end(), limit) if found else limit
+
+    def spans(self, text: str, pos: int, endpos: int):
+        """Yield (start, end, level) of every match in text[pos:endpos], left to right."""
+        reversed_text = None
+        # Matches since the last place no match runs across: a later one may still change them
+        # (it can make a higher-priority match end at a word boundary that starts inside them)
+        held: list = []
+        safe = pos
+        while pos < endpos:
+            # Once nothing matched at pos itself, the guards apply to the search from pos + 1
+            match = self.regex.match(text, pos, endpos) or self.scan_regex.search(text, pos + 1, endpos)
+            if match is None:
+                break
+            level = self.levels[int(match.lastgroup[1:])]
+            start, end = match.span()
+            # (no higher-priority pattern matched at `start` itself, so the guards apply)
+            if not (
+                _flush(text, start)
+                or (end < endpos and _flush(text, end))
+                or self._first_start(0, level.index, text, start + 1, end, endpos, guarded=True) < end
+            ):
+                held.append((start, end, level))
+                pos = end
+                continue
+
+            # Mask pattern by pattern from the last place in front no match runs across,
+            # up to the next one behind this match
+            if reversed_text is None:
+                reversed_text = text[endpos - 1 :: -1] if endpos else ""
+            pos = self.safe_cut(text, held, safe, start, reversed_text, endpos)
+            yield from (span for span in held if span[1] < pos)
+            stop = end
+            while True:
+                newline = text.find("\n", max(stop, pos + 2 * (stop - pos)), endpos)
+                stop = endpos if newline == -1 else newline + 1
+                spans = self._sequential(text, pos, stop)
+                if stop == endpos:
+                    yield from spans
+                    return
+                cut = self.safe_cut(text, spans, pos, stop, reversed_text, endpos)
+                if cut > start:
+                    break
+            yield from (span for span in spans if span[1] < cut)
+            pos = safe = cut
+            held = []
+        yield from held
+
+    def _sequential(self, text: str, pos: int, endpos: int) -> list:
+        """
+        Spans of text[pos:endpos] as masking the levels one after another gives them. Each level is
+        matched against the text with the masked spans replaced by one character that no pattern
+        takes for a word character or a part of its match, except the rest of a line (`.`).
+        """
+        spans: list = []
+        for level in self.levels:
+            pieces, marks, shifts, last = [], [], [0], pos
+            for start, end, _ in spans:
+                pieces.append(text[last:start])
+                pieces.append(_MASK)
+                marks.append(start - pos - shifts[-1])  # where the span's character is in the view
+                shifts.append(shifts[-1] + end - start - 1)
+                last = end
+            pieces.append(text[last:endpos])
+            view = "".join(pieces)
+
+            def original(index: int) -> int:
+                return pos + index + shifts[bisect.bisect_left(marks, index)]
+
+            found = []
+            at = 0
+            while at < len(view):
+                match = level.regex.match(view, at) or level.scan_regex.search(view, at + 1)
+                if match is None:
+                    break
+                found.append((original(match.start()), original(match.end()), level))
+                at = match.end()
+            spans = _merge(spans, found) if found else spans
+        return spans
+
+    def safe_cut(self, text: str, spans: list, pos: int, endpos: int, reversed_text: str, length: int) -> int:
+        """
+        Largest position in (pos, endpos] after a whitespace character that lies outside the spans of
+        text[pos:endpos] and that no match could run across, judging by the text in front of it;
+        `pos` if there is none. `reversed_text` is text[:length] reversed.
+        """
+        index = len(spans) - 1
+        cut = endpos
+        while cut > pos:
+            if not text[cut - 1].isspace():
+                cut -= 1
+                continue
+            while index >= 0 and spans[index][0] >= cut:
+                index -= 1
+            if index >= 0 and spans[index][1] >= cut:
+                cut = spans[index][0]  # inside (or at the open end of) a match
+                continue
+            if not self.crossing_regex.match(reversed_text, length - cut):
+                return cut
+            # Only the ways starting with `\s+` (or `\s[\s,.-]*`) can match with more whitespace in front,
+            # and those match at every whitespace of the run: go on in front of the whole run
+            cut -= 1
+            while cut > pos and text[cut - 1].isspace():
+                cut -= 1
+        return pos
+
+
+def _merge(spans: list, found: list) -> list:
+    """`spans` with the (later) matches of a lower-priority level added; those contain whole spans or none"""
+    merged = []
+    index = 0
+    for span in found:
+        while index < len(spans) and spans[index][0] < span[0]:
+            merged.append(spans[index])
+            index += 1
+        while index < len(spans) and spans[index][1] <= span[1]:
+            index += 1
+        merged.append(span)
+    merged.extend(spans[index:])
+    return merged
+
+
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def _matcher(names: tuple[str, ...]) -> _Matcher:
+    return _Matcher(names)
+
+
+@spanned("anonymize")
 def anonymize_text(text: str, *, placeholder_email: str = "[REDACTED_EMAIL]", placeholder_phone: str = "[REDACTED_PHONE]", placeholder_url: str = "[REDACTED_URL]", placeholder_address: str = "[REDACTED_ADDRESS]", placeholder_name: str = "[REDACTED_NAME]", names_to_mask: list[str] | None = None) -> str:
     """
     Remove or mask common PII in a given text.
@@ -102,19 +439,134 @@ def anonymize_text(text: str, *, placeholder_email: str = "[REDACTED_EMAIL]", pl
     if not text:
         return text
 
-    # Mask obvious tokens
-    text = _EMAIL_RE.sub(lambda m: _mask(m, placeholder_email), text)
-    text = _PHONE_RE.sub(lambda m: _mask(m, placeholder_phone), text)
-    text = _URL_RE.sub(lambda m: _mask(m, placeholder_url), text)
-    text = _ADDRESS_RE.sub(lambda m: _mask(m, placeholder_address), text)
+    placeholders = {
+        "email": placeholder_email,
+        "phone": placeholder_phone,
+        "url": placeholder_url,
+        "address": placeholder_address,
+        "name": placeholder_name,
+    }
+    if len(text) > MAX_CHUNK:
+        anonymizer = StreamingAnonymizer(**{f"placeholder_{kind}": value for kind, value in placeholders.items()}, names_to_mask=names_to_mask)
+        parts = [anonymizer.feed(text[start : start + MAX_CHUNK]) for start in range(0, len(text), MAX_CHUNK)]
+        return "".join(parts) + anonymizer.finish()
+
+    matcher = _matcher(_normalize_names(names_to_mask or ()))
+    return _render(text, matcher.spans(text, 0, len(text)), placeholders, len(text))
+
+
+def _render(text: str, spans, placeholders: dict[str, str], stop: int) -> str:
+    """text[:stop] with the spans (all ending at or before `stop`) replaced by their placeholders"""
+    pieces: list[str] = []
+    last = 0
+    for start, end, level in spans:
+        pieces.append(text[last:start])
+        pieces.append(level.label if level.kind == "label" else placeholders[level.kind])
+        last = end
+    pieces.append(text[last:stop])
+    return "".join(pieces)
+
+
+class StreamingAnonymizer:
+    """
+    `anonymize_text` for text that arrives in chunks, such as a streamed AI response.
+
+    `feed()` returns the redacted text that no later chunk can change any more and holds back the
+    rest: the text after the last whitespace that neither lies inside a match nor could still be
+    bridged by one (a phone number, address, labeled field or name continuing behind it).
+    That is usually just the current word or line. `finish()` returns the held back remainder.
+    The concatenated output is identical to `anonymize_text` applied to the concatenated input.
+
+    At most about MAX_CHUNK characters are held back: without a safe place in a longer stretch (one
+    huge line or word), the text is cut at its last whitespace, outside of any match, anyway.
+    Held back text without a safe place is scanned again only once it has doubled in length, so
+    feeding it in small chunks stays linear in its length.
+    """
+
+    def __init__(self, *, placeholder_email: str = "[REDACTED_EMAIL]", placeholder_phone: str = "[REDACTED_PHONE]", placeholder_url: str = "[REDACTED_URL]", placeholder_address: str = "[REDACTED_ADDRESS]", placeholder_name: str = "[REDACTED_NAME]", names_to_mask: list[str] | None = None):
+        self._placeholders = {
+            "email": placeholder_email,
+            "phone": placeholder_phone,
+            "url": placeholder_url,
+            "address": placeholder_address,
+            "name": placeholder_name,
+        }
+        self._matcher = _matcher(_normalize_names(names_to_mask or ()))
+        self._pending = ""
+        self._incoming: list[str] = []  # chunks fed since the last scan, behind `_pending`
+        self._incoming_length = 0
+        self._in_open_line = False  # the rest of the line belongs to a labeled field or address cut short
+
+    @property
+    def pending(self) -> int:
+        """Number of characters held back"""
+        return len(self._pending) + self._incoming_length
+
+    def feed(self, chunk: str) -> str:
+        self._incoming.append(chunk)
+        self._incoming_length += len(chunk)
+        # `_pending` has no safe place in it: wait until the text has doubled before looking again
+        scanned = len(self._pending)
+        if self.pending < 2 * scanned and self.pending <= MAX_CHUNK:
+            return ""
+        text = self._skip_open_line(self._take())
+        spans = sorted(self._matcher.spans(text, 0, len(text)), key=lambda span: span[0])
+        cut = self._safe_cut(text, spans, scanned if len(text) > scanned else 0)
+        if len(text) - cut > MAX_CHUNK:
+            cut = self._forced_cut(text, spans)
+        self._pending = text[cut:]
+        return _render(text, [span for span in spans if span[1] <= cut], self._placeholders, cut)
+
+    def finish(self) -> str:
+        text, self._pending = self._skip_open_line(self._take()), ""
+        self._in_open_line = False
+        return _render(text, self._matcher.spans(text, 0, len(text)), self._placeholders, len(text))
+
+    def _take(self) -> str:
+        """The held back text, with the chunks fed since the last scan joined to it"""
+        text = self._pending + "".join(self._incoming)
+        self._incoming, self._incoming_length = [], 0
+        return text
+
+    def _skip_open_line(self, text: str) -> str:
+        if not self._in_open_line:
+            return text
+        newline = text.find("\n")
+        if newline == -1:
+            return ""
+        self._in_open_line = False
+        return text[newline:]
+
+    def _forced_cut(self, text: str, spans: list) -> int:
+        """
+        A cut that leaves at most MAX_CHUNK // 2 characters, behind whitespace if there is some.
+        If it falls into a labeled field or address that runs to the end of the line, the match
+        ends at the cut and the rest of the line is dropped as it comes in.
+        """
+        target = len(text) - MAX_CHUNK // 2
+        whitespace = max(text.rfind(" ", 0, target), text.rfind("\n", 0, target))
+        if whitespace >= len(text) - MAX_CHUNK:
+            target = whitespace + 1
+        for start, end, level in spans:
+            if start < target < end:
+                self._in_open_line = end == len(text) and level.kind in ("label", "address")
+                return end
+        return target
 
-    # Replace labeled lines
-    for pattern, replacement in _LABEL_VALUE_RES:
-        text = pattern.sub(replacement, text)
+    def _safe_cut(self, text: str, spans: list, pos: int = 0) -> int:
+        """
+        Largest position after a whitespace character that the output can be cut at (0 if none),
+        looked for behind `pos` only: in front of it is held back text that had no such place.
+        """
+        cut = self._matcher.safe_cut(text, spans, pos, len(text), text[::-1], len(text))
+        return cut if cut > pos else 0
 
-    # Explicit name masking (no header/signature heuristics)
-    if names_to_mask:
-        for pat in _build_name_patterns(names_to_mask):
-            text = pat.sub(placeholder_name, text)
 
-    return text
+def anonymize_stream(chunks: Iterable[str], **options) -> Iterator[str]:
+    """Redact text chunks as they come in; takes the keyword arguments of `anonymize_text`."""
+    anonymizer = StreamingAnonymizer(**options)
+    for chunk in chunks:
+        if redacted := anonymizer.feed(chunk):
+            yield redacted
+    if rest := anonymizer.finish():
+        yield rest
@@ -0,0 +1,207 @@
+"""
+Bulk anonymization of many documents (e.g. exported CVs for a partner dataset) on a process pool.
+
+Documents are sent to the worker processes in batches of `chunksize`, with a bounded number of
+batches in flight, so input is consumed as fast as it is processed and results come back in
+input order. Every worker keeps its own matcher cache, so documents sharing a name list
+compile their patterns once per process.
+
+All calls share one pool of `PII_BATCH_WORKERS` processes, started on first use and stopped with
+`shutdown()` when the app (or the command line run) ends. A call asking for fewer workers keeps
+only that many batches in flight, so it occupies at most that many processes of the pool.
+
+NDJSON input has one JSON object per line: {"text": "...", "names": ["Jane Doe"], ...}.
+Every output line is the same object with `text` redacted; other fields (ids etc.) are kept.
+Lines that cannot be read produce {"line": n, "error": "..."} instead.
+
+Command line (throughput is reported on stderr):
+    python -m features.pii_batch [--workers N] [--chunksize N] < cvs.ndjson > anonymized.ndjson
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Iterable, Iterator, Sequence
+
+from .pii import anonymize_text
+
+WORKERS = int(os.getenv("PII_BATCH_WORKERS", "0")) or os.cpu_count() or 1
+CHUNKSIZE = int(os.getenv("PII_BATCH_CHUNKSIZE", "32"))
+IN_FLIGHT_PER_WORKER = 2  # batches queued per worker process, bounds memory use for endless input
+WINDOW = int(os.getenv("PII_BATCH_WINDOW", "1024"))  # NDJSON lines the HTTP endpoint hands over at a time
+
+_executor: ProcessPoolExecutor | None = None
+_executor_workers = 0
+_lock = threading.Lock()
+
+
+@dataclass
+class BatchStats:
+    """Running totals of a bulk anonymization, for throughput reports"""
+
+    documents: int = 0
+    errors: int = 0
+    characters: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    def report(self) -> dict[str, Any]:
+        seconds = time.perf_counter() - self.started
+        return {
+            "documents": self.documents,
+            "errors": self.errors,
+            "characters": self.characters,
+            "seconds": round(seconds, 3),
+            "documents_per_second": round(self.documents / seconds, 1) if seconds else 0.0,
+            "mb_per_second": round(self.characters / 1e6 / seconds, 3) if seconds else 0.0,
+        }
+
+
+def _anonymize_batch(batch: list[tuple[str, list[str] | None]]) -> list[str]:
+    return [anonymize_text(text, names_to_mask=names) for text, names in batch]
+
+
+def _pool(workers: int = WORKERS) -> tuple[ProcessPoolExecutor, int]:
+    """The shared worker pool and its number of processes; started with `workers` processes if not running"""
+    global _executor, _executor_workers
+    with _lock:
+        if _executor is None:
+            # Not fork: the API server runs threads (database pool, pre-warming) that must not be copied mid-work
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _executor_workers = workers
+        return _executor, _executor_workers
+
+
+def shutdown() -> None:
+    """Stop the worker processes once their work is done; the next parallel call starts new ones"""
+    global _executor, _executor_workers
+    with _lock:
+        executor, _executor, _executor_workers = _executor, None, 0
+    if executor is not None:
+        executor.shutdown()
+
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def iter_anonymized(
+    documents: Iterable[tuple[str, list[str] | None]],
+    workers: int | None = None,
+    chunksize: int = CHUNKSIZE,
+) -> Iterator[str]:
+    """
+    Redact (text, names_to_mask) pairs, yielding the results in input order.
+    `workers=1` runs in the calling process; otherwise the shared pool processes the batches, at most
+    `workers` of them at a time (`IN_FLIGHT_PER_WORKER` per process when the whole pool is asked for),
+    so `documents` may be a lazily read stream.
+    """
+    workers = max(1, workers or WORKERS)
+    if workers == 1:
+        for text, names in documents:
+            yield anonymize_text(text, names_to_mask=names)
+        return
+
+    pool, pool_workers = _pool()
+    in_flight = workers if workers < pool_workers else pool_workers * IN_FLIGHT_PER_WORKER
+    pending: deque[Future] = deque()
+    for batch in _batches(documents, max(1, chunksize)):
+        pending.append(pool.submit(_anonymize_batch, batch))
+        if len(pending) >= in_flight:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def anonymize_many(
+    texts: Sequence[str],
+    names_per_text: Sequence[list[str] | None] | None = None,
+    workers: int | None = None,
+    chunksize: int = CHUNKSIZE,
+) -> list[str]:
+    """`anonymize_text` for every text, with `names_per_text[i]` masked in `texts[i]`, on `workers` processes"""
+    if names_per_text is None:
+        names_per_text = [None] * len(texts)
+    elif len(names_per_text) != len(texts):
+        raise ValueError("names_per_text must have one entry per text")
+    return list(iter_anonymized(zip(texts, names_per_text), workers=workers, chunksize=chunksize))
+
+
+def _parse_record(line: str | bytes) -> dict[str, Any]:
+    record = json.loads(line)
+    if not isinstance(record, dict) or not isinstance(record.get("text"), str):
+        raise ValueError('expected an object with a string "text" field')
+    names = record.get("names")
+    if names is not None and not (isinstance(names, list) and all(isinstance(name, str) for name in names)):
+        raise ValueError('"names" must be a list of strings')
+    return record
+
+
+def anonymize_ndjson(
+    lines: Iterable[str | bytes],
+    workers: int | None = None,
+    chunksize: int = CHUNKSIZE,
+    stats: BatchStats | None = None,
+    start: int = 1,
+) -> Iterator[str]:
+    """
+    Redact NDJSON records (see module docstring), yielding output lines in input order.
+    `start` is the number of the first line, for error reports on input handed over in parts.
+    """
+    stats = stats if stats is not None else BatchStats()
+    # Output slots in input order: a record waiting for its text, or a finished error line
+    slots: deque[dict[str, Any] | str] = deque()
+
+    def documents() -> Iterator[tuple[str, list[str] | None]]:
+        for number, line in enumerate(lines, start):
+            if not line.strip():
+                continue
+            try:
+                record = _parse_record(line)
+            except ValueError as e:
+                stats.errors += 1
+                slots.append(json.dumps({"line": number, "error": str(e)}))
+                continue
+            stats.documents += 1
+            stats.characters += len(record["text"])
+            slots.append(record)
+            yield record["text"], record.get("names")
+
+    for text in iter_anonymized(documents(), workers=workers, chunksize=chunksize):
+        while isinstance(slots[0], str):
+            yield slots.popleft() + "\n"
+        record = slots.popleft()
+        yield json.dumps({**record, "text": text}, ensure_ascii=False) + "\n"
+    while slots:
+        yield slots.popleft() + "\n"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Anonymize NDJSON records read from stdin")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    stats = BatchStats()
+    if args.workers > 1:
+        _pool(args.workers)
+    try:
+        for line in anonymize_ndjson(sys.stdin, workers=args.workers, chunksize=args.chunksize, stats=stats):
+            sys.stdout.write(line)
+    finally:
+        shutdown()
+    print(json.dumps(stats.report()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
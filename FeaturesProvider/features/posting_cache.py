@@ -0,0 +1,179 @@
+"""
+On-disk cache of fetched job postings and of their parsed descriptions.
+
+Pages: per requested URL, the extracted text with the `ETag` and `Last-Modified` validators of
+the response. Within `JOB_CACHE_FRESH` seconds (default 3600) of the last fetch a link is
+answered from the cache without a request; after that the fetcher revalidates with
+`If-None-Match` / `If-Modified-Since` and a `304 Not Modified` answer reuses the cached text.
+Responses marked `Cache-Control: no-store` are not kept.
+
+Parsed descriptions: the `JobDescriptionResponse` fields and the posting text per SHA-256 of the
+text, so a posting whose text has not changed is not sent to the AI model again (`posting_dedup`
+finds the entry of a nearly identical posting).
+
+Entries are JSON files under `JOB_CACHE_DIR` (default: a directory in the system temp dir),
+written atomically so concurrent workers never read half a file; an empty `JOB_CACHE_DIR`
+disables the cache. A file's modification time is its last use (reads touch it): an entry unused
+for `JOB_CACHE_MAX_AGE` seconds (default 7 days) is deleted when it is read, and every
+`PRUNE_EVERY` writes the least recently used entries are deleted until at most
+`JOB_CACHE_MAX_ENTRIES` (default 20000) entries of `JOB_CACHE_MAX_BYTES` (default 256 MB) are left.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+DIRECTORY = os.getenv("JOB_CACHE_DIR", os.path.join(tempfile.gettempdir(), "trackmyoffer-job-cache"))
+FRESH = float(os.getenv("JOB_CACHE_FRESH", "3600"))
+MAX_AGE = float(os.getenv("JOB_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("JOB_CACHE_MAX_ENTRIES", "20000"))
+MAX_BYTES = int(os.getenv("JOB_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+PRUNE_EVERY = 100  # writes between two prunings of this process
+
+_KINDS = ("pages", "parsed")
+_writes = 0
+_lock = threading.Lock()
+
+
+@dataclass
+class CachedPage:
+    url: str  # the link as requested
+    final_url: str  # where redirects led; revalidation goes there directly
+    text: str
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched_at: float = 0.0  # time.time() of the last fetch or successful revalidation
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() - self.fetched_at < FRESH
+
+    def validators(self) -> dict[str, str]:
+        """Conditional request headers for revalidation"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def digest(key: str) -> str:
+    """Hex SHA-256 of a URL or posting text, the name of its cache entry"""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _path(kind: str, name: str) -> Path | None:
+    if not DIRECTORY:
+        return None
+    return Path(DIRECTORY, kind, name + ".json")
+
+
+def _read(path: Path | None) -> dict[str, Any] | None:
+    if path is None:
+        return None
+    try:
+        if time.time() - path.stat().st_mtime > MAX_AGE:
+            path.unlink(missing_ok=True)
+            return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+        os.utime(path)  # used now: pruned last
+        return data
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+        return None
+
+
+def _write(path: Path | None, data: dict[str, Any]) -> None:
+    if path is None:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, suffix=".tmp", delete=False) as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(f.name, path)
+    except OSError as e:
+        logger.warning(f"Could not write cache entry {path}: {e}")
+        return
+    global _writes
+    with _lock:
+        _writes += 1
+        due = _writes % PRUNE_EVERY == 0
+    if due:
+        prune()
+
+
+def prune() -> int:
+    """Delete expired entries, then the least recently used ones over the limits; returns the number deleted"""
+    if not DIRECTORY:
+        return 0
+    entries = []
+    for kind in _KINDS:
+        try:
+            with os.scandir(os.path.join(DIRECTORY, kind)) as files:
+                for entry in files:
+                    if entry.name.endswith(".json"):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:  # deleted by another worker meanwhile
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            continue
+    entries.sort(reverse=True)  # most recently used first
+    expired = time.time() - MAX_AGE
+    kept = size = deleted = 0
+    for mtime, entry_size, path in entries:
+        if mtime >= expired and kept < MAX_ENTRIES and size + entry_size <= MAX_BYTES:
+            kept += 1
+            size += entry_size
+            continue
+        expired = float("inf")  # over a limit: all less recently used entries go as well
+        try:
+            os.unlink(path)
+            deleted += 1
+        except OSError:
+            pass
+    if deleted:
+        logger.info(f"Pruned {deleted} job cache entries, {kept} left ({size} bytes)")
+    return deleted
+
+
+def load_page(url: str) -> CachedPage | None:
+    data = _read(_path("pages", digest(url)))
+    try:
+        return CachedPage(**data) if data else None
+    except TypeError:
+        return None
+
+
+def store_page(page: CachedPage) -> None:
+    _write(_path("pages", digest(page.url)), asdict(page))
+
+
+def load_parsed(text: str) -> dict[str, Any] | None:
+    """Parsed description fields of a posting text, if it was parsed before"""
+    entry = load_parsed_posting(digest(text))
+    return entry[0] if entry else None
+
+
+def load_parsed_posting(text_digest: str) -> tuple[dict[str, Any], str] | None:
+    """Parsed description fields and the posting text with the given `digest()`"""
+    data = _read(_path("parsed", text_digest))
+    if not data or not isinstance(data.get("fields"), dict):
+        return None
+    return data["fields"], data.get("text", "")
+
+
+def store_parsed(text: str, fields: dict[str, Any]) -> None:
+    # The text too: a near-duplicate reuses the fields only where the two texts agree
+    _write(_path("parsed", digest(text)), {"fields": fields, "text": text})
@@ -0,0 +1,253 @@
+"""
+Near-duplicate detection of job posting texts.
+
+The same role is often posted on several boards with trivial differences (tracking links, a
+different footer). Such a posting should reuse the description parsed from its first copy
+instead of going to the AI model again - and since the reused description is identical, the
+review, gap analysis and cover letter prompts built from it hit the response caches too.
+
+A posting text is lowercased, stripped of links and split into words; its `SHINGLE_WORDS`-word
+shingles are summarized by a MinHash signature of `NUM_PERM` values, whose agreement between
+two postings estimates their Jaccard similarity. Candidates are found by LSH: the signature is
+cut into `BANDS` bands, and postings that agree on a whole band are compared. A lookup is a
+binary search per band plus one vectorized comparison, well under a millisecond for 100k
+postings (`python -m benchmarks.bench_posting_dedup`).
+
+The index is kept in memory and, next to the posting cache (`JOB_CACHE_DIR`), in an append-only
+file of fixed-size records, so it survives restarts and other workers' additions are picked up
+on the next lookup. `NEAR_DUPLICATE_THRESHOLD` (default 0.9) is the estimated similarity above
+which a posting counts as a copy; `NEAR_DUPLICATES=0` turns the detection off. A copy reuses the
+parsed fields only when none of their words differs between the texts (`same_values`): a
+posting of the same role for another office is parsed again.
+"""
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+from loguru import logger
+
+from . import posting_cache
+
+ENABLED = os.getenv("NEAR_DUPLICATES", "1").lower() in ("1", "true", "yes")
+THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.9"))
+SHINGLE_WORDS = 5
+NUM_PERM = 64
+BANDS = 8  # of NUM_PERM // BANDS rows each: postings above ~0.77 similarity usually share a band
+ROWS = NUM_PERM // BANDS
+MERGE_EVERY = 1024  # additions kept unsorted (and scanned linearly) before the bands are re-sorted
+
+_TOKEN_RE = re.compile(r"\w+")
+_LINK_RE = re.compile(r"\b(?:https?://|www\.)\S+")
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+# Fixed seed: persisted signatures must stay comparable between runs
+_rng = np.random.default_rng(20240917)
+_A = _rng.integers(0, 2**64, NUM_PERM, dtype=np.uint64, endpoint=False) | np.uint64(1)
+_B = _rng.integers(0, 2**64, NUM_PERM, dtype=np.uint64, endpoint=False)
+_RECORD = np.dtype([("key", "S32"), ("signature", "<u4", (NUM_PERM,))])
+
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN_RE.findall(_LINK_RE.sub(" ", text.lower()))
+
+
+def same_values(text: str, other: str, values: Iterable[str]) -> bool:
+    """
+    Whether the words of `values` (fields parsed from `text`) occur as often in `other`: the same
+    role posted for another office differs from its copy in just the words of its city or title.
+    """
+    changed = Counter(_tokens(text))
+    changed.subtract(_tokens(other))
+    return not any(changed[word] for value in values for word in _tokens(value))
+
+
+def signature(text: str) -> np.ndarray | None:
+    """MinHash signature of a posting text; None for a text without words"""
+    tokens = _tokens(text)
+    if not tokens:
+        return None
+    hashes = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.uint64, count=len(tokens))
+    width = min(SHINGLE_WORDS, len(hashes))
+    count = len(hashes) - width + 1
+    shingles = np.zeros(count, dtype=np.uint64)
+    for offset in range(width):
+        shingles = shingles * _MIX + hashes[offset : offset + count]
+    # Multiply-shift hashing, one function per permutation; uint64 arithmetic wraps around
+    permuted = (np.unique(shingles)[:, None] * _A + _B) >> np.uint64(32)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def _band_hashes(signatures: np.ndarray) -> np.ndarray:
+    """One 64-bit hash per band of each signature (rows x BANDS)"""
+    rows = signatures.reshape(-1, BANDS, ROWS).astype(np.uint64)
+    hashes = np.zeros(rows.shape[:2], dtype=np.uint64)
+    for row in range(ROWS):
+        hashes = hashes * _MIX + rows[:, :, row]
+    return hashes
+
+
+class NearDuplicateIndex:
+    """MinHash LSH index of posting signatures, keyed by the posting cache digest of their text."""
+
+    def __init__(self, path: Path | None = None, capacity: int = 1024):
+        self._signatures = np.zeros((capacity, NUM_PERM), dtype=np.uint32)
+        self._bands = np.zeros((capacity, BANDS), dtype=np.uint64)
+        self._keys: list[str] = []
+        self._rows: dict[str, int] = {}
+        # Per band: the band hashes of the first `_sorted` rows in order, and their rows
+        self._sorted = 0
+        self._sorted_hashes = np.zeros((BANDS, 0), dtype=np.uint64)
+        self._sorted_rows = np.zeros((BANDS, 0), dtype=np.intp)
+        self._path = path
+        self._offset = 0  # bytes of the file already loaded
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def path(self) -> Path | None:
+        return self._path
+
+    def add(self, key: str, posting_signature: np.ndarray) -> None:
+        """Remember a posting (persisted when the index has a file); known keys are ignored"""
+        with self._lock:
+            if key in self._rows:
+                return
+            if self._path is None:
+                self._insert([key], posting_signature[None, :])
+                return
+            record = np.zeros(1, dtype=_RECORD)
+            record["key"], record["signature"] = bytes.fromhex(key), posting_signature
+            try:
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+                # One write of a whole record with O_APPEND: concurrent workers never interleave
+                fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, record.tobytes())
+                finally:
+                    os.close(fd)
+            except OSError as e:
+                logger.warning(f"Could not persist near-duplicate index entry: {e}")
+                self._insert([key], posting_signature[None, :])
+                return
+            self._load()
+
+    def find(self, posting_signature: np.ndarray) -> tuple[str, float] | None:
+        """(key, estimated similarity) of the most similar posting at or above THRESHOLD, if any"""
+        with self._lock:
+            self._load()
+            size = len(self._keys)
+            if size == 0:
+                return None
+            query = _band_hashes(posting_signature)[0]
+            candidates = []
+            for band in range(BANDS):
+                hashes = self._sorted_hashes[band]
+                start = np.searchsorted(hashes, query[band], side="left")
+                end = np.searchsorted(hashes, query[band], side="right")
+                candidates.append(self._sorted_rows[band, start:end])
+            candidates.append(self._sorted + np.flatnonzero((self._bands[self._sorted : size] == query).any(axis=1)))
+            rows = np.unique(np.concatenate(candidates))
+            if len(rows) == 0:
+                return None
+            similarities = (self._signatures[rows] == posting_signature).mean(axis=1)
+            best = int(np.argmax(similarities))
+            if similarities[best] < THRESHOLD:
+                return None
+            return self._keys[int(rows[best])], float(similarities[best])
+
+    def _insert(self, keys: list[str], signatures: np.ndarray) -> None:
+        new = []
+        for i, key in enumerate(keys):
+            if key not in self._rows:
+                self._rows[key] = len(self._keys) + len(new)
+                new.append(i)
+        if not new:
+            return
+        start = len(self._keys)
+        end = start + len(new)
+        while end > len(self._signatures):
+            self._grow()
+        self._signatures[start:end] = signatures[new]
+        self._bands[start:end] = _band_hashes(signatures[new])
+        self._keys.extend(keys[i] for i in new)
+        if end - self._sorted >= MERGE_EVERY:
+            self._sort()
+
+    def _sort(self) -> None:
+        size = len(self._keys)
+        bands = self._bands[:size].T
+        order = np.argsort(bands, axis=1, kind="stable")
+        self._sorted_hashes = np.take_along_axis(bands, order, axis=1)
+        self._sorted_rows = order
+        self._sorted = size
+
+    def _grow(self) -> None:
+        capacity = max(1, len(self._signatures)) * 2
+        signatures = np.zeros((capacity, NUM_PERM), dtype=np.uint32)
+        signatures[: len(self._keys)] = self._signatures[: len(self._keys)]
+        bands = np.zeros((capacity, BANDS), dtype=np.uint64)
+        bands[: len(self._keys)] = self._bands[: len(self._keys)]
+        self._signatures, self._bands = signatures, bands
+
+    def _load(self) -> None:
+        """Read the records appended to the file since the last call (by this or another worker)"""
+        if self._path is None:
+            return
+        try:
+            size = self._path.stat().st_size
+        except FileNotFoundError:
+            return
+        complete = (size - self._offset) // _RECORD.itemsize  # a record still being written is skipped
+        if complete <= 0:
+            return
+        try:
+            with open(self._path, "rb") as f:
+                f.seek(self._offset)
+                records = np.fromfile(f, dtype=_RECORD, count=complete)
+        except OSError as e:
+            logger.warning(f"Could not read the near-duplicate index: {e}")
+            return
+        self._offset += len(records) * _RECORD.itemsize
+        self._insert([key.hex() for key in records["key"]], records["signature"])
+
+
+_index: NearDuplicateIndex | None = None
+_index_lock = threading.Lock()
+
+
+def _index_path() -> Path | None:
+    if not posting_cache.DIRECTORY:
+        return None
+    return Path(posting_cache.DIRECTORY, f"near-duplicates-{NUM_PERM}.bin")
+
+
+def get_index() -> NearDuplicateIndex | None:
+    """The index next to the posting cache; None when the posting cache is disabled"""
+    global _index
+    path = _index_path()
+    if path is None:
+        return None
+    with _index_lock:
+        if _index is None or _index.path != path:
+            _index = NearDuplicateIndex(path)
+        return _index
+
+
+def find_duplicate(posting_signature: np.ndarray | None) -> tuple[str, float] | None:
+    """(posting cache digest, similarity) of a known near-duplicate of the posting"""
+    index = get_index()
+    if index is None or posting_signature is None:
+        return None
+    return index.find(posting_signature)
+
+
+def remember(text_digest: str, posting_signature: np.ndarray | None) -> None:
+    index = get_index()
+    if index is not None and posting_signature is not None:
+        index.add(text_digest, posting_signature)
@@ -0,0 +1,266 @@
+"""
+Speculative pre-warming of the review and gap analysis after a job description was extracted.
+
+Users nearly always ask for the match review and the gap analysis right after extracting a job
+description. When enabled (`PREWARM_ANALYSES=1`), the extraction endpoint schedules both for the
+profile on a single low-priority background thread. The AI model requests they make are marked
+as speculative: their responses are kept in a short-lived cache keyed by the exact request
+(model + messages), and `request_model` serves the follow-up request from it - or waits for the
+speculative request if it is still running - instead of calling the provider a second time.
+Since the key is the request itself, any change to the profile or job simply misses the cache.
+
+The key of a speculative request is only known once its prompt is built, which may be after the
+follow-up request arrived. So each scheduled run also registers, before any work starts, one
+pending slot per feature and (profile, job); a follow-up served inside `follow_up(profile_id, job)`
+waits for that slot to learn the key instead of calling the provider in parallel. A caller about
+to request one of the features itself passes it as `skip`, so it is not pre-warmed at all.
+
+Speculative work is capped per profile (`PREWARM_MAX_PER_PROFILE` runs per hour) and by the
+length of the background queue; `prewarm_stats()` reports how much of it was actually used.
+"""
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from loguru import logger
+
+from .shared_cache import make_cache
+
+ENABLED = os.getenv("PREWARM_ANALYSES", "0").lower() in ("1", "true", "yes")
+TTL = float(os.getenv("PREWARM_TTL", "300"))
+MAX_PER_PROFILE = int(os.getenv("PREWARM_MAX_PER_PROFILE", "20"))
+MAX_QUEUE = int(os.getenv("PREWARM_MAX_QUEUE", "8"))
+WAIT_TIMEOUT = 30.0  # how long a follow-up request waits for a running speculative request
+WINDOW = 3600.0
+
+# Features whose requests are pre-warmed; only their follow-up requests count as hits or misses
+FEATURES = ("review", "gaps")
+
+_speculative = contextvars.ContextVar("speculative", default=False)
+# (profile id, job hash) of the speculative run, or of the follow-up request being served
+_scope: contextvars.ContextVar[tuple[int, str] | None] = contextvars.ContextVar("prewarm_scope", default=None)
+# (profile id, job hash, feature) -> resolved once that speculative run registered its request (or gave up)
+_upcoming: dict[tuple[int, str, str], Future] = {}
+_responses = make_cache("prewarm-responses", maxsize=512, ttl=TTL)
+_pending: dict[str, Future] = {}
+_scheduled = make_cache("prewarm-scheduled", maxsize=1024, ttl=TTL)  # (profile id, job hash) already pre-warmed
+_runs: dict[int, deque] = {}
+_queued = 0
+_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+
+_stats = {"scheduled": 0, "skipped": 0, "completed": 0, "failed": 0, "hits": 0, "misses": 0}
+
+
+def enabled() -> bool:
+    return ENABLED
+
+
+def request_key(model: str, messages: list[dict]) -> str:
+    return hashlib.sha256(json.dumps([model, messages], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def job_hash(job_description: Any) -> str:
+    return hashlib.sha256(job_description.model_dump_json().encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def follow_up(profile_id: int, job_description: Any) -> Iterator[None]:
+    """Serve a review or gap analysis of the job for the profile: lets it wait for a scheduled speculative run"""
+    if not ENABLED:
+        yield
+        return
+    token = _scope.set((profile_id, job_hash(job_description)))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def _resolve_upcoming(feature: str) -> None:
+    scope = _scope.get()
+    if scope is None:
+        return
+    with _lock:
+        future = _upcoming.pop((*scope, feature), None)
+    if future is not None:
+        future.set_result(None)
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _stats[name] += 1
+
+
+def cached_response(key: str, feature: str) -> str | None:
+    """
+    Response of a speculative request identical to `key`, waiting for it if it is still running.
+    Returns None (a miss) when there is none; always None inside a speculative request.
+    """
+    if _speculative.get():
+        return None
+
+    response = _responses.get(key) if len(_responses) else None
+    if response is None:
+        with _lock:
+            future = _pending.get(key)
+            scope = _scope.get()
+            upcoming = _upcoming.get((*scope, feature)) if future is None and scope is not None else None
+        if upcoming is not None:
+            # The speculative run for this profile and job has not built its request yet
+            try:
+                upcoming.result(timeout=WAIT_TIMEOUT)
+            except Exception:
+                pass
+            response = _responses.get(key)
+            with _lock:
+                future = _pending.get(key)
+        if response is None and future is not None:
+            try:
+                response = future.result(timeout=WAIT_TIMEOUT)
+            except Exception:
+                response = None
+
+    if feature in FEATURES and ENABLED:
+        _count("hits" if response is not None else "misses")
+    return response
+
+
+def begin_request(key: str, feature: str = "default") -> Future | None:
+    """Register a speculative request so follow-ups can wait for it; None outside speculative work"""
+    if not _speculative.get():
+        return None
+    future: Future = Future()
+    with _lock:
+        _pending[key] = future
+    _resolve_upcoming(feature)
+    return future
+
+
+def finish_request(key: str, future: Future | None, response: str | None) -> None:
+    if future is None:
+        return
+    if response is not None:
+        _responses.set(key, response)
+    with _lock:
+        _pending.pop(key, None)
+    future.set_result(response)
+
+
+def _allow(profile_id: int, job_key: str, features: tuple[str, ...] = ()) -> bool:
+    global _queued
+    now = time.monotonic()
+    with _lock:
+        runs = _runs.setdefault(profile_id, deque())
+        while runs and runs[0] < now - WINDOW:
+            runs.popleft()
+        if len(runs) >= MAX_PER_PROFILE or _queued >= MAX_QUEUE or _scheduled.get((profile_id, job_key)):
+            _stats["skipped"] += 1
+            return False
+        runs.append(now)
+        _queued += 1
+        _stats["scheduled"] += 1
+        for feature in features:
+            _upcoming[(profile_id, job_key, feature)] = Future()
+    _scheduled.set((profile_id, job_key), True)
+    return True
+
+
+def _run(task: Callable[[], Any]) -> None:
+    global _queued
+    _speculative.set(True)
+    try:
+        task()
+        _count("completed")
+    except Exception as e:
+        logger.warning(f"Speculative pre-warm failed: {e}")
+        _count("failed")
+    finally:
+        with _lock:
+            _queued -= 1
+
+
+def schedule(profile_id: int, job_key: str, task: Callable[[], Any], features: tuple[str, ...] = ()) -> bool:
+    """
+    Run `task` speculatively in the background unless the profile is over its cap,
+    the queue is full or the same job was pre-warmed for the profile recently.
+    Follow-ups of `features` for the profile and job wait for the task from now on.
+    """
+    global _executor
+    if not ENABLED or not _allow(profile_id, job_key, features):
+        return False
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prewarm")
+
+    def run() -> None:
+        _scope.set((profile_id, job_key))
+        try:
+            _run(task)
+        finally:
+            for feature in features:  # the ones that never got to a model request
+                _resolve_upcoming(feature)
+
+    _executor.submit(contextvars.copy_context().run, run)
+    return True
+
+
+def prewarm_analyses(
+    profile_id: int,
+    job_description: Any,
+    load_rows: Callable[[], tuple[Any, list, list] | None],
+    skip: tuple[str, ...] = (),
+) -> bool:
+    """
+    Schedule the review and gap analysis of `job_description` for the profile, except the
+    features in `skip` (the one the caller requests next itself).
+    `load_rows()` returns (profile, educations, experiences), or None if the profile does not exist;
+    it is called on the background thread.
+    """
+    from .gap_analyzer import analyze_gaps
+    from .review_user_application import review_from_user_and_job
+
+    features = tuple(feature for feature in FEATURES if feature not in skip)
+    if not features:
+        return False
+
+    def task():
+        rows = load_rows()
+        if rows is None:
+            return
+        profile, educations, experiences = rows
+        if "review" in features:
+            review_from_user_and_job(profile, educations, experiences, job_description)
+            _resolve_upcoming("review")
+        if "gaps" in features:
+            analyze_gaps(profile, educations, experiences, job_description)
+
+    return schedule(profile_id, job_hash(job_description), task, features)
+
+
+def prewarm_stats() -> dict[str, Any]:
+    """Counters of speculative work plus the share of follow-up requests it answered"""
+    with _lock:
+        stats: dict[str, Any] = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    stats["enabled"] = ENABLED
+    return stats
+
+
+def reset() -> None:
+    """Forget all speculative responses and counters"""
+    _responses.clear()
+    _scheduled.clear()
+    with _lock:
+        _runs.clear()
+        _upcoming.clear()
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,252 @@
+"""
+Per-request profiles: where the time of one slow request went.
+
+A profile is a breakdown of the request into spans - database statements, prompt building,
+AI model calls, answer parsing, anonymization, posting fetches - with their start offsets and
+durations, plus totals per span name. A request is profiled when
+
+- `PROFILING=1` and it carries an `X-Profile: 1` header: additionally, a sampling profiler
+  records the Python stacks of the service every `PROFILE_SAMPLE_INTERVAL` seconds (5 ms) while
+  the request runs, as collapsed stacks ("a;b;c" -> samples) ready for a flame graph viewer.
+  Concurrent requests show up in these samples as well; the response names the profile in
+  `X-Profile-Id`;
+- or it took at least `PROFILE_SLOW_MS` milliseconds (spans only; 0 turns this off).
+
+The last `PROFILE_BUFFER` profiles (default 20) are kept in memory and served by
+`/api/debug/profiles`. With neither setting the middleware is not installed and `span()` is a
+no-op, so there is no overhead.
+"""
+import functools
+import inspect
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+ENABLED = os.getenv("PROFILING", "0").lower() in ("1", "true", "yes")
+SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER", "20"))
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+MAX_SPANS = 1000  # per profile; a bulk request records the totals beyond it
+MAX_STACK_DEPTH = 40
+
+HEADER = "x-profile"
+_SOURCE_ROOT = str(Path(__file__).resolve().parent.parent)
+_NO_SPAN = nullcontext()
+
+_current: ContextVar["RequestProfile | None"] = ContextVar("request_profile", default=None)
+_profiles: deque["RequestProfile"] = deque(maxlen=BUFFER_SIZE)
+_profiles_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+def active() -> bool:
+    """Whether requests can be profiled at all (otherwise the middleware is not installed)"""
+    return ENABLED or SLOW_MS > 0
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, trigger: str):
+        self.id = next(_ids)
+        self.method = method
+        self.path = path
+        self.trigger = trigger  # "header" or "slow"
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.status: int | None = None
+        self.spans: list[tuple[str, float, float]] = []  # (name, start offset, duration)
+        self.totals: dict[str, list[float]] = {}  # name -> [count, seconds]
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+
+    def add_span(self, name: str, started: float, duration: float) -> None:
+        # Called from the event loop and from worker threads; list and dict updates are atomic
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append((name, started - self.started, duration))
+        total = self.totals.setdefault(name, [0, 0.0])
+        total[0] += 1
+        total[1] += duration
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "totals": {
+                name: {"count": count, "ms": round(seconds * 1000, 3)}
+                for name, (count, seconds) in sorted(self.totals.items(), key=lambda item: -item[1][1])
+            },
+        }
+
+    def details(self) -> dict[str, Any]:
+        return {
+            **self.summary(),
+            "spans": [
+                {"name": name, "start_ms": round(offset * 1000, 3), "ms": round(duration * 1000, 3)}
+                for name, offset, duration in self.spans
+            ],
+            "sample_interval_ms": SAMPLE_INTERVAL * 1000,
+            "samples": self.samples,
+            "stacks": dict(self.stacks.most_common()),
+        }
+
+
+def span(name: str):
+    """Context manager timing a block as a span of the current request's profile, if any"""
+    profile = _current.get()
+    if profile is None:
+        return _NO_SPAN
+    return _span(profile, name)
+
+
+@contextmanager
+def _span(profile: RequestProfile, name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_span(name, started, time.perf_counter() - started)
+
+
+def record(name: str, started: float, duration: float) -> None:
+    """Add an already measured span (e.g. from SQLAlchemy events) to the current profile"""
+    profile = _current.get()
+    if profile is not None:
+        profile.add_span(name, started, duration)
+
+
+def spanned(name: str) -> Callable[[Callable], Callable]:
+    """Decorator: every call of the function is a span of the current request's profile"""
+
+    def decorate(function: Callable) -> Callable:
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await function(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+class _Sampler(threading.Thread):
+    """Samples the stacks of all other threads while a profiled request runs"""
+
+    def __init__(self, profile: RequestProfile):
+        super().__init__(name=f"profile-sampler-{profile.id}", daemon=True)
+        self.profile = profile
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            self.profile.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    stack = _collapsed(frame)
+                    if stack:
+                        self.profile.stacks[stack] += 1
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+def _collapsed(frame) -> str | None:
+    """"outer;...;inner" for a stack that runs code of this service, else None (idle threads)"""
+    names = []
+    ours = False
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        filename = code.co_filename
+        if filename.startswith(_SOURCE_ROOT) and "site-packages" not in filename:
+            ours = True
+            names.append(f"{code.co_name} ({Path(filename).name}:{frame.f_lineno})")
+        else:
+            names.append(code.co_name)
+        frame = frame.f_back
+    return ";".join(reversed(names)) if ours else None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests asked for by header or found to be slow"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = ENABLED and any(
+            name == HEADER.encode() and value.strip().lower() in (b"1", b"true", b"yes")
+            for name, value in scope["headers"]
+        )
+        if not requested and SLOW_MS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], "header" if requested else "slow")
+        sampler = _Sampler(profile) if requested else None
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                if requested:
+                    headers = list(message.get("headers", [])) + [(b"x-profile-id", str(profile.id).encode())]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current.set(profile)
+        if sampler is not None:
+            sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            _current.reset(token)
+            if sampler is not None:
+                sampler.stop()
+            profile.duration = time.perf_counter() - profile.started
+            if requested or profile.duration * 1000 >= SLOW_MS:
+                with _profiles_lock:
+                    _profiles.append(profile)
+
+
+def profiles() -> list[dict[str, Any]]:
+    """Summaries of the kept profiles, newest first"""
+    with _profiles_lock:
+        return [profile.summary() for profile in reversed(_profiles)]
+
+
+def get_profile(profile_id: int) -> dict[str, Any] | None:
+    with _profiles_lock:
+        for profile in _profiles:
+            if profile.id == profile_id:
+                return profile.details()
+    return None
+
+
+def clear() -> None:
+    with _profiles_lock:
+        _profiles.clear()
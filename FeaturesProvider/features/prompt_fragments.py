@@ -0,0 +1,151 @@
+"""
+Rendering of the profile, education and experience blocks that go into the AI prompts.
+
+Every feature (CV, review, gap analysis, ranking) used to render these blocks on each call.
+Rendered fragments are cached per (row id, row `updated_at`), both per row and for the
+whole list, so a profile with dozens of entries is only formatted once until it changes.
+Rows without an id or `updated_at` (not stored yet) are rendered without caching.
+
+All features working on one (profile, job) pair open their prompt with the same
+`format_shared_prefix()` block, byte for byte, so the provider's prompt cache can be
+reused between the CV, review, gap analysis and cover letter requests.
+"""
+from typing import Any, Callable, Hashable
+
+from database.db_interface import Education, Experience, Profile
+from models import JobDescriptionResponse
+
+from .cache import LRUCache
+from .profiling import spanned
+
+_MISSING = object()
+
+_fragments = LRUCache(maxsize=8192)
+
+SHARED_INSTRUCTIONS = (
+    "You are a career assistant helping a candidate apply for one specific job.\n"
+    "The candidate and the job are described below; the task follows in the next message.\n"
+    "Base everything you write on this information only and never invent facts about the candidate."
+)
+
+
+def clear_fragment_cache() -> None:
+    _fragments.clear()
+
+
+def _row_key(kind: str, row: Any) -> Hashable | None:
+    row_id = getattr(row, "id", None)
+    updated_at = getattr(row, "updated_at", None)
+    if row_id is None or updated_at is None:
+        return None
+    return kind, row_id, updated_at
+
+
+def _cached(key: Hashable | None, render: Callable[[], str]) -> str:
+    if key is None:
+        return render()
+    text = _fragments.get(key, _MISSING)
+    if text is _MISSING:
+        text = render()
+        _fragments.set(key, text)
+    return text
+
+
+def _render_education(edu: Education) -> str:
+    end_date = edu.end_date.strftime("%Y-%m") if edu.end_date is not None else "Present"
+    return f"- {edu.institution}, {edu.degree}, {edu.start_date.strftime('%Y-%m')} to {end_date}" + (
+        f", {edu.additional_info}" if edu.additional_info is not None else ""
+    )
+
+
+def _render_experience(exp: Experience) -> str:
+    end_date = exp.end_date if exp.end_date is not None else "Present"
+    return f"- {exp.company}, {exp.job_title}, {exp.start_date} to {end_date}" + (
+        f"\n  {exp.description}" if exp.description is not None else ""
+    )
+
+
+def _format_rows(kind: str, rows: list, render: Callable[[Any], str], empty: str) -> str:
+    if not rows:
+        return empty
+
+    row_keys = [_row_key(kind, row) for row in rows]
+    list_key = None if None in row_keys else (kind + "-list", tuple(row_keys))
+    return _cached(
+        list_key,
+        lambda: "\n".join(_cached(key, lambda row=row: render(row)) for key, row in zip(row_keys, rows)),
+    )
+
+
+def format_education(educations: list[Education]) -> str:
+    """Education entries of a profile, one line per entry"""
+    return _format_rows("education", educations, _render_education, "No formal education provided")
+
+
+def format_experience(experiences: list[Experience]) -> str:
+    """Experience entries of a profile, the description indented below each entry"""
+    return _format_rows("experience", experiences, _render_experience, "No work experience provided")
+
+
+def format_profile_summary(profile: Profile) -> str:
+    """Name and about me of the candidate"""
+    return _cached(
+        _row_key("profile-summary", profile),
+        lambda: f"Name: {profile.first_name} {profile.last_name}\nAbout: {profile.about_me or 'Not provided'}",
+    )
+
+
+def format_profile_contacts(profile: Profile) -> str:
+    """Full candidate information block (contacts, links, about me)"""
+    return _cached(
+        _row_key("profile-contacts", profile),
+        lambda: "\n".join(
+            [
+                f"Full Name: {profile.first_name} {profile.last_name}",
+                f"Email: {profile.email}",
+                f"Location: {profile.city or ''}, {profile.state or ''}, {profile.country or ''}",
+                f"Phone: {profile.phone or 'Not provided'}",
+                f"LinkedIn: {profile.linkedin_url or 'Not provided'}",
+                f"GitHub: {profile.github_url or 'Not provided'}",
+                f"Personal Website: {profile.personal_website or 'Not provided'}",
+                f"Other URL: {profile.other_url or 'Not provided'}",
+                f"About Me: {profile.about_me or 'Not provided'}",
+            ]
+        ),
+    )
+
+
+def format_job_description(job_description: JobDescriptionResponse) -> str:
+    """Parsed job description block"""
+    return "\n".join(
+        [
+            f"Job Title: {job_description.title or 'Not provided'}",
+            f"Company: {job_description.company_name or 'Not provided'}",
+            f"Company Address: {job_description.company_address or 'Not provided'}",
+            f"Location: {job_description.company_city or 'Not provided'}",
+            f"Recruiter: {job_description.recruiter_name or 'Not provided'}",
+            f"Job Description: {job_description.description or 'Not provided'}",
+        ]
+    )
+
+
+@spanned("prompt")
+def format_shared_prefix(
+    profile: Profile,
+    educations: list[Education],
+    experiences: list[Experience],
+    job_description: JobDescriptionResponse,
+) -> str:
+    """
+    Leading prompt block shared by all features: instructions, candidate and job.
+    Pass it as `shared_prefix` to `request_model`; it must not contain anything task specific.
+    """
+    return "\n\n".join(
+        [
+            SHARED_INSTRUCTIONS,
+            f"CANDIDATE INFORMATION:\n{format_profile_contacts(profile)}",
+            f"EDUCATION:\n{format_education(educations)}",
+            f"WORK EXPERIENCE:\n{format_experience(experiences)}",
+            f"TARGET JOB:\n{format_job_description(job_description)}",
+        ]
+    )
@@ -0,0 +1,75 @@
+"""
+Reversible pseudonymization of the candidate's personal details in AI prompts.
+
+`request_model(..., pseudonyms=for_profile(profile))` replaces the profile's name, email, phone
+and links in the prompt with fixed tokens such as {{CANDIDATE_EMAIL}} and puts the real values
+back into the response. The provider never sees these details, and the prompts of two candidates
+with otherwise identical data are identical, so provider-side and local response caches can be
+shared between them. The tokens are the same for every profile; the mapping back to the real
+values lives only in the `Pseudonyms` object of the request.
+
+Enabled by default; `PSEUDONYMIZE_PROMPTS=0` sends the real values.
+"""
+import os
+import re
+from typing import Any, Callable
+
+ENABLED = os.getenv("PSEUDONYMIZE_PROMPTS", "1").lower() in ("1", "true", "yes")
+
+INSTRUCTION = (
+    "Tokens in double curly braces, such as {{CANDIDATE_NAME}} or {{CANDIDATE_EMAIL}}, stand for the candidate's "
+    "personal details. Write them exactly as they are wherever those details belong."
+)
+
+# Token and profile value it stands for; longer values are replaced first
+_FIELDS: tuple[tuple[str, Callable[[Any], str | None]], ...] = (
+    ("CANDIDATE_NAME", lambda p: f"{p.first_name or ''} {p.last_name or ''}".strip()),
+    ("CANDIDATE_FIRST_NAME", lambda p: p.first_name),
+    ("CANDIDATE_LAST_NAME", lambda p: p.last_name),
+    ("CANDIDATE_EMAIL", lambda p: p.email),
+    ("CANDIDATE_PHONE", lambda p: p.phone),
+    ("CANDIDATE_LINKEDIN", lambda p: p.linkedin_url),
+    ("CANDIDATE_GITHUB", lambda p: p.github_url),
+    ("CANDIDATE_WEBSITE", lambda p: p.personal_website),
+    ("CANDIDATE_OTHER_URL", lambda p: p.other_url),
+)
+
+_TOKEN_RE = re.compile(r"\{\{\s*([A-Z_]+)\s*\}\}")
+
+
+class Pseudonyms:
+    """Mapping of one request between real values and their tokens"""
+
+    __slots__ = ("_tokens", "_values", "_pattern")
+
+    def __init__(self, values: dict[str, str]):
+        """`values` maps token names (without braces) to the real values they stand for"""
+        self._values = {name: value for name, value in values.items() if value and len(value.strip()) > 1}
+        self._tokens: dict[str, str] = {}
+        for name, value in self._values.items():
+            self._tokens.setdefault(value, "{{" + name + "}}")
+        # Whole words only, so a first name "Will" leaves "willing" alone
+        alternatives = "|".join(re.escape(value) for value in sorted(self._tokens, key=len, reverse=True))
+        self._pattern = re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)") if alternatives else None
+
+    def __bool__(self) -> bool:
+        return self._pattern is not None
+
+    def apply(self, text: str) -> str:
+        """`text` with every real value replaced by its token"""
+        if self._pattern is None or not text:
+            return text
+        return self._pattern.sub(lambda m: self._tokens[m.group()], text)
+
+    def restore(self, text: str) -> str:
+        """`text` with every known token replaced by the real value; unknown tokens are kept"""
+        if not self._values or "{{" not in text:
+            return text
+        return _TOKEN_RE.sub(lambda m: self._values.get(m.group(1), m.group()), text)
+
+
+def for_profile(profile: Any) -> Pseudonyms | None:
+    """Pseudonyms of the profile's personal details, or None when pseudonymization is disabled"""
+    if not ENABLED:
+        return None
+    return Pseudonyms({name: value(profile) for name, value in _FIELDS})
@@ -0,0 +1,165 @@
+"""
+Response encoding: orjson bodies, one-pass serialization of ORM results, compression.
+
+- `JSONResponse` (FastAPI's `ORJSONResponse`) is the app's default response class: orjson
+  writes the body several times faster than the standard `json` module.
+- For a `response_model`, FastAPI validates what the endpoint returns, dumps the model to
+  Python objects (in a worker thread for sync endpoints) and only then encodes them.
+  `orm_response()` does it in one pass: pydantic validates the ORM rows (`from_attributes`)
+  and writes the JSON bytes itself. Endpoints keep their `response_model` for the OpenAPI
+  schema; a returned `Response` is sent as it is.
+- `CompressionMiddleware` compresses bodies of at least `COMPRESS_MIN_SIZE` bytes (1000)
+  with brotli or gzip, whichever the client accepts (`Accept-Encoding`; brotli only if the
+  `brotli` package is installed). Streamed NDJSON is flushed chunk by chunk, so every line
+  still reaches the client as soon as it is produced. `COMPRESS_MIN_SIZE=0` turns it off.
+
+`python -m benchmarks.bench_responses` compares this with FastAPI's defaults.
+"""
+import os
+import zlib
+from functools import lru_cache
+from typing import Any
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1000"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))  # 11 is far too slow for responses
+
+JSONResponse = ORJSONResponse
+
+
+@lru_cache(maxsize=None)
+def _adapter(annotation: Any) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+def orm_response(annotation: Any, value: Any, status_code: int = 200) -> Response:
+    """`value` (ORM objects) validated as `annotation` and encoded to JSON in one pass"""
+    adapter = _adapter(annotation)
+    body = adapter.dump_json(adapter.validate_python(value, from_attributes=True), by_alias=True)
+    return Response(body, status_code=status_code, media_type="application/json")
+
+
+class _Responder:
+    """Sends the app's response through `compress()`; small or already encoded bodies as they are"""
+
+    content_encoding: str
+
+    def __init__(self, app, minimum_size: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start = None  # held back until the first body message decides the headers
+        self.compressing = False
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = ("content-encoding" in headers
+                                or headers.get("content-type", "").startswith("text/event-stream"))
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._flush_start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            if len(body) < self.minimum_size and not more_body:
+                await self._flush_start()
+                await self.send(message)
+                return
+            headers = MutableHeaders(raw=self.start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            headers["Content-Encoding"] = self.content_encoding
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            self.compressing = True
+        if self.compressing:
+            body = self.compress(body, more_body=more_body)
+            if self.start is not None and not more_body:
+                MutableHeaders(raw=self.start["headers"])["Content-Length"] = str(len(body))
+            message = {**message, "body": body}
+        await self._flush_start()
+        await self.send(message)
+
+    async def _flush_start(self):
+        if self.start is not None:
+            start, self.start = self.start, None
+            await self.send(start)
+
+    def compress(self, body: bytes, *, more_body: bool) -> bytes:
+        raise NotImplementedError
+
+
+class _GZipResponder(_Responder):
+    content_encoding = "gzip"
+
+    def __init__(self, app, minimum_size: int):
+        super().__init__(app, minimum_size)
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, body: bytes, *, more_body: bool) -> bytes:
+        compressed = self.compressor.compress(body)
+        return compressed + self.compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+
+
+class _BrotliResponder(_Responder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, body: bytes, *, more_body: bool) -> bytes:
+        compressed = self.compressor.process(body)
+        return compressed + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Codings of an `Accept-Encoding` header, without those refused with q=0"""
+    encodings = set()
+    for part in header.lower().split(","):
+        coding, _, params = part.partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            encodings.add(coding.strip())
+    return encodings
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing large responses with brotli or gzip"""
+
+    def __init__(self, app, minimum_size: int | None = None):
+        self.app = app
+        self.minimum_size = COMPRESS_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.minimum_size <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            responder = _BrotliResponder(self.app, self.minimum_size)
+        elif "gzip" in accepted:
+            responder = _GZipResponder(self.app, self.minimum_size)
+        else:
+            await self.app(scope, receive, send)
+            return
+        await responder(scope, receive, send)
@@ -1,8 +1,32 @@
+import math
+from typing import Any
+
 from database.db_interface import Education, Experience, Profile
 from loguru import logger
 from models import JobDescriptionResponse, ReviewResponse
+from pydantic import BaseModel, field_validator
 
+from . import metrics
 from .ai_api import request_model
+from .log_config import payload
+from .prompt_fragments import format_shared_prefix
+from .pseudonyms import for_profile
+from .structured_output import parse_or_repair
+
+
+class _ReviewAnswer(BaseModel):
+    """The AI model's review; the score is brought into 0-100"""
+
+    matchScore: int
+    suggestions: list[str] = []
+
+    @field_validator("matchScore", mode="before")
+    @classmethod
+    def _clamp(cls, value: Any) -> int:
+        score = float(value)
+        if not math.isfinite(score):  # JSON Infinity / NaN: round() would raise OverflowError
+            raise ValueError("the score must be a finite number")
+        return max(0, min(100, round(score)))
 
 
 def review_from_user_and_job(
@@ -21,42 +45,30 @@ def review_from_user_and_job(
     - job_description
     """
     # Create a prompt to analyze the match between candidate and job
-    prompt = f"""
+    shared_prefix = format_shared_prefix(profile, educations, experiences, job_description)
+    prompt = """
     Analyze this candidate for a job match and provide a score from 0-100 and suggestions.
-    
-    Job Title: {job_description.title}
-    Company: {job_description.company_name}
-    Job Description: {job_description.description}
-    
-    Candidate Information:
-    Name: {profile.first_name} {profile.last_name}
-    About: {profile.about_me or "Not provided"}
-    
-    Education:
-    {_format_education(educations)}
-    
-    Experience:
-    {_format_experience(experiences)}
-    
+
     Please provide:
     1. A match score between 0-100
     2. 3-5 specific, skills-related suggestions for how the candidate can improve their chances
 
-    Format your response as follows:
-    SCORE: [number]
-    SUGGESTIONS:
-    - [suggestion 1]
-    - [suggestion 2]
-    - [suggestion 3]
+    Respond with a JSON object only, formatted as follows:
+    {"matchScore": [number], "suggestions": ["[suggestion 1]", "[suggestion 2]", "[suggestion 3]"]}
     """
 
-    logger.info(f"Review user prompt: {prompt}")
+    log = logger.bind(feature="review", profile_id=profile.id)
+    log.opt(lazy=True).info("Review user prompt: {}", lambda: payload(prompt))
 
     # Call the AI model
-    response = request_model(prompt)
+    pseudonyms = for_profile(profile)
+    response = request_model(
+        prompt, shared_prefix=shared_prefix, feature="review", pseudonyms=pseudonyms, output_model=_ReviewAnswer
+    )
 
     if not response:
         # Fallback if API fails
+        metrics.fallback("review", "ai_unavailable")
         return ReviewResponse(
             matchScore=50,
             suggestions=[
@@ -64,42 +76,18 @@ def review_from_user_and_job(
             ],
         )
 
-    logger.info(f"Review user received response: {response}")
-
-    # Parse the response
-    try:
-        score_line = None
-        suggestions = []
-
-        lines = response.strip().split("\n")
-        for line in lines:
-            if line.startswith("SCORE:"):
-                score_text = line.replace("SCORE:", "").strip()
-                try:
-                    score = int(score_text)
-                    score = max(0, min(100, score))  # Ensure score is between 0-100
-                except ValueError:
-                    score = 50  # Default if parsing fails
-            elif line.startswith("-") and len(line) > 2:
-                suggestion = line[1:].strip()
-                if suggestion and not suggestion.isspace():
-                    suggestions.append(suggestion)
-
-        # If no suggestions were found, add a generic one
-        if not suggestions:
-            suggestions = [
-                f"Review your skills against the requirements for {job_description.title}",
-                f"Consider highlighting specific achievements relevant to {job_description.company_name}",
-                "Update your profile with more detailed technical skills",
-            ]
-
-        return ReviewResponse(
-            matchScore=score if "score" in locals() else 50,
-            suggestions=suggestions[:5],  # Limit to 5 suggestions
-        )
-
-    except Exception as e:
-        logger.error(f"Error parsing AI response: {e}")
+    log.opt(lazy=True).info("Review user received response: {}", lambda: payload(response))
+
+    # The repair request needs no candidate data, only the answer to correct
+    answer = parse_or_repair(
+        response,
+        _ReviewAnswer,
+        lambda repair: request_model(repair, feature="review", pseudonyms=pseudonyms, output_model=_ReviewAnswer),
+        feature="review",
+        fallback_parser=_parse_review_lines,
+    )
+    if answer is None:
+        metrics.fallback("review", "unparsable")
         return ReviewResponse(
             matchScore=50,
             suggestions=[
@@ -109,34 +97,36 @@ def review_from_user_and_job(
             ],
         )
 
-
-def _format_education(educations: list[Education]) -> str:
-    """Helper function to format education information for the prompt"""
-    if not educations:
-        return "No formal education provided"
-
-    edu_text = []
-    for edu in educations:
-        end_date = edu.end_date.strftime("%Y-%m") if edu.end_date is not None else "Present"
-        edu_text.append(
-            f"- {edu.institution}, {edu.degree}, {edu.start_date.strftime('%Y-%m')} to {end_date}"
-            + (f", {edu.additional_info}" if edu.additional_info is not None else "")
-        )
-
-    return "\n".join(edu_text)
-
-
-def _format_experience(experiences: list[Experience]) -> str:
-    """Helper function to format experience information for the prompt"""
-    if not experiences:
-        return "No work experience provided"
-
-    exp_text = []
-    for exp in experiences:
-        end_date = exp.end_date if exp.end_date is not None else "Present"
-        exp_text.append(
-            f"- {exp.company}, {exp.job_title}, {exp.start_date} to {end_date}"
-            + (f"\n  {exp.description}" if exp.description is not None else "")
-        )
-
-    return "\n".join(exp_text)
+    suggestions = [suggestion.strip() for suggestion in answer.suggestions if suggestion.strip()]
+    # If no suggestions were found, add a generic one
+    if not suggestions:
+        suggestions = [
+            f"Review your skills against the requirements for {job_description.title}",
+            f"Consider highlighting specific achievements relevant to {job_description.company_name}",
+            "Update your profile with more detailed technical skills",
+        ]
+
+    return ReviewResponse(
+        matchScore=answer.matchScore,
+        suggestions=suggestions[:5],  # Limit to 5 suggestions
+    )
+
+
+def _parse_review_lines(response: str) -> _ReviewAnswer | None:
+    """The former plain-text answer format: a "SCORE: n" line and "- suggestion" lines"""
+    score = None
+    suggestions = []
+    for line in response.strip().split("\n"):
+        line = line.strip()
+        if line.startswith("SCORE:"):
+            try:
+                score = int(line.replace("SCORE:", "").strip())
+            except ValueError:
+                score = 50  # Default if parsing fails
+        elif line.startswith("-") and len(line) > 2:
+            suggestion = line[1:].strip()
+            if suggestion and not suggestion.isspace():
+                suggestions.append(suggestion)
+    if score is None and not suggestions:
+        return None
+    return _ReviewAnswer(matchScore=50 if score is None else score, suggestions=suggestions)
@@ -0,0 +1,185 @@
+"""
+Caches shared by all worker processes of one host.
+
+With `WEB_CONCURRENCY` > 1 uvicorn runs several worker processes, and every in-process cache
+would be N cold copies. Two things are therefore kept in a SQLite file in WAL mode
+(`SHARED_CACHE_DB`, by default a file in the system temp dir when there is more than one
+worker), which any number of processes can read concurrently while one writes:
+
+- `SharedCache`: key/value entries with a time-to-live, a drop-in for `LRUCache` where the
+  values are JSON (the AI response caches). When the number of entries exceeds `maxsize`, the
+  oldest ones are dropped. A deleted or replaced entry is gone for every worker at once.
+- Generations: a counter per scope (e.g. one profile's job postings). A write bumps it with
+  `invalidate(scope)`; a worker holding in-process state built at an older `generation(scope)`
+  (the job ranking index) rebuilds it.
+
+Rendered profile fragments need neither: their keys contain the row's `updated_at`, so a
+changed profile is never served from another worker's outdated copy.
+
+Without `SHARED_CACHE_DB` (a single worker) `make_cache()` returns an `LRUCache` and the
+generations are plain counters of this process. A failing database is logged and treated as
+a cache miss; it never fails a request.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Hashable
+
+from loguru import logger
+
+from .cache import LRUCache
+
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+PATH = os.getenv(
+    "SHARED_CACHE_DB", os.path.join(tempfile.gettempdir(), "trackmyoffer-shared-cache.sqlite3") if WORKERS > 1 else ""
+)
+BUSY_TIMEOUT = 5.0  # seconds a writer waits for another process's write to finish
+EVICT_EVERY = 64  # writes between two checks for expired and surplus entries
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_age ON entries (namespace, stored_at);
+CREATE TABLE IF NOT EXISTS generations (scope TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID;
+"""
+
+_MISSING = object()
+_local = threading.local()
+_generations: dict[str, int] = {}  # without a database
+_generations_lock = threading.Lock()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """This thread's connection to the database (connections are neither shared by threads nor forked)"""
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    key = (path, os.getpid())
+    connection = connections.get(key)
+    if connection is None:
+        connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+        connections[key] = connection
+    return connection
+
+
+def _key(key: Hashable) -> str:
+    return key if isinstance(key, str) else repr(key)
+
+
+class SharedCache:
+    """Cache with the interface of `LRUCache`, stored in the shared database under `namespace`."""
+
+    def __init__(self, namespace: str, maxsize: int = 1024, ttl: float | None = None, path: str | None = None):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path or PATH
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    def __len__(self) -> int:
+        row = self._execute(
+            "SELECT COUNT(*) FROM entries WHERE namespace = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (self.namespace, time.time()),
+        )
+        return row[0] if row else 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        row = self._execute(
+            "SELECT value FROM entries WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (self.namespace, _key(key), time.time()),
+        )
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: Hashable, value: Any) -> None:
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        self._execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, value, stored_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, _key(key), json.dumps(value), now, expires_at),
+        )
+        self._writes += 1
+        if self._writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        value = self.get(key, _MISSING)
+        self._execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, _key(key)))
+        return default if value is _MISSING else value
+
+    def clear(self) -> None:
+        self._execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+        self.hits = 0
+        self.misses = 0
+
+    def evict(self) -> None:
+        """Drop expired entries, then the oldest ones beyond `maxsize`"""
+        self._execute("DELETE FROM entries WHERE namespace = ? AND expires_at < ?", (self.namespace, time.time()))
+        self._execute(
+            "DELETE FROM entries WHERE namespace = ? AND key IN ("
+            "SELECT key FROM entries WHERE namespace = ? ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.maxsize),
+        )
+
+    def _execute(self, sql: str, parameters: tuple) -> tuple | None:
+        """First result row of the statement; None when there is none or the database failed"""
+        try:
+            return _connect(self.path).execute(sql, parameters).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache {self.namespace!r} unavailable: {e}")
+            return None
+
+
+def make_cache(namespace: str, maxsize: int = 1024, ttl: float | None = None) -> LRUCache | SharedCache:
+    """A cache all workers share when there is a shared database, otherwise one of this process"""
+    if PATH:
+        return SharedCache(namespace, maxsize=maxsize, ttl=ttl)
+    return LRUCache(maxsize=maxsize, ttl=ttl)
+
+
+def generation(scope: str) -> int:
+    """Current generation of `scope`; it changes whenever any worker calls `invalidate(scope)`"""
+    if not PATH:
+        with _generations_lock:
+            return _generations.get(scope, 0)
+    try:
+        row = _connect(PATH).execute("SELECT value FROM generations WHERE scope = ?", (scope,)).fetchone()
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Shared cache unavailable, assuming {scope!r} changed: {e}")
+        return -1  # never equal to a stored generation, so the state is rebuilt
+    return row[0] if row else 0
+
+
+def invalidate(scope: str) -> int:
+    """Mark every worker's state of `scope` as outdated; returns the new generation"""
+    if not PATH:
+        with _generations_lock:
+            _generations[scope] = _generations.get(scope, 0) + 1
+            return _generations[scope]
+    try:
+        row = _connect(PATH).execute(
+            "INSERT INTO generations (scope, value) VALUES (?, 1) "
+            "ON CONFLICT (scope) DO UPDATE SET value = value + 1 RETURNING value",
+            (scope,),
+        ).fetchone()
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Shared cache unavailable, could not invalidate {scope!r}: {e}")
+        return -1
+    return row[0]
@@ -0,0 +1,326 @@
+"""
+Local skills dictionary and per-profile inverted index.
+
+The index maps every known skill to the profile rows that mention it
+(`Profile.about_me`, `Experience.description`, `Education.degree/additional_info`).
+It is maintained on write by the profile/education/experience handlers and verified
+against the rows at read time, so obvious gaps ("the job requires Kubernetes, the
+profile never mentions it") can be answered instantly, without the AI model.
+"""
+import re
+import threading
+from typing import Any
+
+from database.db_interface import Education, Experience, Profile
+from models import JobDescriptionResponse
+
+# Canonical skill name -> lowercase aliases (multi-word aliases are matched as token n-grams)
+SKILLS: dict[str, tuple[str, ...]] = {
+    "Python": ("python",),
+    "Java": ("java",),
+    "JavaScript": ("javascript", "ecmascript"),
+    "TypeScript": ("typescript",),
+    "Kotlin": ("kotlin",),
+    "Go": ("golang",),
+    "Rust": ("rust",),
+    "C++": ("c++", "cpp"),
+    "C#": ("c#", "csharp"),
+    ".NET": ("dotnet", "asp.net"),
+    "Ruby": ("ruby", "ruby on rails", "rails"),
+    "PHP": ("php",),
+    "Scala": ("scala",),
+    "Swift": ("swift",),
+    "SQL": ("sql",),
+    "PostgreSQL": ("postgresql", "postgres"),
+    "MySQL": ("mysql",),
+    "MongoDB": ("mongodb", "mongo"),
+    "Redis": ("redis",),
+    "Elasticsearch": ("elasticsearch", "elastic search"),
+    "Kafka": ("kafka", "apache kafka"),
+    "RabbitMQ": ("rabbitmq",),
+    "Docker": ("docker",),
+    "Kubernetes": ("kubernetes", "k8s"),
+    "Terraform": ("terraform",),
+    "Ansible": ("ansible",),
+    "AWS": ("aws", "amazon web services"),
+    "Azure": ("azure",),
+    "GCP": ("gcp", "google cloud"),
+    "Linux": ("linux",),
+    "Git": ("git",),
+    "CI/CD": ("ci cd", "cicd", "continuous integration"),
+    "Jenkins": ("jenkins",),
+    "React": ("react", "react.js", "reactjs"),
+    "Angular": ("angular",),
+    "Vue": ("vue", "vue.js", "vuejs"),
+    "Node.js": ("node.js", "nodejs"),
+    "Django": ("django",),
+    "Flask": ("flask",),
+    "FastAPI": ("fastapi",),
+    "Spring": ("spring", "spring boot"),
+    "GraphQL": ("graphql",),
+    "REST": ("rest", "restful", "rest api"),
+    "gRPC": ("grpc",),
+    "Microservices": ("microservices", "microservice"),
+    "Machine Learning": ("machine learning",),
+    "Deep Learning": ("deep learning",),
+    "TensorFlow": ("tensorflow",),
+    "PyTorch": ("pytorch",),
+    "Pandas": ("pandas",),
+    "NumPy": ("numpy",),
+    "Spark": ("spark", "pyspark", "apache spark"),
+    "Airflow": ("airflow",),
+    "HTML": ("html", "html5"),
+    "CSS": ("css", "css3"),
+    "Agile": ("agile",),
+    "Scrum": ("scrum",),
+    "Jira": ("jira",),
+    "Figma": ("figma",),
+    "Excel": ("excel",),
+    "Tableau": ("tableau",),
+    "Power BI": ("power bi", "powerbi"),
+}
+
+# Aliases that are also everyday English words ("you must excel at", "a REST period"): in job text they
+# only count when written capitalised ("Excel", "REST") and, at the start of a sentence or line, only as
+# an item of a list ("React, Vue", "- Rust" on its own line) or as the subject of a requirement
+# ("React is required"). A profile is matched without this filter: a missed skill there would be
+# reported as a gap, while an everyday word read as a skill only hides one.
+AMBIGUOUS_ALIASES = frozenset(
+    ("excel", "rest", "spring", "swift", "rust", "react", "agile", "rails", "spark", "flask", "ruby")
+)
+
+_ALIASES: dict[str, str] = {alias: skill for skill, aliases in SKILLS.items() for alias in aliases}
+_MAX_ALIAS_TOKENS = max(len(alias.split()) for alias in _ALIASES)
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9+#]+(?:\.[A-Za-z0-9+#]+)*")
+_SENTENCE_START_RE = re.compile(r"(?:^|[.!?:;\n]|^\s*[-*•])\s*(?:[-*•]\s*)?$")
+_LIST_ITEM_END_RE = re.compile(r"\s*(?:[,/|&]|$|\n|\band\b|\bor\b)")
+_REQUIREMENT_SUBJECT_RE = re.compile(
+    r"(?:\s+(?:experience|knowledge|skills))?\s+(?:is|are)\s+(?:a\s+)?"
+    r"(?:must|required|mandatory|essential|needed|expected|necessary|plus|preferred|nice to have|bonus)\b",
+    re.IGNORECASE,
+)
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?;])\s+|\n+")
+_MUST_HAVE_RE = re.compile(
+    r"\b(must|required|requires|requirement|requirements|mandatory|minimum|essential|need to|needs to|expected)\b",
+    re.IGNORECASE,
+)
+_NICE_TO_HAVE_RE = re.compile(
+    r"\b(nice to have|nice-to-have|a plus|bonus|preferred|ideally|recommended|optional)\b", re.IGNORECASE
+)
+
+
+def extract_skills(text: str | None, strict: bool = True) -> set[str]:
+    """
+    Canonical names of all dictionary skills mentioned in `text`; `strict` (job text) applies the
+    context check of AMBIGUOUS_ALIASES, profile text is matched with `strict=False`
+    """
+    if not text:
+        return set()
+
+    matches = list(_TOKEN_RE.finditer(text))
+    tokens = [match.group().lower() for match in matches]
+    found = set()
+    for start in range(len(tokens)):
+        for length in range(1, _MAX_ALIAS_TOKENS + 1):
+            if start + length > len(tokens):
+                break
+            alias = " ".join(tokens[start : start + length])
+            skill = _ALIASES.get(alias)
+            if skill and (not strict or alias not in AMBIGUOUS_ALIASES or _means_skill(text, matches[start])):
+                found.add(skill)
+    return found
+
+
+def _means_skill(text: str, match: re.Match) -> bool:
+    """Whether an ambiguous one-word alias names the skill (see AMBIGUOUS_ALIASES)"""
+    if not match.group()[0].isupper():
+        return False
+    line_start = text.rfind("\n", 0, match.start()) + 1
+    if not _SENTENCE_START_RE.search(text[line_start : match.start()]):
+        return True
+    return bool(_LIST_ITEM_END_RE.match(text, match.end()) or _REQUIREMENT_SUBJECT_RE.match(text, match.end()))
+
+
+def extract_job_requirements(job_description: JobDescriptionResponse) -> dict[str, bool]:
+    """
+    Skills the job asks for, mapped to True when they are a must-have.
+    A skill counts as must-have when it is mentioned in a sentence with a requirement
+    cue ("must", "required", "minimum", ...) and that sentence is not marked as optional.
+    """
+    requirements: dict[str, bool] = {}
+    for skill in extract_skills(job_description.title):
+        requirements[skill] = True
+
+    for sentence in _SENTENCE_SPLIT_RE.split(job_description.description or ""):
+        skills = extract_skills(sentence)
+        if not skills:
+            continue
+        must_have = bool(_MUST_HAVE_RE.search(sentence)) and not _NICE_TO_HAVE_RE.search(sentence)
+        for skill in skills:
+            requirements[skill] = requirements.get(skill, False) or must_have
+    return requirements
+
+
+class ProfileSkillsIndex:
+    """Inverted index skill -> profile rows mentioning it, for one profile."""
+
+    def __init__(self):
+        self._rows: dict[str, set[tuple[str, int]]] = {}
+        self._row_skills: dict[tuple[str, int], set[str]] = {}
+        self._row_versions: dict[tuple[str, int], Any] = {}
+
+    def __contains__(self, skill: str) -> bool:
+        return bool(self._rows.get(skill))
+
+    @property
+    def skills(self) -> set[str]:
+        return {skill for skill, rows in self._rows.items() if rows}
+
+    def rows_for(self, skill: str) -> set[tuple[str, int]]:
+        return set(self._rows.get(skill, ()))
+
+    def index_row(self, source: str, row_id: int, version: Any, text: str) -> None:
+        self.remove_row(source, row_id)
+        key = (source, row_id)
+        skills = extract_skills(text, strict=False)
+        self._row_skills[key] = skills
+        self._row_versions[key] = version
+        for skill in skills:
+            self._rows.setdefault(skill, set()).add(key)
+
+    def remove_row(self, source: str, row_id: int) -> None:
+        key = (source, row_id)
+        for skill in self._row_skills.pop(key, ()):
+            self._rows[skill].discard(key)
+        self._row_versions.pop(key, None)
+
+    def sync(self, rows: dict[tuple[str, int], tuple[Any, str]]) -> None:
+        """Bring the index in line with `rows` ({(source, id): (version, text)}), touching only changed rows."""
+        for key in set(self._row_versions) - set(rows):
+            self.remove_row(*key)
+        for key, (version, text) in rows.items():
+            if key not in self._row_versions or self._row_versions[key] != version:
+                self.index_row(key[0], key[1], version, text)
+
+
+def _profile_row(profile: Profile) -> tuple[tuple[str, int], tuple[Any, str]]:
+    return ("profile", profile.id), (profile.updated_at, profile.about_me or "")
+
+
+def _education_row(education: Education) -> tuple[tuple[str, int], tuple[Any, str]]:
+    text = f"{education.degree or ''}\n{education.additional_info or ''}"
+    return ("education", education.id), (education.updated_at, text)
+
+
+def _experience_row(experience: Experience) -> tuple[tuple[str, int], tuple[Any, str]]:
+    text = f"{experience.job_title or ''}\n{experience.description or ''}"
+    return ("experience", experience.id), (experience.updated_at, text)
+
+
+# Indexes of this process, keyed by profile id
+_indexes: dict[int, ProfileSkillsIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _update_existing(profile_id: int, key_and_row: tuple[tuple[str, int], tuple[Any, str]]) -> None:
+    (source, row_id), (version, text) = key_and_row
+    with _indexes_lock:
+        index = _indexes.get(profile_id)
+        if index is not None:
+            index.index_row(source, row_id, version, text)
+
+
+def index_profile(profile: Profile) -> None:
+    _update_existing(profile.id, _profile_row(profile))
+
+
+def index_education(education: Education) -> None:
+    _update_existing(education.profile_id, _education_row(education))
+
+
+def index_experience(experience: Experience) -> None:
+    _update_existing(experience.profile_id, _experience_row(experience))
+
+
+def remove_education(profile_id: int, education_id: int) -> None:
+    with _indexes_lock:
+        index = _indexes.get(profile_id)
+        if index is not None:
+            index.remove_row("education", education_id)
+
+
+def remove_experience(profile_id: int, experience_id: int) -> None:
+    with _indexes_lock:
+        index = _indexes.get(profile_id)
+        if index is not None:
+            index.remove_row("experience", experience_id)
+
+
+def drop_profile_skills(profile_id: int) -> None:
+    with _indexes_lock:
+        _indexes.pop(profile_id, None)
+
+
+def profile_skills_index(
+    profile: Profile, educations: list[Education], experiences: list[Experience]
+) -> ProfileSkillsIndex:
+    """
+    Return the skills index of the profile, built on first use.
+    The rows passed in are the source of truth: rows that were changed without going
+    through the write hooks are re-indexed, all others are reused as is.
+    """
+    rows = dict([_profile_row(profile)] + [_education_row(e) for e in educations] + [_experience_row(e) for e in experiences])
+    with _indexes_lock:
+        index = _indexes.setdefault(profile.id, ProfileSkillsIndex())
+        index.sync(rows)
+        return index
+
+
+def find_skill_gaps(
+    profile: Profile,
+    educations: list[Education],
+    experiences: list[Experience],
+    job_description: JobDescriptionResponse,
+) -> list[dict]:
+    """
+    Skills the job asks for that the profile never mentions.
+    Missing must-haves are Critical, missing optional skills are Nice-to-have.
+    """
+    index = profile_skills_index(profile, educations, experiences)
+    requirements = extract_job_requirements(job_description)
+
+    gaps = []
+    for skill, must_have in sorted(requirements.items(), key=lambda item: (not item[1], item[0])):
+        if skill in index:
+            continue
+        if must_have:
+            gaps.append(
+                {
+                    "gap_text": f"{skill} is required for this position but is not mentioned anywhere in your profile",
+                    "severity": "Critical",
+                    "suggestion": f"If you have worked with {skill}, describe where and how in the matching experience "
+                    f"or education entry; otherwise consider a project or course that covers it.",
+                }
+            )
+        else:
+            gaps.append(
+                {
+                    "gap_text": f"{skill} is mentioned in the job description but not in your profile",
+                    "severity": "Nice-to-have",
+                    "suggestion": f"Mention any exposure to {skill} in your experience descriptions or about me section.",
+                }
+            )
+    return gaps
+
+
+def merge_gaps(skill_gaps: list[dict], model_gaps: list[dict]) -> list[dict]:
+    """Skill gaps first, followed by the model's gaps that are not about an already reported skill"""
+    reported = {skill for gap in skill_gaps for skill in extract_skills(gap["gap_text"])}
+    merged = list(skill_gaps)
+    for gap in model_gaps:
+        if extract_skills(gap["gap_text"]) & reported:
+            continue
+        merged.append(gap)
+    return merged
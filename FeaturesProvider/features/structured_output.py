@@ -0,0 +1,142 @@
+"""
+Structured (JSON) answers from the AI model, parsed and validated in one place.
+
+A feature that wants a structured answer passes its pydantic output model to
+`request_model(..., output_model=...)`: providers that support it are asked for JSON matching
+the model's schema (`response_format`), the others only get the prompt's own instructions.
+`parse_or_repair()` then reads the answer:
+
+1. the first balanced JSON object in the text is decoded (`json.JSONDecoder.raw_decode`), so
+   code fences, prose around the object or a second object do not matter, and validated
+   against the output model;
+2. failing that, an optional feature-specific parser for older plain-text formats is tried;
+3. failing that, the model is asked once, with a short prompt quoting its answer and the
+   validation error, to correct the answer - much cheaper than repeating the original request.
+
+Only when the repaired answer cannot be used either does the feature fall back to its
+generic result. `parse_stats()` counts how each answer was obtained, per feature.
+"""
+import json
+import threading
+from typing import Any, Callable, TypeVar
+
+from loguru import logger
+from pydantic import BaseModel, ValidationError
+
+from .profiling import spanned
+
+# Providers (model name prefixes on OpenRouter) that accept a JSON schema in `response_format`
+JSON_SCHEMA_MODEL_PREFIXES = ("openai/", "google/gemini")
+MAX_OBJECT_STARTS = 32  # "{" positions tried before giving up on a response
+REPAIR_QUOTE_CHARS = 4000  # characters of a broken answer quoted back to the model
+
+T = TypeVar("T", bound=BaseModel)
+
+_decoder = json.JSONDecoder()
+_stats: dict[str, dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def response_format(output_model: type[BaseModel], model: str) -> dict | None:
+    """`response_format` request field asking `model` for JSON of `output_model`, if the provider supports it"""
+    if not model.startswith(JSON_SCHEMA_MODEL_PREFIXES):
+        return None
+    schema = {"name": output_model.__name__.strip("_"), "strict": False, "schema": output_model.model_json_schema()}
+    return {"type": "json_schema", "json_schema": schema}
+
+
+def extract_json(text: str) -> Any:
+    """The first complete JSON object in `text`; raises ValueError when there is none"""
+    start = text.find("{")
+    for _ in range(MAX_OBJECT_STARTS):
+        if start < 0:
+            break
+        try:
+            value, _end = _decoder.raw_decode(text, start)
+            return value
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
+    raise ValueError("no JSON object found")
+
+
+def _validation_error(error: ValidationError) -> str:
+    problems = [f"{'.'.join(map(str, e['loc'])) or 'object'}: {e['msg']}" for e in error.errors()[:5]]
+    return "; ".join(problems)
+
+
+def parse_output(
+    text: str, output_model: type[T], fallback_parser: Callable[[str], T | None] | None = None
+) -> tuple[T | None, str]:
+    """(parsed answer or None, how it was parsed or why it could not be)"""
+    try:
+        return output_model.model_validate(extract_json(text)), "parsed"
+    except ValidationError as e:
+        error = f"the JSON does not match the schema ({_validation_error(e)})"
+    except (ValueError, OverflowError) as e:  # OverflowError: a validator converting a huge number
+        error = str(e)
+    if fallback_parser is not None:
+        try:
+            parsed = fallback_parser(text)
+        except Exception as e:
+            logger.warning(f"Plain-text parser failed: {e}")
+            parsed = None
+        if parsed is not None:
+            return parsed, "fallback_parser"
+    return None, error
+
+
+def repair_prompt(answer: str, error: str, output_model: type[BaseModel]) -> str:
+    schema = json.dumps(output_model.model_json_schema(), separators=(",", ":"))
+    return (
+        f"Your previous answer could not be used: {error}.\n\n"
+        f"Previous answer:\n{answer[:REPAIR_QUOTE_CHARS]}\n\n"
+        "Reply with only the corrected JSON object, keeping its content, that matches this JSON schema:\n"
+        f"{schema}"
+    )
+
+
+@spanned("parse")
+def parse_or_repair(
+    answer: str,
+    output_model: type[T],
+    request: Callable[[str], str | None],
+    *,
+    feature: str = "default",
+    fallback_parser: Callable[[str], T | None] | None = None,
+) -> T | None:
+    """
+    The model's `answer` as `output_model`, asking for one repair through `request(prompt)` if it
+    cannot be parsed; None if the repaired answer cannot be used either.
+    """
+    parsed, outcome = parse_output(answer, output_model, fallback_parser)
+    if parsed is not None:
+        _count(feature, outcome)
+        return parsed
+
+    logger.warning(f"{feature}: unusable answer ({outcome}), asking for a repair")
+    repaired = request(repair_prompt(answer, outcome, output_model))
+    if repaired:
+        parsed, outcome = parse_output(repaired, output_model)
+        if parsed is not None:
+            _count(feature, "repaired")
+            return parsed
+    logger.error(f"{feature}: answer could not be repaired ({outcome if repaired else 'no answer'})")
+    _count(feature, "failed")
+    return None
+
+
+def _count(feature: str, outcome: str) -> None:
+    with _stats_lock:
+        counters = _stats.setdefault(feature, {"parsed": 0, "fallback_parser": 0, "repaired": 0, "failed": 0})
+        counters[outcome] += 1
+
+
+def parse_stats() -> dict[str, dict[str, int]]:
+    """Copy of the counters of how answers were parsed, per feature"""
+    with _stats_lock:
+        return {feature: dict(counters) for feature, counters in _stats.items()}
+
+
+def reset_parse_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
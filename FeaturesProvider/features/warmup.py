@@ -0,0 +1,138 @@
+"""
+Warm-up after a start, so the first requests are not the slow ones.
+
+`main.py` starts `run()` in a worker thread when the app starts up. It goes through:
+
+- `database`: opens `WARMUP_DB_CONNECTIONS` (4) pooled connections side by side and runs a
+  `SELECT 1` on each, so the pool keeps that many open connections;
+- `llm`: opens the connection to the AI provider (DNS, TCP and TLS handshake) in the session
+  that keeps it alive for the model calls (`ai_api.warm_connection`); `WARMUP_LLM=0` skips it,
+  `AI_API_URL` can point it at a local stand-in;
+- `features`: imports the feature modules, which are otherwise loaded on first use;
+- `pii`: compiles the anonymization patterns;
+- `templates`: reads and compiles the cover letter templates;
+- `gazetteer`: reads the city list of the job description heuristics.
+
+A failing step is reported and does not stop the others. `/ready` answers 503 until all
+steps are done and 200 afterwards, with the outcome and duration of every step.
+`WARMUP=0` skips the warm-up (the service is ready at once); so do the tests.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from loguru import logger
+
+ENABLED = os.getenv("WARMUP", "1").lower() in ("1", "true", "yes")
+DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", "4"))
+WARM_LLM = os.getenv("WARMUP_LLM", "1").lower() in ("1", "true", "yes")
+TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "5"))  # seconds for the connection to the AI provider
+
+_PII_SAMPLE = "Jane Doe, jane.doe@example.com, +49 30 1234567, Hauptstraße 5, 10115 Berlin, https://example.com"
+
+_state: dict[str, Any] = {"status": "starting", "steps": {}}
+_lock = threading.Lock()
+
+
+def _database(engine) -> str:
+    if engine is None or DB_CONNECTIONS <= 0:
+        return "skipped"
+    # Connections beyond the pool size would be closed again when returned
+    size = getattr(engine.pool, "size", None)
+    count = min(DB_CONNECTIONS, size()) if callable(size) else 1
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in connections:
+            connection.close()
+    return f"{count} connections"
+
+
+def _llm() -> str:
+    if not WARM_LLM:
+        return "skipped"
+    from . import ai_api
+
+    return f"HTTP {ai_api.warm_connection(timeout=TIMEOUT)}"
+
+
+def _features() -> str:
+    import features
+
+    for name in features.__all__:
+        getattr(features, name)
+    return f"{len(features.__all__)} functions"
+
+
+def _pii() -> str:
+    from .pii import anonymize_text
+
+    anonymize_text(_PII_SAMPLE, names_to_mask=["Jane Doe"])
+    return "ok"
+
+
+def _templates() -> str:
+    from .letter_templates import load_templates
+
+    return f"{len(load_templates())} templates"
+
+
+def _gazetteer() -> str:
+    from .job_heuristics import load_gazetteer
+
+    load_gazetteer()
+    return "ok"
+
+
+def _steps(engine) -> list[tuple[str, Callable[[], str]]]:
+    return [
+        ("database", lambda: _database(engine)),
+        ("llm", _llm),
+        ("features", _features),
+        ("pii", _pii),
+        ("templates", _templates),
+        ("gazetteer", _gazetteer),
+    ]
+
+
+def run(engine=None) -> dict[str, Any]:
+    """Run all steps (blocking; `main.py` calls it in a worker thread) and report as ready"""
+    with _lock:
+        _state.clear()
+        _state.update(status="warming_up", steps={})
+    started = time.perf_counter()
+    for name, step in _steps(engine):
+        step_started = time.perf_counter()
+        try:
+            result = {"status": "ok", "detail": step()}
+        except Exception as e:
+            logger.warning(f"Warm-up step {name} failed: {e}")
+            result = {"status": "error", "detail": str(e)}
+        result["ms"] = round((time.perf_counter() - step_started) * 1000, 1)
+        with _lock:
+            _state["steps"][name] = result
+    with _lock:
+        _state.update(status="ready", seconds=round(time.perf_counter() - started, 3))
+    logger.info(f"Warm-up done in {_state['seconds']} s")
+    return report()
+
+
+def skip() -> None:
+    """Ready without warming up (`WARMUP=0`, tests)"""
+    with _lock:
+        _state.clear()
+        _state.update(status="ready", steps={})
+
+
+def ready() -> bool:
+    return _state["status"] == "ready"
+
+
+def report() -> dict[str, Any]:
+    with _lock:
+        return {**_state, "steps": {name: dict(step) for name, step in _state["steps"].items()}}
@@ -1,18 +1,17 @@
+import asyncio
+import json
 import os
+import sys
+import tempfile
 from contextlib import asynccontextmanager
-from typing import List
+from typing import List, Literal
 
 from database.db_interface import DatabaseManager
-from fastapi import Depends, FastAPI, HTTPException, status
-from features import (
-    analyze_gaps,
-    generate_cover_letter_data,
-    job_description_from_text,
-    md_cv_from_user_and_job,
-    request_model,
-    review_from_user_and_job,
-    text_job_position_from_link,
-)
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
+import features
+from features import log_config, metrics, profiling, responses, warmup
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from loguru import logger
 from models import (
     EducationCreate,
@@ -21,15 +20,19 @@ from models import (
     ExperienceResponse,
     GapAnalysisResponse,
     GeneratedCV,
+    JobDescriptionBulkReceive,
     JobDescriptionReceive,
     JobDescriptionResponse,
+    JobPostingResponse,
+    JobRankingResponse,
     ProfileCreate,
     ProfileResponse,
+    RankedJobPosting,
     ReviewResponse,
 )
 from sqlalchemy.orm import Session
 
-app = FastAPI()
+log_config.configure()
 
 # Initialize database manager
 db_manager = DatabaseManager()
@@ -38,15 +41,29 @@ db_manager = DatabaseManager()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     testing = "PYTEST_CURRENT_TEST" in os.environ
-    if not testing:
-        logger.info("Creating database tables...")
-        db_manager.create_tables()
+    if not testing and db_manager.ensure_schema():
         logger.info("Database tables created")
+    if testing or not warmup.ENABLED:
+        warmup.skip()
+    else:
+        # In the background: /ready reports "warming_up" until it is done
+        app.state.warmup = asyncio.create_task(asyncio.to_thread(warmup.run, db_manager.engine))
+    metrics.start_flushing()
 
     yield None
+    if "features.job_fetcher" in sys.modules:  # don't import httpx just to close nothing
+        await features.job_fetcher.aclose()
+    if "features.pii_batch" in sys.modules:  # worker processes of bulk anonymization
+        await asyncio.to_thread(features.pii_batch.shutdown)
+    await logger.complete()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=responses.JSONResponse)
+app.add_middleware(responses.CompressionMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+if profiling.active():
+    app.add_middleware(profiling.ProfilingMiddleware)
+metrics.instrument_database()
 
 
 # Dependency to get database session
@@ -69,7 +86,7 @@ def greet(payload: dict[str, str]) -> dict[str, str]:
     if not name:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Name is required")
 
-    greeting = request_model(name)
+    greeting = features.request_model(name)
     if greeting is None:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -87,7 +104,7 @@ def get_profile(profile_id: int, db: Session = Depends(get_db)):
     profile = db_manager.get_profile(db, profile_id)
     if not profile:
         raise HTTPException(status_code=404, detail=f"Profile with id {profile_id} not found")
-    return profile
+    return responses.orm_response(ProfileResponse, profile)
 
 
 @app.post("/api/profile", response_model=ProfileResponse, status_code=status.HTTP_201_CREATED)
@@ -103,11 +120,13 @@ def create_or_update_profile(profile: ProfileCreate, db: Session = Depends(get_d
     if existing_profile:
         # Update existing profile
         updated_profile = db_manager.update_profile(db, existing_profile.id, profile.model_dump())
-        return updated_profile
+        features.index_profile(updated_profile)
+        return responses.orm_response(ProfileResponse, updated_profile, status.HTTP_201_CREATED)
     else:
         # Create new profile
         new_profile = db_manager.add_profile(db, profile.model_dump())
-        return new_profile
+        features.index_profile(new_profile)
+        return responses.orm_response(ProfileResponse, new_profile, status.HTTP_201_CREATED)
 
 
 @app.post("/api/profile/{profile_id}/education", response_model=EducationResponse, status_code=status.HTTP_201_CREATED)
@@ -121,7 +140,8 @@ def create_education(profile_id: int, education: EducationCreate, db: Session =
     if not profile:
         raise HTTPException(status_code=404, detail=f"Profile with id {profile_id} not found")
     education = db_manager.add_education(db, profile_id, education.model_dump())
-    return education
+    features.index_education(education)
+    return responses.orm_response(EducationResponse, education, status.HTTP_201_CREATED)
 
 
 @app.delete("/api/profile/{profile_id}/education/{education_id}", status_code=status.HTTP_200_OK)
@@ -135,6 +155,7 @@ def delete_education(profile_id: int, education_id: int, db: Session = Depends(g
     if not profile:
         raise HTTPException(status_code=404, detail=f"Profile with id {profile_id} not found")
     del_status = db_manager.delete_education(db, education_id)
+    features.remove_education(profile_id, education_id)
     return del_status
 
 
@@ -149,7 +170,7 @@ def get_educations(profile_id: int, db: Session = Depends(get_db)):
     # Get experiences
     educations = db_manager.get_educations(db, profile_id)
 
-    return educations
+    return responses.orm_response(List[EducationResponse], educations)
 
 
 @app.post("/api/experience", response_model=ExperienceResponse, status_code=201)
@@ -165,8 +186,9 @@ def create_experience(experience_data: ExperienceCreate, db: Session = Depends(g
 
     # Add the experience to the database
     experience = db_manager.add_experience(db, profile.id, experience_dict)
+    features.index_experience(experience)
 
-    return experience
+    return responses.orm_response(ExperienceResponse, experience, status.HTTP_201_CREATED)
 
 
 @app.delete("/api/{profile_id}/experiences/{experience_id}", status_code=status.HTTP_200_OK)
@@ -181,6 +203,7 @@ def delete_experience(profile_id: int, experience_id: int, db: Session = Depends
     if not profile:
         raise HTTPException(status_code=404, detail=f"Profile with id {profile_id} not found")
     del_status = db_manager.delete_experience(db, experience_id)
+    features.remove_experience(profile_id, experience_id)
     return del_status
 
 
@@ -195,16 +218,124 @@ def get_experiences(profile_id: int, db: Session = Depends(get_db)):
     # Get experiences
     experiences = db_manager.get_experiences(db, profile_id)
 
-    return experiences
+    return responses.orm_response(List[ExperienceResponse], experiences)
 
 
 @app.post("/api/extract-job-description", response_model=JobDescriptionResponse)
-def extract_job_description(job_description_raw: JobDescriptionReceive):
+async def extract_job_description(
+    job_description_raw: JobDescriptionReceive,
+    response: Response,
+    profile_id: int | None = None,
+    next_feature: Literal["review", "gaps"] | None = None,
+):
+    """
+    Parse a job description (text or link).
+    The `X-Extracted-By` header tells how the fields were found: "heuristics" (local rules only),
+    "ai", "cache" (a link whose posting text was parsed before) or "fallback" (AI model unavailable).
+    A link is fetched on the event loop, through the posting cache; the AI model request runs
+    on the thread pool and is skipped for a posting whose text was parsed before.
+    When speculative pre-warming is enabled and the caller passes its `profile_id`, the review
+    and the gap analysis for the extracted job are started in the background right away,
+    except the one named in `next_feature`, which the caller is about to request itself.
+    """
     jd_text = job_description_raw.jobDescription
     if jd_text.startswith("https://") or jd_text.startswith("http://"):
-        jd_text = text_job_position_from_link(jd_text)
+        try:
+            job_description = await features.job_description_from_link(jd_text)
+        except features.job_fetcher.FetchError as e:
+            raise HTTPException(status_code=422, detail=f"Could not read the job posting: {e}")
+    else:
+        job_description = await run_in_threadpool(features.job_description_from_text, jd_text)
+    if extracted_by := getattr(job_description, "_extracted_by", None):
+        response.headers["X-Extracted-By"] = extracted_by
+
+    if profile_id is not None and features.prewarm_enabled():
+        skip = (next_feature,) if next_feature else ()
+        features.prewarm_analyses(profile_id, job_description, lambda: _load_profile_rows(profile_id), skip=skip)
+    return job_description
+
 
-    return job_description_from_text(jd_text)
+@app.post("/api/extract-job-descriptions")
+async def extract_job_descriptions(
+    job_descriptions_raw: JobDescriptionBulkReceive,
+    fetch_concurrency: int | None = Query(None, ge=1, le=32),
+    parse_concurrency: int | None = Query(None, ge=1, le=16),
+):
+    """
+    Parse many job descriptions (texts or links) at once.
+    Links are fetched and all postings parsed concurrently, with bounded concurrency per stage.
+    Every result is streamed as an NDJSON line as soon as it is ready:
+    {"indices": [...], "job_description": {...}} or {"indices": [...], "error": "..."}, where
+    `indices` are the positions of the (identical) inputs it answers. The last line is
+    {"done": true, "items": ..., "unique": ..., "parsed": ..., "errors": ..., "seconds": ...}.
+    """
+    from features import job_ingest
+
+    stats = job_ingest.IngestStats()
+
+    async def events():
+        async for result in job_ingest.extract_job_descriptions(
+            job_descriptions_raw.jobDescriptions, fetch_concurrency, parse_concurrency, stats
+        ):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        yield json.dumps({"done": True, **stats.report()}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+def _load_profile_rows(profile_id: int):
+    """Profile with its educations and experiences, read in a session of its own"""
+    db = db_manager.get_session()
+    try:
+        profile = db_manager.get_profile(db, profile_id)
+        if not profile:
+            return None
+        return profile, db_manager.get_educations(db, profile_id), db_manager.get_experiences(db, profile_id)
+    finally:
+        db_manager.close_session(db)
+
+
+@app.get("/ready")
+def readiness(response: Response) -> dict:
+    """
+    Readiness: "ready" (200) once the warm-up after the start (database pool, connection to the
+    AI provider, feature modules, patterns and templates) is done, "warming_up" (503) before.
+    """
+    if not warmup.ready():
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return warmup.report()
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics() -> Response:
+    """Request, AI model, fallback and database metrics in the Prometheus text format"""
+    return Response(metrics.exposition(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/debug/profiles")
+def list_request_profiles() -> list[dict]:
+    """
+    Summaries of the last profiled requests (asked for with `X-Profile: 1` or slower than
+    `PROFILE_SLOW_MS`), newest first. 404 when profiling is disabled.
+    """
+    if not profiling.active():
+        raise HTTPException(status_code=404, detail="Request profiling is disabled")
+    return profiling.profiles()
+
+
+@app.get("/api/debug/profiles/{capture_id}")
+def get_request_profile(capture_id: int) -> dict:
+    """Spans and sampled stacks of one profiled request"""
+    profile = profiling.get_profile(capture_id) if profiling.active() else None
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Request profile {capture_id} not found")
+    return profile
+
+
+@app.get("/api/prewarm/stats")
+def get_prewarm_stats() -> dict:
+    """Counters of speculative pre-warming and the share of follow-up requests it answered"""
+    return features.prewarm_stats()
 
 
 @app.post("/api/build-cv", response_model=GeneratedCV)
@@ -219,7 +350,7 @@ def generate_cv(profile_id: int, job_description: JobDescriptionResponse, makeAn
         raise HTTPException(status_code=404, detail=f"Profile with id {profile_id} not found")
     educations = db_manager.get_educations(db, profile_id)
     experiences = db_manager.get_experiences(db, profile_id)
-    cv = md_cv_from_user_and_job(profile, educations, experiences, job_description)
+    cv = features.md_cv_from_user_and_job(profile, educations, experiences, job_description)
     if makeAnonymous:
         full_name = f"{profile.first_name or ''} {profile.last_name or ''}".strip()
         names = [full_name] if full_name else []
@@ -227,8 +358,63 @@ def generate_cv(profile_id: int, job_description: JobDescriptionResponse, makeAn
     return cv
 
 
+async def _ndjson_lines(request: Request):
+    buffer = b""
+    async for chunk in request.stream():
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+@app.post("/api/anonymize/batch")
+async def anonymize_batch(
+    request: Request,
+    workers: int | None = Query(None, ge=1, le=os.cpu_count() or 1),
+    chunksize: int = Query(32, ge=1, le=1024),
+):
+    """
+    Anonymize NDJSON documents in bulk on a process pool.
+    Input lines are {"text": ..., "names": [...], ...}; output lines are the same objects with the
+    text redacted, in input order, or {"line": n, "error": ...} for unreadable lines.
+    The last line reports the throughput: {"done": true, "documents": ..., "documents_per_second": ...}.
+
+    The body is processed in windows while it is being received. The output is spooled (to disk
+    once it is large) and sent afterwards: a streaming response cannot read the request body any more.
+    """
+    from features import pii_batch
+
+    stats = pii_batch.BatchStats()
+    output = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024, mode="w+b")
+
+    def redact(lines: list[bytes], start: int) -> None:
+        for line in pii_batch.anonymize_ndjson(lines, workers=workers, chunksize=chunksize, stats=stats, start=start):
+            output.write(line.encode("utf-8"))
+
+    window: list[bytes] = []
+    start = 1
+    async for line in _ndjson_lines(request):
+        window.append(line)
+        if len(window) >= pii_batch.WINDOW:
+            await run_in_threadpool(redact, window, start)
+            start += len(window)
+            window = []
+    if window:
+        await run_in_threadpool(redact, window, start)
+    output.write((json.dumps({"done": True, **stats.report()}) + "\n").encode("utf-8"))
+    output.seek(0)
+
+    def events():
+        with output:
+            while chunk := output.read(64 * 1024):
+                yield chunk
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @app.post("/api/match-position", response_model=ReviewResponse)
-async def review_cv(profile_id: int, job_description: JobDescriptionResponse, db: Session = Depends(get_db)):
+def review_cv(profile_id: int, job_description: JobDescriptionResponse, db: Session = Depends(get_db)):
     """
     Given profile id and job_description (already parsed),
     match given user against given job and evaluate the chances of passing.
@@ -239,7 +425,8 @@ async def review_cv(profile_id: int, job_description: JobDescriptionResponse, db
         raise HTTPException(status_code=404, detail=f"Profile with id {profile_id} not found")
     educations = db_manager.get_educations(db, profile_id)
     experiences = db_manager.get_experiences(db, profile_id)
-    return review_from_user_and_job(profile, educations, experiences, job_description)
+    with features.prewarm_follow_up(profile_id, job_description):
+        return features.review_from_user_and_job(profile, educations, experiences, job_description)
 
 
 @app.post("/api/generate-cover-letter")
@@ -249,9 +436,13 @@ def generate_cover_letter(
     style: str = "professional",
     notes: str = "",
     makeAnonymous: bool = False,
+    instant: bool = False,
     db: Session = Depends(get_db),
 ):
-    """Generate a cover letter based on profile and job description"""
+    """
+    Generate a cover letter based on profile and job description.
+    With `instant` the letter is rendered from a local template without calling the AI model.
+    """
 
     from features.pii import anonymize_text
 
@@ -266,12 +457,15 @@ def generate_cover_letter(
         # For more robust type safety, you could add validation for 'style' if needed.
 
         # Generate the full cover letter string
-        full_cover_letter = generate_cover_letter_data(
+        full_cover_letter = features.generate_cover_letter_data(
             db,
             profile,
             job_description,
             style,  # type: ignore
             notes,
+            experiences=db_manager.get_experiences(db, profile_id),
+            instant=instant,
+            educations=db_manager.get_educations(db, profile_id),
         )
         # Added type: ignore for style as generate_cover_letter_data expects LetterStyle
         # but we are passing a string. This is functionally fine for this use case.
@@ -301,12 +495,15 @@ def delete_profile(profile_id: int, db: Session = Depends(get_db)):
     if not profile:
         raise HTTPException(status_code=404, detail=f"Profile with id {profile_id} not found")
     del_status = db_manager.delete_profile(db, profile_id)
+    features.drop_job_posting_index(profile_id)
+    features.drop_profile_skills(profile_id)
     return del_status
 
 @app.post("/api/analyze-gaps", response_model=GapAnalysisResponse)
-async def analyze_experience_gaps(
+def analyze_experience_gaps(
     profile_id: int,
     job_description: JobDescriptionResponse,
+    stream: bool = False,
     db: Session = Depends(get_db)
 ):
     """
@@ -315,6 +512,10 @@ async def analyze_experience_gaps(
 
     Given profile id and job_description (already parsed),
     identify small experience or responsibility gaps where the candidate could add more information.
+
+    Missing skills are found locally (skills index) and always reported first.
+    With `stream=true` the response is NDJSON: the local gaps are sent right away
+    (`"final": false`), followed by the merged result once the AI model answered (`"final": true`).
     """
     profile = db_manager.get_profile(db, profile_id)
     if not profile:
@@ -323,5 +524,107 @@ async def analyze_experience_gaps(
     educations = db_manager.get_educations(db, profile_id)
     experiences = db_manager.get_experiences(db, profile_id)
 
-    result = analyze_gaps(profile, educations, experiences, job_description)
+    skill_gaps = features.find_skill_gaps(profile, educations, experiences, job_description)
+    if stream:
+        def events():
+            yield json.dumps({"gaps": skill_gaps, "final": False}) + "\n"
+            with features.prewarm_follow_up(profile_id, job_description):
+                result = features.analyze_gaps(
+                    profile, educations, experiences, job_description, skill_gaps=skill_gaps
+                )
+            yield json.dumps({**result, "final": True}) + "\n"
+
+        return StreamingResponse(events(), media_type="application/x-ndjson")
+
+    with features.prewarm_follow_up(profile_id, job_description):
+        result = features.analyze_gaps(profile, educations, experiences, job_description, skill_gaps=skill_gaps)
     return result
+
+
+@app.post("/api/{profile_id}/job-postings", response_model=JobPostingResponse, status_code=status.HTTP_201_CREATED)
+def create_job_posting(profile_id: int, job_description: JobDescriptionResponse, db: Session = Depends(get_db)):
+    """
+    Save a parsed job description for the given profile id, so it takes part in the ranking
+    404 on an invalid profile id
+    """
+    profile = db_manager.get_profile(db, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail=f"Profile with id {profile_id} not found")
+    job_posting = db_manager.add_job_posting(db, profile_id, job_description.model_dump())
+    features.index_job_posting(job_posting)
+    return responses.orm_response(JobPostingResponse, job_posting, status.HTTP_201_CREATED)
+
+
+@app.get("/api/{profile_id}/job-postings", response_model=List[JobPostingResponse])
+def get_job_postings(profile_id: int, db: Session = Depends(get_db)):
+    """Get all saved job postings for a profile"""
+    profile = db_manager.get_profile(db, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail=f"Profile with id {profile_id} not found")
+    return responses.orm_response(List[JobPostingResponse], db_manager.get_job_postings(db, profile_id))
+
+
+@app.delete("/api/{profile_id}/job-postings/{job_posting_id}", status_code=status.HTTP_200_OK)
+def delete_job_posting(profile_id: int, job_posting_id: int, db: Session = Depends(get_db)):
+    """
+    Delete saved job posting with given job_posting_id and profile_id
+    404 on an invalid profile id
+    """
+    profile = db_manager.get_profile(db, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail=f"Profile with id {profile_id} not found")
+    del_status = db_manager.delete_job_posting(db, job_posting_id)
+    features.remove_job_posting(profile_id, job_posting_id)
+    return del_status
+
+
+@app.get("/api/{profile_id}/job-postings/ranking", response_model=JobRankingResponse)
+def rank_saved_job_postings(
+    profile_id: int,
+    top_k: int = Query(10, ge=1, le=100),
+    rerank: bool = False,
+    rerank_top: int = Query(5, ge=2, le=10),
+    db: Session = Depends(get_db),
+):
+    """
+    Rank all saved job postings of the profile by how well they fit the candidate.
+    The ranking is computed locally (vector similarity); with `rerank=true` the first
+    `rerank_top` results are additionally re-ordered by the AI model.
+    """
+    profile = db_manager.get_profile(db, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail=f"Profile with id {profile_id} not found")
+    educations = db_manager.get_educations(db, profile_id)
+    experiences = db_manager.get_experiences(db, profile_id)
+
+    ranked = features.rank_job_postings(
+        profile,
+        educations,
+        experiences,
+        posting_count=db_manager.count_job_postings(db, profile_id),
+        load_postings=lambda: db_manager.get_job_postings(db, profile_id),
+        top_k=top_k,
+    )
+    postings = {posting.id: posting for posting in db_manager.get_job_postings_by_ids(db, [i for i, _ in ranked])}
+    scores = dict(ranked)
+    ordered = [postings[job_posting_id] for job_posting_id, _ in ranked if job_posting_id in postings]
+
+    reranked = False
+    if rerank:
+        head = features.rerank_job_postings(profile, experiences, ordered[:rerank_top])
+        if head is not None:
+            ordered = head + ordered[rerank_top:]
+            reranked = True
+
+    return JobRankingResponse(
+        results=[
+            RankedJobPosting(
+                job_posting_id=posting.id,
+                title=posting.title,
+                company_name=posting.company_name,
+                score=round(scores[posting.id], 4),
+            )
+            for posting in ordered
+        ],
+        reranked=reranked,
+    )
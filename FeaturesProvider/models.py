@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, PrivateAttr
 from typing import Optional, Dict, Any, List
 from datetime import date
 
@@ -78,6 +78,11 @@ class JobDescriptionReceive(BaseModel):
     jobDescription: str
 
 
+class JobDescriptionBulkReceive(BaseModel):
+    # Links and/or job description texts
+    jobDescriptions: List[str] = Field(..., min_length=1, max_length=500)
+
+
 class JobDescriptionResponse(BaseModel):
     company_name: str
     company_address: str
@@ -87,6 +92,9 @@ class JobDescriptionResponse(BaseModel):
     title: str
     description: str
 
+    # How the fields were found ("heuristics", "ai", "fallback", "cache"); not serialized
+    _extracted_by: Optional[str] = PrivateAttr(default=None)
+
 
 class GeneratedCV(BaseModel):
     format: str = "md"
@@ -106,3 +114,29 @@ class Gap(BaseModel):
 
 class GapAnalysisResponse(BaseModel):
     gaps: List[Gap] = Field(..., description="List of identified gaps between candidate and job requirements")
+
+
+class JobPostingResponse(BaseModel):
+    id: int
+    profile_id: int
+    company_name: str
+    company_address: str
+    company_city: str
+    company_postal_code: str
+    recruiter_name: str
+    title: str
+    description: str
+
+    model_config = {"from_attributes": True}
+
+
+class RankedJobPosting(BaseModel):
+    job_posting_id: int
+    title: str
+    company_name: str
+    score: float = Field(..., description="Cosine similarity between the profile and the posting (0-1)")
+
+
+class JobRankingResponse(BaseModel):
+    results: List[RankedJobPosting]
+    reranked: bool = Field(False, description="True if the leading results were re-ordered by the AI model")
@@ -0,0 +1,52 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from features import metrics
+from features.ai_api import build_messages, request_model
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_build_messages_without_prefix():
+    assert build_messages("Hello") == [{"role": "user", "content": "Hello"}]
+
+
+@pytest.mark.parametrize(
+    "model, cache_hint",
+    [("anthropic/claude-sonnet-4", True), ("google/gemini-2.0-flash-exp:free", True), ("openai/gpt-4o", False)],
+)
+def test_build_messages_with_shared_prefix(model, cache_hint):
+    system, user = build_messages("Task", shared_prefix="Candidate and job", model=model)
+
+    assert system["role"] == "system"
+    assert system["content"][0]["text"] == "Candidate and job"
+    assert ("cache_control" in system["content"][0]) is cache_hint
+    assert user == {"role": "user", "content": "Task"}
+
+
+def test_request_model_records_cached_tokens():
+    response = MagicMock(status_code=200)
+    response.json.return_value = {
+        "choices": [{"message": {"content": "Done"}}],
+        "usage": {"prompt_tokens": 1200, "completion_tokens": 50, "prompt_tokens_details": {"cached_tokens": 1024}},
+    }
+
+    with patch("features.ai_api._session.post", return_value=response) as mock_post:
+        assert request_model("Task", shared_prefix="Shared", feature="review") == "Done"
+        assert request_model("Task", shared_prefix="Shared", feature="review") == "Done"
+
+    sent = mock_post.call_args.kwargs["json"]
+    assert sent["messages"][0]["content"][0]["text"] == "Shared"
+    assert sent["usage"] == {"include": True}
+    assert metrics.snapshot()["ai_tokens_total"] == {
+        ("review", "prompt"): 2400,
+        ("review", "cached"): 2048,
+        ("review", "completion"): 100,
+    }
+    assert 'ai_tokens_total{feature="review",kind="cached"} 2048' in metrics.render()
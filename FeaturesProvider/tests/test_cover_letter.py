@@ -1,8 +1,12 @@
+from datetime import date, datetime
+
 import pytest
 from unittest.mock import patch
 from sqlalchemy.orm import Session
 from database.db_interface import Profile, DatabaseManager
+from database.db_interface import Experience
 from features.cover_letter_generator import generate_cover_letter_data, generate_ai_content
+from features.letter_templates import CompiledTemplate, get_template, load_templates
 from models import JobDescriptionResponse
 
 
@@ -65,8 +69,10 @@ def test_generate_ai_content_fallback(sample_profile, sample_job_description_mod
         assert "john@example.com" in result
         assert "Tech Corp" in result
         assert "Senior Developer" in result
-        assert "Sincerely," in result
-        assert "My background includes: Experienced software developer with 5 years of experience." in result
+        assert "Best regards," in result
+        assert "Dear Jane Smith," in result
+        assert "Experienced software developer with 5 years of experience." in result
+        assert "{" not in result
 
 
 def test_generate_cover_letter_data(db: Session, sample_profile, sample_job_description_model):
@@ -104,6 +110,51 @@ def test_generate_cover_letter_data(db: Session, sample_profile, sample_job_desc
         assert "Experienced software developer with 5 years of experience." in prompt_sent_to_ai
 
 
+def test_generate_cover_letter_data_instant(db: Session, sample_profile, sample_job_description_model):
+    experiences = [
+        Experience(
+            job_title="Backend Developer",
+            company="Old Corp",
+            start_date=date(2020, 1, 1),
+            description="Designed Python services for payments. Mentored two juniors.",
+        )
+    ]
+    sample_job_description_model.description = "You must know Python and Kubernetes."
+
+    with patch("features.cover_letter_generator.request_model") as mock_request:
+        letter = generate_cover_letter_data(
+            db, sample_profile, sample_job_description_model, experiences=experiences, instant=True
+        )
+
+    mock_request.assert_not_called()
+    assert letter.startswith(datetime.now().strftime("%d/%m/%Y"))
+    assert "123 Tech Street\nSan Francisco, 94105" in letter
+    assert "Senior Developer position at Tech Corp" in letter
+    assert "focus on Kubernetes and Python" in letter
+    assert "Currently, I am working as a Backend Developer at Old Corp" in letter
+    assert "Old Corp. A highlight of my work at Old Corp: Designed Python services for payments. My" in letter
+    assert "My experience with Python matches" in letter
+    assert letter.endswith("John Doe\n1234567890\njohn@example.com")
+
+
+def test_templates_are_compiled_once_on_first_use():
+    # The tests run without the warm-up, so this is the first use
+    template = get_template("unknown-style")
+
+    assert template.name == "cover_letter_basic"
+    assert get_template("professional") is template
+    assert load_templates()["cover_letter_basic"] is template
+
+
+def test_compiled_template_drops_empty_field_lines():
+    template = CompiledTemplate("test", "Hello {name},\n{street}\n{city}, {zip}\n\nBye {{literal}}")
+
+    assert template.fields == {"name", "street", "city", "zip"}
+    assert template.render({"name": "Ann", "city": "Oslo"}) == "Hello Ann,\nOslo\n\nBye {literal}"
+    assert template.render({"name": "Ann", "zip": "0150"}) == "Hello Ann,\n0150\n\nBye {literal}"
+    assert template.render({"name": "Ann", "city": "Oslo", "zip": "0150"}) == "Hello Ann,\nOslo, 0150\n\nBye {literal}"
+
+
 @pytest.mark.xfail
 def test_ai_request_model():
     """Integration test for AI model request to generate a full letter."""
@@ -0,0 +1,359 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from features import job_fetcher, job_heuristics, posting_cache
+from features.job_fetcher import FetchError, TextExtractor, fetch_posting_text
+from main import app
+from models import JobDescriptionResponse
+
+POSTING = """<!DOCTYPE html>
+<html><head><title>Senior Python Engineer - SomeCorp</title>
+<style>body { color: red }</style>
+<script>var tracking = "<p>not text</p>";</script></head>
+<body>
+<header><a href="/">SomeCorp careers</a></header>
+<nav><ul><li>Jobs</li><li>About</li></ul></nav>
+<div role="navigation">Breadcrumbs</div>
+<main>
+  <h1>Senior   Python Engineer</h1>
+  <p>SomeCorp Ltd, Mockers avenue 48, 03523 Berlin.</p>
+  <ul><li>10 years of Python</li><li>Architecture &amp; design</li></ul>
+  <div hidden>Hidden <div>nested</div> text</div>
+  <p>Apply<br>today</p>
+</main>
+<footer>Imprint</footer>
+<noscript>Enable JavaScript</noscript>
+</body></html>"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    routes: dict = {}
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    requests: list = []
+    connections: list = []
+
+    def do_GET(self):
+        _Handler.requests.append((self.path, self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")))
+        _Handler.connections.append((self.headers.get("Host"), self.client_address[1]))
+        status, headers, body = self.routes[self.path]
+        if headers.get("ETag") and self.headers.get("If-None-Match") == headers["ETag"]:
+            status, body = 304, b""
+        if self.path.startswith("/slow"):
+            with _Handler.lock:
+                _Handler.active += 1
+                _Handler.peak = max(_Handler.peak, _Handler.active)
+            time.sleep(0.1)
+            with _Handler.lock:
+                _Handler.active -= 1
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304 and "Content-Length" not in headers and "Transfer-Encoding" not in headers:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if headers.get("Transfer-Encoding") == "chunked":
+            for start in range(0, len(body), 100):
+                part = body[start : start + 100]
+                self.wfile.write(f"{len(part):x}\r\n".encode() + part + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    html = {"Content-Type": "text/html; charset=utf-8"}
+    _Handler.routes = {
+        "/posting": (200, html, POSTING.encode()),
+        "/moved": (302, {"Location": "/posting"}, b""),
+        "/loop": (302, {"Location": "/loop"}, b""),
+        "/latin": (200, {"Content-Type": "text/html"}, '<meta charset="latin-1"><p>Köln</p>'.encode("latin-1")),
+        "/big": (200, html, b"<p>" + b"x" * 5000 + b"</p>"),
+        "/big-chunked": (200, {**html, "Transfer-Encoding": "chunked"}, b"<p>" + b"x" * 5000 + b"</p>"),
+        "/pdf": (200, {"Content-Type": "application/pdf"}, b"%PDF"),
+        "/gone": (404, html, b"<p>Not found</p>"),
+        "/empty": (200, html, b"<script>app()</script>"),
+        "/tagged": (200, {**html, "ETag": '"v1"', "Last-Modified": "Mon, 05 Oct 2026 10:00:00 GMT"}, POSTING.encode()),
+        "/to-tagged": (301, {"Location": "/tagged"}, b""),
+        "/private": (200, {**html, "Cache-Control": "no-store"}, b"<p>private</p>"),
+        "/throttled": (429, html, b""),
+        **{f"/slow{i}": (200, html, b"<p>slow</p>") for i in range(6)},
+    }
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(posting_cache, "DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(job_fetcher, "ALLOW_PRIVATE", True)  # the stand-in server is on localhost
+    _Handler.requests = []
+    _Handler.connections = []
+    return tmp_path
+
+
+def fetch(*urls: str) -> list:
+    async def run():
+        try:
+            return await asyncio.gather(*(fetch_posting_text(url) for url in urls), return_exceptions=True)
+        finally:
+            await job_fetcher.aclose()
+
+    return asyncio.run(run())
+
+
+def test_extracts_visible_text_only(server):
+    [text] = fetch(f"{server}/posting")
+
+    assert text == (
+        "Senior Python Engineer - SomeCorp\n"
+        "Senior Python Engineer\n"
+        "SomeCorp Ltd, Mockers avenue 48, 03523 Berlin.\n"
+        "10 years of Python\n"
+        "Architecture & design\n"
+        "Apply\n"
+        "today"
+    )
+
+
+def test_extractor_accepts_markup_in_any_pieces():
+    whole = TextExtractor()
+    whole.feed(POSTING)
+    whole.close()
+    pieces = TextExtractor()
+    for start in range(0, len(POSTING), 7):
+        pieces.feed(POSTING[start : start + 7])
+    pieces.close()
+
+    assert pieces.text == whole.text
+
+
+def test_follows_redirects_up_to_the_limit(server):
+    moved, looping = fetch(f"{server}/moved", f"{server}/loop")
+
+    assert moved.startswith("Senior Python Engineer")
+    assert isinstance(looping, FetchError) and "redirects more than" in str(looping)
+
+
+def test_charset_from_meta_tag(server):
+    assert fetch(f"{server}/latin") == ["Köln"]
+
+
+@pytest.mark.parametrize("path", ["/big", "/big-chunked"])
+def test_refuses_pages_over_the_size_cap(server, monkeypatch, path):
+    monkeypatch.setattr(job_fetcher, "MAX_BYTES", 1000)
+
+    [error] = fetch(server + path)
+
+    assert isinstance(error, FetchError) and "larger than 1000 bytes" in str(error)
+
+
+@pytest.mark.parametrize(
+    "link, message",
+    [("/pdf", "not a web page"), ("/gone", "HTTP 404"), ("/empty", "has no text"), ("ftp://host/x", "only http(s)")],
+)
+def test_unreadable_links_raise(server, link, message):
+    [error] = fetch(server + link if link.startswith("/") else link)
+
+    assert isinstance(error, FetchError) and message in str(error)
+
+
+@pytest.mark.parametrize(
+    "address", ["127.0.0.1", "10.1.2.3", "192.168.0.1", "169.254.169.254", "::1", "fd00:ec2::254", "::ffff:127.0.0.1"]
+)
+def test_non_public_addresses_are_refused(server, monkeypatch, address):
+    monkeypatch.setattr(job_fetcher, "ALLOW_PRIVATE", False)
+
+    async def resolve(host, port, **kwargs):
+        return [(socket.AF_INET6 if ":" in address else socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))]
+
+    with patch("asyncio.base_events.BaseEventLoop.getaddrinfo", side_effect=resolve):
+        [error] = fetch("http://jobs.example/posting")
+
+    assert isinstance(error, FetchError) and "not a public address" in str(error)
+    assert _Handler.requests == []
+
+
+def test_redirects_to_non_public_addresses_are_refused(server, monkeypatch):
+    port = int(server.rsplit(":", 1)[1])
+    _Handler.routes["/to-metadata"] = (302, {"Location": "http://metadata.internal/latest/meta-data/"}, b"")
+    monkeypatch.setattr(job_fetcher, "ALLOW_PRIVATE", False)
+    # The stand-in server counts as public, the name it redirects to resolves to the metadata service
+    monkeypatch.setattr(job_fetcher, "_public", lambda address: not address.is_link_local)
+    addresses = {"jobs.example": "127.0.0.1", "metadata.internal": "169.254.169.254"}
+
+    async def resolve(host, port, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (addresses[host], port))]
+
+    with patch("asyncio.base_events.BaseEventLoop.getaddrinfo", side_effect=resolve):
+        moved, refused = fetch(f"http://jobs.example:{port}/moved", f"http://jobs.example:{port}/to-metadata")
+
+    assert moved.startswith("Senior Python Engineer")  # sent to the checked address, for the right host
+    assert isinstance(refused, FetchError) and "metadata.internal is not a public address" in str(refused)
+
+
+def test_connections_are_pooled_per_host_name(server, monkeypatch):
+    port = int(server.rsplit(":", 1)[1])
+    monkeypatch.setattr(_Handler, "protocol_version", "HTTP/1.1")  # keep-alive
+
+    async def resolve(host, port, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port))]
+
+    async def run():
+        try:
+            for host in ("a.example", "b.example", "a.example"):
+                await fetch_posting_text(f"http://{host}:{port}/private")
+        finally:
+            await job_fetcher.aclose()
+
+    with patch("asyncio.base_events.BaseEventLoop.getaddrinfo", side_effect=resolve):
+        asyncio.run(run())
+
+    # Both names are on one address, but b.example does not get a.example's connection
+    (host_a, port_a), (host_b, port_b), (host_a2, port_a2) = _Handler.connections
+    assert (host_a, host_b, host_a2) == (f"a.example:{port}", f"b.example:{port}", f"a.example:{port}")
+    assert port_a == port_a2 != port_b
+
+
+def test_next_checked_address_is_tried_when_connecting_fails(server):
+    port = int(server.rsplit(":", 1)[1])
+
+    async def resolve(host, port, **kwargs):
+        # Nothing listens on ::1 (the stand-in server is bound to 127.0.0.1 only)
+        return [
+            (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("::1", port)),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port)),
+        ]
+
+    with patch("asyncio.base_events.BaseEventLoop.getaddrinfo", side_effect=resolve):
+        [text] = fetch(f"http://jobs.example:{port}/posting")
+
+    assert text.startswith("Senior Python Engineer")
+
+
+def test_requests_per_host_are_limited(server, monkeypatch):
+    monkeypatch.setattr(job_fetcher, "PER_HOST", 2)
+    _Handler.peak = 0
+
+    texts = fetch(*(f"{server}/slow{i}" for i in range(6)))
+
+    assert texts == ["slow"] * 6
+    assert _Handler.peak == 2
+
+
+def test_fresh_pages_come_from_the_cache(server):
+    first = fetch(f"{server}/posting")
+    second = fetch(f"{server}/posting")
+
+    assert first == second
+    assert len(_Handler.requests) == 1
+
+
+def test_stale_pages_are_revalidated(server, monkeypatch):
+    monkeypatch.setattr(posting_cache, "FRESH", 0)
+
+    [first] = fetch(f"{server}/to-tagged")
+    [second] = fetch(f"{server}/to-tagged")
+
+    assert first == second
+    # The redirect is followed once; revalidation goes to the page itself, with its validators
+    assert _Handler.requests == [
+        ("/to-tagged", None, None),
+        ("/tagged", None, None),
+        ("/tagged", '"v1"', "Mon, 05 Oct 2026 10:00:00 GMT"),
+    ]
+    assert posting_cache.load_page(f"{server}/to-tagged").final_url == f"{server}/tagged"
+
+
+def test_stale_copy_is_served_while_throttled(server, monkeypatch):
+    monkeypatch.setattr(posting_cache, "FRESH", 0)
+    posting_cache.store_page(posting_cache.CachedPage(url=f"{server}/x", final_url=f"{server}/throttled", text="old"))
+
+    assert fetch(f"{server}/x") == ["old"]
+
+
+def test_expired_entries_are_deleted_when_read(cache_dir):
+    posting_cache.store_parsed("old posting", {"title": "Engineer"})
+    [path] = (cache_dir / "parsed").iterdir()
+    old = time.time() - posting_cache.MAX_AGE - 1
+    os.utime(path, (old, old))
+
+    assert posting_cache.load_parsed("old posting") is None
+    assert not path.exists()
+
+
+def test_least_recently_used_entries_are_pruned(cache_dir, monkeypatch):
+    monkeypatch.setattr(posting_cache, "MAX_ENTRIES", 3)
+    monkeypatch.setattr(posting_cache, "PRUNE_EVERY", 5)
+    monkeypatch.setattr(posting_cache, "_writes", 0)
+    for i in range(4):
+        posting_cache.store_parsed(f"posting {i}", {"title": str(i)})
+        path = cache_dir / "parsed" / f"{posting_cache.digest(f'posting {i}')}.json"
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+    assert posting_cache.load_parsed("posting 0") == {"title": "0"}  # used again: now the most recent
+
+    posting_cache.store_page(posting_cache.CachedPage(url="https://jobs.example/1", final_url="", text="x"))  # 5th
+
+    assert [posting_cache.load_parsed(f"posting {i}") is not None for i in range(4)] == [True, False, False, True]
+    assert posting_cache.load_page("https://jobs.example/1") is not None
+
+
+def test_no_store_pages_are_not_cached(server):
+    fetch(f"{server}/private")
+    fetch(f"{server}/private")
+
+    assert len(_Handler.requests) == 2
+
+
+def test_unchanged_posting_is_not_parsed_again(server, monkeypatch):
+    monkeypatch.setattr(posting_cache, "FRESH", 0)
+    monkeypatch.setattr(job_heuristics, "ENABLED", False)
+    answer = '{"company_name": "SomeCorp", "title": "Senior Python Engineer", "description": "Python"}'
+    with TestClient(app) as client, patch("features.job_description.request_model", return_value=answer) as model:
+        first = client.post("/api/extract-job-description", json={"jobDescription": f"{server}/tagged"})
+        second = client.post("/api/extract-job-description", json={"jobDescription": f"{server}/tagged"})
+
+    assert first.json() == second.json()
+    assert first.json()["company_name"] == "SomeCorp"
+    assert (first.headers["X-Extracted-By"], second.headers["X-Extracted-By"]) == ("ai", "cache")
+    assert model.call_count == 1
+    assert len(_Handler.requests) == 2
+
+
+def test_endpoint_extracts_from_link(server):
+    parsed = JobDescriptionResponse(
+        company_name="SomeCorp",
+        company_address="",
+        company_city="Berlin",
+        company_postal_code="",
+        recruiter_name="",
+        title="Senior Python Engineer",
+        description="",
+    )
+    with (
+        TestClient(app) as client,
+        patch("features.job_description.job_description_from_text", return_value=parsed) as parse,
+    ):
+        response = client.post("/api/extract-job-description", json={"jobDescription": f"{server}/moved"})
+        failed = client.post("/api/extract-job-description", json={"jobDescription": f"{server}/gone"})
+
+    assert response.json()["company_name"] == "SomeCorp"
+    assert parse.call_args.args[0].startswith("Senior Python Engineer - SomeCorp\n")
+    assert failed.status_code == 422
+    assert "HTTP 404" in failed.json()["detail"]
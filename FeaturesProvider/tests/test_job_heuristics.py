@@ -0,0 +1,170 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from features import job_heuristics
+from features.job_description import job_description_from_text
+from features.job_heuristics import extract_fields
+from main import app
+
+SOMECORP = (
+    "SomeCorp Ltd, located on Mockers avenue 48, 03523 Berlin, looks for a Senior Software Engineer for their "
+    "project SuperMocker.\n\nMinimum 10 years of experience with Python is mandatory."
+)
+
+CASES = [
+    (
+        SOMECORP,
+        {
+            "company_name": "SomeCorp Ltd",
+            "company_address": "Mockers avenue 48",
+            "company_city": "Berlin",
+            "company_postal_code": "03523",
+            "title": "Senior Software Engineer",
+        },
+    ),
+    (
+        "Senior Python Engineer (m/w/d)\nAcme Data Systems GmbH\nHauptstraße 5a, 10115 Berlin\n\n"
+        "We are looking for an experienced Python Engineer.\nAnsprechpartnerin: Frau Anna Schmidt, anna@acme.de",
+        {
+            "company_name": "Acme Data Systems GmbH",
+            "company_address": "Hauptstraße 5a",
+            "company_city": "Berlin",
+            "company_postal_code": "10115",
+            "recruiter_name": "Anna Schmidt",
+            "title": "Senior Python Engineer",
+        },
+    ),
+    (
+        "Job title: Backend Developer\nCompany: Globex\nLocation: Austin, TX 78701\nYour contact: Mr. John Miller",
+        {
+            "company_name": "Globex",
+            "company_city": "Austin",
+            "company_postal_code": "78701",
+            "recruiter_name": "John Miller",
+            "title": "Backend Developer",
+        },
+    ),
+    (
+        "At Initech Inc., we are hiring a Data Scientist. Office: 221 Baker Street, London NW1 6XE. "
+        "Reach out to Sarah Connor with questions.",
+        {
+            "company_name": "Initech Inc.",
+            "company_address": "221 Baker Street",
+            "company_city": "London",
+            "company_postal_code": "NW1 6XE",
+            "recruiter_name": "Sarah Connor",
+            "title": "Data Scientist",
+        },
+    ),
+    (
+        "8001 Zürich, Switzerland. Role: you will build and run our data platform together with the team.",
+        {"company_city": "Zürich", "company_postal_code": "8001"},
+    ),
+]
+
+
+@pytest.mark.parametrize("text, expected", CASES, ids=range(len(CASES)))
+def test_extracts_fields(text, expected):
+    fields = extract_fields(text)
+
+    assert {name: candidate.value for name, candidate in fields.found.items()} == expected
+
+
+def test_confidence_decides_between_rules():
+    fields = extract_fields("Python Engineer\nJob title: Staff Python Engineer")
+
+    assert fields.value("title") == "Staff Python Engineer"
+    assert fields.confidence("title") == 0.95
+    assert fields.missing() == ["company_name"]
+
+
+@pytest.mark.parametrize(
+    "text", ["Join the Apple Inc. ecosystem as a Swift Developer.", "Build Acme GmbH software as our Python Engineer."]
+)
+def test_company_names_qualifying_a_noun_are_no_employer(text):
+    assert extract_fields(text).value("company_name") == ""
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Software Engineer\nGoogle · Zurich … We work with Microsoft Corp. partners on cloud migrations.",
+        "Our client is a fast-growing logistics startup and works closely with Amazon Web Services Inc. and SAP SE.",
+        "We are Acme. Our customers include Siemens AG and BMW AG.",
+    ],
+)
+def test_company_names_in_the_body_are_not_confident(text):
+    fields = extract_fields(text)
+
+    assert fields.confidence("company_name") < job_heuristics.MIN_CONFIDENCE
+    assert "company_name" in fields.missing()
+
+
+def test_description_starts_at_its_section_and_is_cut(monkeypatch):
+    monkeypatch.setattr(job_heuristics, "MAX_DESCRIPTION", 300)
+    text = "Careers | Jobs | About\nSenior Python Engineer\nSomeCorp Ltd\n\nYour tasks:\n" + "- Build services\n" * 50
+
+    description = job_heuristics.description(text)
+
+    assert description.startswith("Your tasks:\n- Build services")
+    assert len(description) <= 300 and description.endswith("- Build services")
+    assert job_heuristics.description(SOMECORP) == SOMECORP
+
+
+def test_confident_fields_skip_the_model():
+    with patch("features.job_description.request_model") as mock_request:
+        job = job_description_from_text(SOMECORP)
+
+    mock_request.assert_not_called()
+    assert job._extracted_by == "heuristics"
+    assert (job.company_name, job.title, job.description) == ("SomeCorp Ltd", "Senior Software Engineer", SOMECORP)
+
+
+def test_model_fills_in_what_the_rules_miss():
+    text = "We need someone for our Python platform team at 10115 Berlin."
+    answer = '{"company_name": "Platform Corp", "title": "Python Developer", "description": "Python"}'
+    with patch("features.job_description.request_model", return_value=answer) as mock_request:
+        job = job_description_from_text(text)
+
+    mock_request.assert_called_once()
+    assert job._extracted_by == "ai"
+    assert (job.company_name, job.company_city, job.company_postal_code) == ("Platform Corp", "Berlin", "10115")
+
+
+def test_fallback_keeps_what_the_rules_found():
+    text = "Acme GmbH builds robots in 80331 München."
+    with patch("features.job_description.request_model", return_value=None):
+        job = job_description_from_text(text)
+
+    assert job._extracted_by == "fallback"
+    assert (job.company_name, job.company_city, job.title, job.description) == ("Acme GmbH", "München", "", text)
+
+
+def test_fallback_keeps_the_whole_text(monkeypatch):
+    monkeypatch.setattr(job_heuristics, "MAX_DESCRIPTION", 100)
+    text = "Python, Kafka and on-call duty are required.\n\nYour tasks:\n" + "- Build services\n" * 20
+    with patch("features.job_description.request_model", return_value=None):
+        job = job_description_from_text(text)
+
+    assert job._extracted_by == "fallback"
+    assert job.description == text
+
+
+def test_disabled_heuristics_always_ask_the_model(monkeypatch):
+    monkeypatch.setattr(job_heuristics, "ENABLED", False)
+    with patch("features.job_description.request_model", return_value=None) as mock_request:
+        job = job_description_from_text(SOMECORP)
+
+    mock_request.assert_called_once()
+    assert job.company_name == ""
+
+
+def test_endpoint_reports_the_path():
+    with TestClient(app) as client, patch("features.job_description.request_model") as mock_request:
+        response = client.post("/api/extract-job-description", json={"jobDescription": SOMECORP})
+
+    mock_request.assert_not_called()
+    assert response.headers["X-Extracted-By"] == "heuristics"
+    assert response.json()["company_postal_code"] == "03523"
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from features.job_fetcher import FetchError
+from main import app
+from models import JobDescriptionResponse
+
+
+def job(title: str) -> JobDescriptionResponse:
+    return JobDescriptionResponse(
+        company_name="SomeCorp",
+        company_address="",
+        company_city="",
+        company_postal_code="",
+        recruiter_name="",
+        title=title,
+        description="",
+    )
+
+
+class Stage:
+    """Fake of a pipeline stage that records how many calls ran at once"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.active = 0
+        self.peak = 0
+        self.calls: list[str] = []
+        self.lock = threading.Lock()
+
+    def enter(self, item: str) -> None:
+        with self.lock:
+            self.calls.append(item)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def leave(self) -> None:
+        with self.lock:
+            self.active -= 1
+
+
+@pytest.fixture
+def stages():
+    fetch, parse = Stage(0.05), Stage(0.02)
+
+    async def fetch_text(link: str) -> str:
+        fetch.enter(link)
+        try:
+            await asyncio.sleep(fetch.seconds)
+            if "broken" in link:
+                raise FetchError(f"{link} answered with HTTP 404")
+            return f"posting at {link}"
+        finally:
+            fetch.leave()
+
+    def parse_text(text: str) -> JobDescriptionResponse:
+        parse.enter(text)
+        try:
+            time.sleep(parse.seconds)
+            if "crash" in text:
+                raise RuntimeError("boom")
+            return job(text)
+        finally:
+            parse.leave()
+
+    async def parse_posting(text: str) -> JobDescriptionResponse:
+        return await asyncio.to_thread(parse_text, text)
+
+    with (
+        patch("features.job_ingest.text_job_position_from_link", fetch_text),
+        patch("features.job_ingest.job_description_from_posting", parse_posting),
+        patch("features.job_ingest.job_description_from_text", parse_text),
+    ):
+        yield fetch, parse
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+def post(client, items: list[str], **params) -> list[dict]:
+    response = client.post("/api/extract-job-descriptions", params=params, json={"jobDescriptions": items})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_results_errors_and_duplicates(client, stages):
+    fetch, _ = stages
+    items = ["https://a.example/1", "Python developer wanted", "https://a.example/broken", " https://a.example/1", "crash"]
+
+    *results, done = post(client, items)
+
+    by_indices = {tuple(result["indices"]): result for result in results}
+    assert by_indices[(0, 3)]["job_description"]["title"] == "posting at https://a.example/1"
+    assert by_indices[(1,)]["job_description"]["title"] == "Python developer wanted"
+    assert by_indices[(2,)]["error"] == "https://a.example/broken answered with HTTP 404"
+    assert by_indices[(4,)]["error"] == "unexpected error: RuntimeError"
+    assert fetch.calls.count("https://a.example/1") == 1
+    assert done == {"done": True, "items": 5, "unique": 4, "parsed": 2, "errors": 2, "seconds": done["seconds"]}
+
+
+def test_concurrency_is_bounded_per_stage(client, stages):
+    fetch, parse = stages
+    items = [f"https://a.example/{i}" for i in range(12)]
+
+    *results, done = post(client, items, fetch_concurrency=3, parse_concurrency=2)
+
+    assert len(results) == 12 and done["parsed"] == 12
+    assert fetch.peak == 3
+    assert parse.peak == 2
+
+
+def test_results_stream_as_they_complete(client, stages):
+    fetch, _ = stages
+    fetch.seconds = 0.3
+
+    *results, done = post(client, ["https://a.example/slow", "A quick text posting"])
+
+    assert [result["indices"] for result in results] == [[1], [0]]
+
+
+def test_rejects_empty_and_oversized_batches(client):
+    assert client.post("/api/extract-job-descriptions", json={"jobDescriptions": []}).status_code == 422
+    too_many = {"jobDescriptions": ["text"] * 501}
+    assert client.post("/api/extract-job-descriptions", json=too_many).status_code == 422
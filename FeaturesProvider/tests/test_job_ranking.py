@@ -0,0 +1,153 @@
+import time
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from database.db_interface import DatabaseManager
+from features import job_ranking
+from features.job_ranking import JobPostingIndex, N_FEATURES, vectorize
+from main import app
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    # File-based SQLite so the request threads of the TestClient share the data
+    manager = DatabaseManager(db_url=f"sqlite:///{tmp_path / 'ranking.db'}")
+    manager.create_tables()
+    yield manager
+    job_ranking._indexes.clear()
+
+
+@pytest.fixture
+def client(db_manager):
+    with patch("main.db_manager", db_manager), TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def profile_id(db_manager):
+    session = db_manager.get_session()
+    try:
+        profile = db_manager.add_profile(
+            session,
+            {
+                "first_name": "John",
+                "last_name": "Doe",
+                "email": "john.doe@example.com",
+                "about_me": "Backend developer working with Python, Django and PostgreSQL.",
+            },
+        )
+        db_manager.add_experience(
+            session,
+            profile.id,
+            {
+                "job_title": "Python Developer",
+                "company": "Tech Corp",
+                "start_date": date(2019, 1, 1),
+                "description": "Built REST APIs in Python and Django, tuned PostgreSQL queries.",
+            },
+        )
+        return profile.id
+    finally:
+        db_manager.close_session(session)
+
+
+def _job(title, description, company="Some Corp"):
+    return {
+        "company_name": company,
+        "company_address": "",
+        "company_city": "",
+        "company_postal_code": "",
+        "recruiter_name": "",
+        "title": title,
+        "description": description,
+    }
+
+
+def test_vectorize_is_normalized_and_stable():
+    vector = vectorize("Senior Python developer with Django experience")
+    assert vector.shape == (N_FEATURES,)
+    assert np.isclose(np.linalg.norm(vector), 1.0)
+    assert np.array_equal(vector, vectorize("Senior Python developer with Django experience"))
+    assert not vectorize("").any()
+
+
+def test_index_add_remove_and_top_k():
+    index = JobPostingIndex(capacity=2)
+    for job_posting_id, text in enumerate(["python django", "java spring", "python flask", "nursing care"], start=1):
+        index.add(job_posting_id, vectorize(text))
+    assert len(index) == 4
+
+    ranked = index.top_k(vectorize("python django developer"), 2)
+    assert [job_posting_id for job_posting_id, _ in ranked] == [1, 3]
+    assert ranked[0][1] >= ranked[1][1]
+
+    assert index.remove(1) is True
+    assert index.remove(1) is False
+    assert 1 not in index and 4 in index
+    assert index.top_k(vectorize("python django developer"), 1)[0][0] == 3
+
+
+def test_top_k_is_fast_for_10k_postings():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((10_000, N_FEATURES)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = JobPostingIndex()
+    for job_posting_id, vector in enumerate(vectors, start=1):
+        index.add(job_posting_id, vector)
+
+    started = time.perf_counter()
+    ranked = index.top_k(vectors[42], 10)
+    elapsed = time.perf_counter() - started
+
+    assert ranked[0][0] == 43
+    assert elapsed < 0.5
+
+
+def test_ranking_endpoint(client, profile_id):
+    for title, description in [
+        ("Registered Nurse", "Patient care in a busy hospital ward, night shifts."),
+        ("Python Backend Developer", "Django, REST APIs and PostgreSQL. Python is a must."),
+        ("Line Cook", "Prepare meals in a fast-paced restaurant kitchen."),
+    ]:
+        response = client.post(f"/api/{profile_id}/job-postings", json=_job(title, description))
+        assert response.status_code == 201
+
+    response = client.get(f"/api/{profile_id}/job-postings/ranking", params={"top_k": 2})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["reranked"] is False
+    assert len(data["results"]) == 2
+    assert data["results"][0]["title"] == "Python Backend Developer"
+
+    # Postings stored after the index was built are picked up incrementally
+    client.post(f"/api/{profile_id}/job-postings", json=_job("Senior Django Engineer", "Python, Django, PostgreSQL."))
+    titles = [r["title"] for r in client.get(f"/api/{profile_id}/job-postings/ranking").json()["results"]]
+    assert len(titles) == 4
+    assert set(titles[:2]) == {"Python Backend Developer", "Senior Django Engineer"}
+
+
+def test_ranking_endpoint_rerank(client, profile_id):
+    for title in ["Python Developer", "Django Developer", "Chef"]:
+        client.post(f"/api/{profile_id}/job-postings", json=_job(title, f"{title} position, Python and Django."))
+
+    original = client.get(f"/api/{profile_id}/job-postings/ranking").json()["results"]
+    with patch("features.job_ranking.request_model", return_value="2, 1") as mock_request:
+        data = client.get(f"/api/{profile_id}/job-postings/ranking", params={"rerank": True, "rerank_top": 2}).json()
+
+    mock_request.assert_called_once()
+    assert data["reranked"] is True
+    assert [r["job_posting_id"] for r in data["results"]] == [
+        original[1]["job_posting_id"],
+        original[0]["job_posting_id"],
+        original[2]["job_posting_id"],
+    ]
+
+
+def test_ranking_endpoint_profile_not_found(client):
+    response = client.get("/api/999/job-postings/ranking")
+    assert response.status_code == 404
+    assert "not found" in response.json()["detail"]
@@ -0,0 +1,88 @@
+import json
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from loguru import logger
+
+from features import log_config
+from features.ai_api import request_model
+from features.log_config import payload
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    yield
+    log_config.configure(enqueue=False)
+
+
+def test_payload_is_truncated_with_a_hash(monkeypatch):
+    monkeypatch.setattr(log_config, "PAYLOAD_CHARS", 10)
+
+    text = payload("Jane Doe, jane@example.com\nSenior engineer")
+
+    assert text.startswith("<42 chars, sha256 ") and text.endswith("> Jane Doe, ...")
+    assert payload("short").endswith("> short")
+    assert payload(None) == "<none>"
+
+
+def test_hash_mode_and_sampling(monkeypatch):
+    monkeypatch.setattr(log_config, "PAYLOAD_MODE", "hash")
+    assert "Jane" not in payload("Jane Doe")
+    assert payload("Jane Doe") == payload("Jane Doe")
+
+    monkeypatch.setattr(log_config, "PAYLOAD_SAMPLE_RATE", 1.0)
+    assert payload("Jane Doe") == "Jane Doe"
+
+
+def test_lazy_payloads_are_not_formatted_below_the_level():
+    log_config.configure(sink=StringIO(), level="WARNING", enqueue=False)
+    formatted = MagicMock(return_value="text")
+
+    logger.opt(lazy=True).info("Prompt: {}", formatted)
+
+    formatted.assert_not_called()
+
+
+def test_json_lines_carry_the_bound_fields(monkeypatch):
+    monkeypatch.setattr("features.ai_api.MODEL_NAME", "test/model")
+    sink = StringIO()
+    log_config.configure(sink=sink, json=True)
+    response = MagicMock(status_code=200)
+    response.json.return_value = {
+        "choices": [{"message": {"content": "Hello"}}],
+        "usage": {"prompt_tokens": 12, "completion_tokens": 3, "prompt_tokens_details": {"cached_tokens": 8}},
+    }
+
+    with patch("features.ai_api._session.post", return_value=response):
+        request_model("Greet Jane", feature="greet")
+    logger.complete()
+
+    records = [json.loads(line)["record"] for line in sink.getvalue().splitlines()]
+    (extra,) = [record["extra"] for record in records if record["message"] == "AI request ok"]
+    assert extra["feature"] == "greet" and extra["model"] == "test/model"
+    assert (extra["prompt_tokens"], extra["cached_tokens"], extra["completion_tokens"]) == (12, 8, 3)
+    assert extra["latency_ms"] >= 0
+
+
+def test_api_error_bodies_are_logged_as_payloads(monkeypatch):
+    monkeypatch.setattr(log_config, "PAYLOAD_CHARS", 10)
+    sink = StringIO()
+    log_config.configure(sink=sink, json=False, enqueue=False)
+    body = '{"error": "bad request", "prompt": "Greet Jane Doe, jane@example.com"}'
+
+    with patch("features.ai_api._session.post", return_value=MagicMock(status_code=400, text=body)):
+        assert request_model("Greet Jane Doe, jane@example.com", feature="greet") is None
+    logger.complete()
+
+    assert f"API Error: 400, Response: <{len(body)} chars, sha256 " in sink.getvalue()
+    assert "jane@example.com" not in sink.getvalue()
+
+
+def test_text_lines_end_with_the_bound_fields():
+    sink = StringIO()
+    log_config.configure(sink=sink, json=False, enqueue=False)
+
+    logger.bind(feature="review", profile_id=7).info("Review done")
+
+    assert sink.getvalue().rstrip().endswith("Review done | feature=review profile_id=7")
@@ -55,7 +55,7 @@ def test_greet_route(
     expected_status: int,
     expected_response: dict[str, str],
 ) -> None:
-    with patch("main.request_model", return_value=mock_return):
+    with patch("features.request_model", return_value=mock_return):
         response = client.post("/greet", json=payload)
         assert response.status_code == expected_status
         assert response.json() == expected_response
@@ -79,6 +79,8 @@ def test_generate_cover_letter_endpoint(client: TestClient, mock_job_description
     with (
         patch("features.cover_letter_generator.request_model", return_value=mock_ai_response),
         patch("main.db_manager.get_profile", return_value=mock_db_profile),
+        patch("main.db_manager.get_experiences", return_value=[]),
+        patch("main.db_manager.get_educations", return_value=[]),
     ):
         response = client.post(
             "/api/generate-cover-letter",
@@ -93,6 +95,24 @@ def test_generate_cover_letter_endpoint(client: TestClient, mock_job_description
         assert data["cover_letter"] == mock_ai_response
 
 
+def test_generate_cover_letter_instant(client: TestClient, mock_job_description, mock_db_profile: Profile):
+    with (
+        patch("features.cover_letter_generator.request_model") as mock_request,
+        patch("main.db_manager.get_profile", return_value=mock_db_profile),
+        patch("main.db_manager.get_experiences", return_value=[]),
+        patch("main.db_manager.get_educations", return_value=[]),
+    ):
+        response = client.post(
+            "/api/generate-cover-letter",
+            params={"profile_id": "123", "instant": True},
+            json=mock_job_description,
+        )
+
+    assert response.status_code == 200
+    assert f"position at {mock_job_description['company_name']}" in response.json()["cover_letter"]
+    mock_request.assert_not_called()
+
+
 def test_generate_cover_letter_invalid_profile(client: TestClient, mock_job_description):
     with patch("main.db_manager.get_profile", return_value=None):
         response = client.post(
@@ -0,0 +1,95 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks import bench_metrics
+from database.db_interface import DatabaseManager
+from features import metrics
+from features.review_user_application import review_from_user_and_job
+from main import app
+from models import JobDescriptionResponse
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+def test_requests_are_timed_per_route(client):
+    client.get("/")
+    client.get("/")
+    client.get("/no/such/page")
+
+    text = client.get("/metrics").text
+
+    assert 'http_request_duration_seconds_count{method="GET",route="/",status="200"} 2' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/",status="200",le="+Inf"} 2' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in text
+    # The scrape itself is still in progress while it renders
+    assert 'http_requests_in_progress{method="GET"} 1' in text
+
+
+def test_failed_ai_calls_and_fallbacks_are_counted(monkeypatch):
+    monkeypatch.setattr("features.ai_api.MODEL_NAME", "test/model")
+    job = JobDescriptionResponse(
+        company_name="SomeCorp",
+        company_address="",
+        company_city="",
+        company_postal_code="",
+        recruiter_name="",
+        title="Engineer",
+        description="",
+    )
+    with patch("features.ai_api._session.post", return_value=MagicMock(status_code=503)):
+        review_from_user_and_job(MagicMock(), [], [], job)
+
+    assert metrics.AI_REQUESTS.value("review", "test/model", "http_error") == 1
+    assert metrics.AI_IN_PROGRESS.value("review") == 0
+    assert metrics.FALLBACKS.value("review", "ai_unavailable") == 1
+    assert 'feature_fallbacks_total{feature="review",reason="ai_unavailable"} 1' in metrics.render()
+
+
+def test_database_statements_are_timed():
+    manager = DatabaseManager(test_mode=True)
+    manager.create_tables()
+    session = manager.get_session()
+    try:
+        manager.get_profile(session, 1)
+    finally:
+        manager.close_session(session)
+
+    assert metrics.DB_QUERIES.value("SELECT") >= 1
+    assert metrics.DB_QUERIES.value("CREATE") >= 1
+
+
+def test_workers_metrics_are_added_up(tmp_path):
+    metrics.FALLBACKS.inc("cv", "ai_unavailable")
+    metrics.DB_QUERIES.observe(0.002, "SELECT")
+    metrics._write_snapshot(str(tmp_path))
+    # The same values once more from another running process (the parent), and from a stopped one
+    own = tmp_path / f"{os.getpid()}.json"
+    (tmp_path / f"{os.getppid()}.json").write_text(own.read_text())
+    (tmp_path / "999999999.json").write_text(own.read_text())
+
+    with patch.object(metrics, "METRICS_DIR", str(tmp_path)):
+        text = metrics.exposition()
+
+    assert 'feature_fallbacks_total{feature="cv",reason="ai_unavailable"} 2' in text
+    assert 'db_query_duration_seconds_bucket{statement="SELECT",le="0.001"} 0' in text
+    assert 'db_query_duration_seconds_bucket{statement="SELECT",le="0.0025"} 2' in text
+
+
+def test_overhead_per_request_is_small():
+    plain, instrumented = bench_metrics.measure(500)
+
+    assert instrumented - plain < 100e-6
@@ -0,0 +1,181 @@
+import json
+import signal
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+from benchmarks.bench_pii_adversarial import ADVERSARIAL_INPUTS, BUDGET_PER_MB, seconds_per_mb, stream_seconds_per_mb
+from features import pii
+from features.pii import NAME_AUTOMATON_MIN, StreamingAnonymizer, anonymize_stream, anonymize_text
+
+# Inputs with the output of the former pattern-by-pattern implementation (one re.sub per pattern)
+GOLDEN = json.loads((Path(__file__).parent / "pii_golden.json").read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("case", GOLDEN, ids=range(len(GOLDEN)))
+def test_matches_golden_output(case):
+    assert anonymize_text(case["text"], names_to_mask=case["names"]) == case["expected"]
+
+
+def test_masks_contacts():
+    text = "Contact me at john.doe@example.com or +1 555-123-4567, see https://johndoe.dev"
+
+    assert anonymize_text(text) == "Contact me at [REDACTED_EMAIL] or [REDACTED_PHONE], see [REDACTED_URL]"
+
+
+def test_higher_priority_pattern_wins_overlap():
+    # The URL pattern alone would take "https://john.doe", but emails are masked first
+    assert anonymize_text("https://john.doe@x.com") == "https://[REDACTED_EMAIL]"
+
+
+def test_labeled_line_swallows_wrapped_phone():
+    text = "Phone: call 555 123\n4567\nnext line"
+
+    assert anonymize_text(text) == "Phone: [REDACTED]\nnext line"
+
+
+def test_names_and_initials():
+    text = "John Doe wrote this, J. Doe signed it, john doe read it."
+
+    assert anonymize_text(text, names_to_mask=["John Doe"]) == (
+        "[REDACTED_NAME] wrote this, [REDACTED_NAME] signed it, [REDACTED_NAME] read it."
+    )
+
+
+def test_many_names_use_one_automaton():
+    names = [f"Person{i} Example" for i in range(NAME_AUTOMATON_MIN)] + ["Jane Smith", "Jane"]
+    text = "Jane Smith met J. Smith, Person3 Example, P. Example and jane; Janet stayed."
+
+    assert anonymize_text(text, names_to_mask=names) == (
+        "[REDACTED_NAME] met [REDACTED_NAME], [REDACTED_NAME], [REDACTED_NAME] and [REDACTED_NAME]; Janet stayed."
+    )
+    levels = pii._matcher(pii._normalize_names(names)).levels
+    assert [level.kind for level in levels].count("name") == 1
+
+
+def test_many_names_match_like_one_pattern_each():
+    names = [f"{first} {last}" for first in ("Anna", "Omar", "Li") for last in ("Ng", "Khan", "Berg")]
+    case = GOLDEN[-1]
+    text = case["text"] + "\n" + " ".join(names) + " A. Berg, o. khan"
+
+    expected = text
+    for name in names:
+        expected = anonymize_text(expected, names_to_mask=[name])
+    assert anonymize_text(text, names_to_mask=names) == expected
+
+
+def test_matchers_are_cached_by_name_set():
+    pii._matcher.cache_clear()
+    names = [f"Name{i} Surname" for i in range(NAME_AUTOMATON_MIN)]
+
+    anonymize_text("x", names_to_mask=names)
+    anonymize_text("x", names_to_mask=list(reversed(names)))
+    anonymize_text("x", names_to_mask=["  John   Doe "])
+    anonymize_text("x", names_to_mask=["John Doe", "john doe"])
+
+    info = pii._matcher.cache_info()
+    assert (info.hits, info.misses) == (2, 2)
+
+
+def test_custom_placeholders():
+    text = "Mail a@b.io, call 555 123 4567"
+
+    assert anonymize_text(text, placeholder_email="<e>", placeholder_phone="<p>") == "Mail <e>, call <p>"
+
+
+def test_idempotent():
+    text = GOLDEN[-1]["text"]
+    names = GOLDEN[-1]["names"]
+    once = anonymize_text(text, names_to_mask=names)
+
+    assert anonymize_text(once, names_to_mask=names) == once
+
+
+def test_empty_text():
+    assert anonymize_text("") == ""
+    assert anonymize_text("Nothing to hide here.") == "Nothing to hide here."
+
+
+def _chunks(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 16])
+def test_stream_matches_whole_text(size):
+    for case in GOLDEN:
+        streamed = "".join(anonymize_stream(_chunks(case["text"], size), names_to_mask=case["names"]))
+        assert streamed == case["expected"]
+
+
+def test_stream_holds_back_possible_matches_only():
+    anonymizer = StreamingAnonymizer(names_to_mask=["John Doe"])
+
+    assert anonymizer.feed("Mail me at john.") == "Mail me at "
+    assert anonymizer.feed("doe@exa") == ""
+    assert anonymizer.feed("mple.com or call 555 ") == "[REDACTED_EMAIL] or call "
+    assert anonymizer.feed("123 4567. Regards,\nJohn ") == "[REDACTED_PHONE]. Regards,\n"
+    assert anonymizer.pending == len("John ")
+    assert anonymizer.feed("Doe\nEmail: x") == "[REDACTED_NAME]\n"
+    assert anonymizer.finish() == "Email: [REDACTED]"
+
+
+@pytest.mark.parametrize("size", [64, 256])
+def test_long_texts_are_anonymized_in_parts(monkeypatch, size):
+    monkeypatch.setattr(pii, "MAX_CHUNK", size)
+
+    for case in GOLDEN:
+        if max(map(len, case["text"].splitlines() or [""])) < size // 2:
+            assert anonymize_text(case["text"], names_to_mask=case["names"]) == case["expected"]
+
+
+def test_stream_holds_back_at_most_max_chunk(monkeypatch):
+    monkeypatch.setattr(pii, "MAX_CHUNK", 100)
+    anonymizer = StreamingAnonymizer()
+
+    output = anonymizer.feed("Name: John")
+    for _ in range(10):
+        output += anonymizer.feed(" Doe" * 10)
+        assert anonymizer.pending <= 100
+    output += anonymizer.feed(" Doe\nnext line, call 555 123 4567") + anonymizer.finish()
+
+    assert output == "Name: [REDACTED]\nnext line, call [REDACTED_PHONE]"
+
+
+@contextmanager
+def _hard_limit(seconds: float):
+    """Abort a run (e.g. a catastrophically backtracking regex) after `seconds`, where timers exist"""
+    if not hasattr(signal, "setitimer"):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise TimeoutError(f"still running after {seconds:.1f} s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+@pytest.mark.parametrize("name", list(ADVERSARIAL_INPUTS))
+def test_adversarial_input_within_budget(name):
+    text = ADVERSARIAL_INPUTS[name](128 * 1024)
+    anonymize_text("warm up", names_to_mask=["John Doe"])
+
+    with _hard_limit(3 * BUDGET_PER_MB * len(text) / 1e6):
+        elapsed = seconds_per_mb(text, ["John Doe"])
+    assert elapsed <= BUDGET_PER_MB
+
+
+@pytest.mark.parametrize("name", ["digits and spaces", "label without colon", "label lines", "fuzz 1"])
+def test_adversarial_stream_within_budget(name):
+    # Without a safe place to cut, every small chunk used to re-scan all the held back text
+    text = ADVERSARIAL_INPUTS[name](64 * 1024)
+
+    with _hard_limit(3 * BUDGET_PER_MB * len(text) / 1e6):
+        elapsed = stream_seconds_per_mb(text, ["John Doe"])
+    assert elapsed <= BUDGET_PER_MB
@@ -0,0 +1,88 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from features import pii_batch
+from features.pii import anonymize_text
+from main import app
+from tests.test_pii import GOLDEN
+
+
+@pytest.fixture(scope="module", autouse=True)
+def stop_workers():
+    yield
+    pii_batch.shutdown()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def test_anonymize_many_keeps_order_across_workers():
+    texts = [case["text"] for case in GOLDEN]
+    names = [case["names"] for case in GOLDEN]
+
+    assert pii_batch.anonymize_many(texts, names, workers=2, chunksize=7) == [case["expected"] for case in GOLDEN]
+    assert pii_batch.anonymize_many(texts, names, workers=1) == [case["expected"] for case in GOLDEN]
+
+
+def test_concurrent_calls_share_the_pool():
+    texts = [case["text"] for case in GOLDEN]
+    names = [case["names"] for case in GOLDEN]
+    expected = [case["expected"] for case in GOLDEN]
+
+    with ThreadPoolExecutor(max_workers=4) as threads:
+        runs = [threads.submit(pii_batch.anonymize_many, texts, names, workers, 5) for workers in (2, 3, 2, 3)]
+        assert all(run.result() == expected for run in runs)
+    assert pii_batch._pool() == pii_batch._pool(workers=3)
+
+
+def test_anonymize_many_without_names():
+    assert pii_batch.anonymize_many(["a@b.io", "nothing"], workers=1) == ["[REDACTED_EMAIL]", "nothing"]
+    with pytest.raises(ValueError):
+        pii_batch.anonymize_many(["a", "b"], [None], workers=1)
+
+
+def test_ndjson_keeps_fields_and_reports_bad_lines():
+    lines = [
+        '{"id": 1, "text": "Jane Doe, jane@doe.io", "names": ["Jane Doe"]}',
+        "not json",
+        "",
+        '{"id": 3, "text": 3}',
+        '{"id": 4, "text": "call 555 123 4567"}',
+    ]
+    stats = pii_batch.BatchStats()
+
+    output = [json.loads(line) for line in pii_batch.anonymize_ndjson(lines, workers=1, stats=stats)]
+
+    assert output[0] == {"id": 1, "text": "[REDACTED_NAME], [REDACTED_EMAIL]", "names": ["Jane Doe"]}
+    assert output[1]["line"] == 2 and "error" in output[1]
+    assert output[2]["line"] == 4 and "error" in output[2]
+    assert output[3] == {"id": 4, "text": "call [REDACTED_PHONE]"}
+    assert (stats.documents, stats.errors) == (2, 2)
+
+
+def test_batch_endpoint_streams_ndjson(client, monkeypatch):
+    monkeypatch.setattr(pii_batch, "WINDOW", 4)
+    cases = GOLDEN[:10]
+    body = "\n".join(json.dumps({"id": i, "text": case["text"], "names": case["names"]}) for i, case in enumerate(cases))
+
+    response = client.post("/api/anonymize/batch?workers=1", content=body + "\n{broken\n")
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["text"] for line in lines[:10]] == [case["expected"] for case in cases]
+    assert [line["id"] for line in lines[:10]] == list(range(10))
+    assert lines[10]["line"] == 11
+    assert lines[-1]["done"] is True
+    assert lines[-1]["documents"] == 10 and lines[-1]["errors"] == 1
+
+
+def test_anonymize_text_matches_batch_worker():
+    batch = [(case["text"], case["names"]) for case in GOLDEN[:5]]
+
+    assert pii_batch._anonymize_batch(batch) == [anonymize_text(text, names_to_mask=names) for text, names in batch]
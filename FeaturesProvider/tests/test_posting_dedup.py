@@ -0,0 +1,107 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from features import job_heuristics, posting_cache, posting_dedup
+from features.job_description import job_description_from_posting
+from features.posting_dedup import NUM_PERM, NearDuplicateIndex, signature
+
+POSTING = (
+    "Acme Robotics is hiring a Senior Python Engineer to build the control software of our warehouse robots. "
+    "You will design services, review code, mentor two junior developers and run our Kubernetes platform. "
+    "We offer a hybrid setup in Berlin, a learning budget and 30 days of vacation. "
+) * 3
+COPY = POSTING.replace("Berlin,", "Berlin ,") + "\nFound on https://jobs.example/acme?utm_source=board&ref=42 - share it!"
+OTHER = (
+    "Globex is looking for a Data Analyst who loves dashboards. SQL and a sense for numbers are all you need; "
+    "the team sits in London and works closely with marketing and finance on weekly reports."
+)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(posting_cache, "DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(posting_dedup, "_index", None)
+    return tmp_path
+
+
+def test_finds_copies_but_not_other_postings():
+    index = NearDuplicateIndex()
+    index.add("a" * 64, signature(POSTING))
+
+    key, similarity = index.find(signature(COPY))
+    assert key == "a" * 64 and similarity >= posting_dedup.THRESHOLD
+    assert index.find(signature(OTHER)) is None
+    assert signature("!!! ???") is None
+
+
+def test_index_is_persisted_and_shared(cache_dir):
+    path = cache_dir / "index.bin"
+    first, second = NearDuplicateIndex(path), NearDuplicateIndex(path)
+    first.add("a" * 64, signature(POSTING))
+    first.add("a" * 64, signature(POSTING))
+
+    # Another worker's index picks the entry up; a half-written record is skipped
+    with open(path, "ab") as f:
+        f.write(b"\0" * 10)
+    assert second.find(signature(COPY))[0] == "a" * 64
+    assert len(second) == 1
+    assert NearDuplicateIndex(path).find(signature(COPY))[0] == "a" * 64
+
+
+def test_lookups_stay_fast_in_a_large_index():
+    index = NearDuplicateIndex()
+    filler = np.random.default_rng(1).integers(0, 2**32, (20_000, NUM_PERM), dtype=np.uint32)
+    index._insert([f"{i:064x}" for i in range(len(filler))], filler)
+    index.add("a" * 64, signature(POSTING))
+    query = signature(COPY)
+
+    started = time.perf_counter()
+    for _ in range(100):
+        assert index.find(query)[0] == "a" * 64
+    assert (time.perf_counter() - started) / 100 < 0.001
+
+
+def test_near_duplicate_posting_reuses_the_parsed_description(monkeypatch):
+    monkeypatch.setattr(job_heuristics, "ENABLED", False)
+    answer = '{"company_name": "Acme Robotics", "title": "Senior Python Engineer", "description": "Robots"}'
+    with patch("features.job_description.request_model", return_value=answer) as mock_request:
+        first = asyncio.run(job_description_from_posting(POSTING))
+        copy = asyncio.run(job_description_from_posting(COPY))
+        other = asyncio.run(job_description_from_posting(OTHER))
+
+    assert mock_request.call_count == 2  # POSTING and OTHER
+    assert (first._extracted_by, copy._extracted_by, other._extracted_by) == ("ai", "near_duplicate", "ai")
+    assert copy.model_dump() == first.model_dump()
+
+
+def test_disabled_detection(monkeypatch):
+    monkeypatch.setattr(job_heuristics, "ENABLED", False)
+    monkeypatch.setattr(posting_dedup, "ENABLED", False)
+    answer = '{"company_name": "Acme Robotics", "title": "Senior Python Engineer"}'
+    with patch("features.job_description.request_model", return_value=answer) as mock_request:
+        asyncio.run(job_description_from_posting(POSTING))
+        copy = asyncio.run(job_description_from_posting(COPY))
+
+    assert mock_request.call_count == 2
+    assert copy._extracted_by == "ai"
+
+
+def test_near_duplicate_for_another_office_is_parsed_again(monkeypatch):
+    monkeypatch.setattr(job_heuristics, "ENABLED", False)
+    office = POSTING.replace("Berlin", "Munich", 1) + "\n"
+    answers = [
+        '{"company_name": "Acme Robotics", "company_city": "Berlin", "title": "Senior Python Engineer"}',
+        '{"company_name": "Acme Robotics", "company_city": "Munich", "title": "Senior Python Engineer"}',
+    ]
+    with patch("features.job_description.request_model", side_effect=answers) as mock_request:
+        asyncio.run(job_description_from_posting(POSTING))
+        assert posting_dedup.find_duplicate(signature(office)) is not None
+        munich = asyncio.run(job_description_from_posting(office))
+
+    assert mock_request.call_count == 2
+    assert (munich._extracted_by, munich.company_city) == ("ai", "Munich")
+    assert posting_dedup.same_values(POSTING, COPY, ["Acme Robotics", "Berlin", "Senior Python Engineer"])
@@ -0,0 +1,187 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from database.db_interface import Experience, Profile
+from features import prewarm
+from main import app
+from models import JobDescriptionResponse
+
+MODEL_RESPONSE = "SCORE: 80\nSUGGESTIONS:\n- Mention mentoring\nIMPORTANT:\n- No mentoring | Describe it"
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(prewarm, "ENABLED", True)
+    prewarm.reset()
+    yield
+    prewarm.reset()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def job_description():
+    return JobDescriptionResponse(
+        company_name="Cloud Corp",
+        company_address="",
+        company_city="Berlin",
+        company_postal_code="",
+        recruiter_name="",
+        title="Python Engineer",
+        description="Python is required.",
+    )
+
+
+def make_rows():
+    profile = Profile(
+        id=1, first_name="John", last_name="Doe", email="john@example.com", updated_at=datetime(2024, 1, 1)
+    )
+    experiences = [
+        Experience(id=1, profile_id=1, job_title="Engineer", company="Tech Corp", start_date=date(2020, 1, 1))
+    ]
+    return profile, [], experiences
+
+
+@pytest.fixture
+def db_rows():
+    profile, _, experiences = make_rows()
+    with (
+        patch("main.db_manager.get_profile", return_value=profile),
+        patch("main.db_manager.get_educations", return_value=[]),
+        patch("main.db_manager.get_experiences", return_value=experiences),
+    ):
+        yield
+
+
+def wait_for_prewarm(count: int = 1) -> None:
+    deadline = time.monotonic() + 5
+    while prewarm.prewarm_stats()["completed"] + prewarm.prewarm_stats()["failed"] < count:
+        assert time.monotonic() < deadline, "pre-warm did not finish"
+        time.sleep(0.01)
+
+
+def test_follow_up_requests_are_served_from_prewarm(client, job_description, db_rows):
+    with (
+        patch("features.job_description_from_text", return_value=job_description),
+        patch("features.ai_api._post", return_value=MODEL_RESPONSE) as mock_post,
+    ):
+        response = client.post("/api/extract-job-description", params={"profile_id": 1}, json={"jobDescription": "..."})
+        assert response.status_code == 200
+        wait_for_prewarm()
+        assert mock_post.call_count == 2
+
+        body = job_description.model_dump()
+        review = client.post("/api/match-position", params={"profile_id": 1}, json=body)
+        gaps = client.post("/api/analyze-gaps", params={"profile_id": 1}, json=body)
+
+    assert review.json()["matchScore"] == 80
+    assert any(gap["gap_text"] == "No mentoring" for gap in gaps.json()["gaps"])
+    assert mock_post.call_count == 2
+    stats = client.get("/api/prewarm/stats").json()
+    assert stats["hits"] == 2 and stats["misses"] == 0 and stats["hit_rate"] == 1.0
+
+
+def test_follow_up_waits_for_a_run_that_has_not_started_its_request(job_description):
+    from features.review_user_application import review_from_user_and_job
+
+    def slow_rows():
+        time.sleep(0.2)  # the follow-up arrives while the run still loads the profile
+        return make_rows()
+
+    def slow_post(*args, **kwargs):
+        time.sleep(0.05)
+        return MODEL_RESPONSE
+
+    with patch("features.ai_api._post", side_effect=slow_post) as mock_post:
+        assert prewarm.prewarm_analyses(1, job_description, slow_rows)
+        with prewarm.follow_up(1, job_description):
+            review = review_from_user_and_job(*make_rows(), job_description)
+        wait_for_prewarm()
+
+    assert review.matchScore == 80
+    assert mock_post.call_count == 2  # the review once, the gap analysis once
+    assert prewarm.prewarm_stats()["hits"] == 1
+
+
+@pytest.mark.parametrize("path, feature", [("/api/match-position", "review"), ("/api/analyze-gaps", "gaps")])
+def test_other_requests_are_served_while_a_follow_up_waits(client, job_description, db_rows, path, feature):
+    upcoming = Future()
+    prewarm._upcoming[(1, prewarm.job_hash(job_description), feature)] = upcoming
+    with patch("features.ai_api._post", return_value=MODEL_RESPONSE), ThreadPoolExecutor(1) as executor:
+        follow_up = executor.submit(client.post, path, params={"profile_id": 1}, json=job_description.model_dump())
+        time.sleep(0.2)  # the follow-up now waits for the speculative run
+
+        started = time.monotonic()
+        assert client.get("/").status_code == 200
+        assert time.monotonic() - started < 1
+        assert not follow_up.done()
+
+        upcoming.set_result(None)
+        assert follow_up.result(timeout=5).status_code == 200
+
+
+def test_the_next_feature_is_not_prewarmed(client, job_description, db_rows):
+    with (
+        patch("features.job_description_from_text", return_value=job_description),
+        patch("features.ai_api._post", return_value=MODEL_RESPONSE) as mock_post,
+    ):
+        client.post(
+            "/api/extract-job-description",
+            params={"profile_id": 1, "next_feature": "gaps"},
+            json={"jobDescription": "..."},
+        )
+        gaps = client.post("/api/analyze-gaps", params={"profile_id": 1}, json=job_description.model_dump())
+        wait_for_prewarm()
+
+    assert gaps.status_code == 200
+    assert mock_post.call_count == 2  # the gap analysis of the request and the pre-warmed review
+    assert prewarm.prewarm_stats()["misses"] == 1
+
+
+def test_changed_job_misses_the_cache(client, job_description, db_rows):
+    with (
+        patch("features.job_description_from_text", return_value=job_description),
+        patch("features.ai_api._post", return_value=MODEL_RESPONSE) as mock_post,
+    ):
+        client.post("/api/extract-job-description", params={"profile_id": 1}, json={"jobDescription": "..."})
+        wait_for_prewarm()
+
+        changed = job_description.model_copy(update={"description": "Go is required."})
+        client.post("/api/match-position", params={"profile_id": 1}, json=changed.model_dump())
+
+    assert mock_post.call_count == 3
+    assert prewarm.prewarm_stats()["misses"] == 1
+
+
+def test_prewarm_is_capped_per_profile(monkeypatch, job_description):
+    monkeypatch.setattr(prewarm, "MAX_PER_PROFILE", 1)
+    other_job = job_description.model_copy(update={"title": "Go Engineer"})
+
+    assert prewarm.prewarm_analyses(1, job_description, lambda: None)
+    assert not prewarm.prewarm_analyses(1, other_job, lambda: None)
+    assert prewarm.prewarm_analyses(2, other_job, lambda: None)
+    wait_for_prewarm(2)
+
+    stats = prewarm.prewarm_stats()
+    assert stats["scheduled"] == 2 and stats["skipped"] == 1
+
+
+def test_extraction_without_prewarm(client, job_description, monkeypatch):
+    monkeypatch.setattr(prewarm, "ENABLED", False)
+    with (
+        patch("features.job_description_from_text", return_value=job_description),
+        patch("features.prewarm_analyses") as mock_prewarm,
+    ):
+        response = client.post("/api/extract-job-description", params={"profile_id": 1}, json={"jobDescription": "..."})
+
+    assert response.status_code == 200
+    mock_prewarm.assert_not_called()
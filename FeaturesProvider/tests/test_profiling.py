@@ -0,0 +1,107 @@
+import time
+from collections import deque
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from database.db_interface import DatabaseManager
+from features import profiling
+from features.ai_api import request_model
+from features.pii import anonymize_text
+from main import app as main_app
+
+
+def slow_answer(*args, **kwargs):
+    time.sleep(0.03)
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"choices": [{"message": {"content": "Hello"}}]}
+    return response
+
+
+@pytest.fixture(autouse=True)
+def profiles(monkeypatch):
+    monkeypatch.setattr(profiling, "_profiles", deque(maxlen=3))
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    monkeypatch.setattr(profiling, "SLOW_MS", 0.0)
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware)
+    db_manager = DatabaseManager(db_url=f"sqlite:///{tmp_path / 'profiling.db'}")
+    db_manager.create_tables()
+
+    @app.get("/work")
+    def work() -> dict:
+        session = db_manager.get_session()
+        try:
+            db_manager.get_profile(session, 1)
+        finally:
+            db_manager.close_session(session)
+        with patch("features.ai_api._session.post", side_effect=slow_answer):
+            greeting = request_model("Greet Jane", feature="greet")
+        return {"text": anonymize_text(f"{greeting}, write to jane@example.com")}
+
+    @app.get("/sleep/{ms}")
+    async def sleep(ms: int) -> dict:
+        with profiling.span("sleep"):
+            time.sleep(ms / 1000)
+        return {}
+
+    with TestClient(app) as c:
+        yield c
+
+
+def test_header_profiles_a_request(client):
+    response = client.get("/work", headers={"X-Profile": "1"})
+
+    assert response.json() == {"text": "Hello, write to [REDACTED_EMAIL]"}
+    profile = profiling.get_profile(int(response.headers["X-Profile-Id"]))
+    assert profile["trigger"] == "header" and profile["status"] == 200
+    assert {"db", "llm:greet", "anonymize"} <= set(profile["totals"])
+    assert profile["totals"]["llm:greet"]["ms"] >= 30
+    assert [span["name"] for span in profile["spans"]][-2:] == ["llm:greet", "anonymize"]
+    assert profile["samples"] > 0
+    assert any("slow_answer (test_profiling.py" in stack for stack in profile["stacks"])
+
+
+def test_slow_requests_are_kept(client, monkeypatch):
+    monkeypatch.setattr(profiling, "SLOW_MS", 30.0)
+
+    client.get("/sleep/1")
+    response = client.get("/sleep/40")
+
+    assert "X-Profile-Id" not in response.headers
+    (summary,) = profiling.profiles()
+    assert (summary["path"], summary["trigger"]) == ("/sleep/40", "slow")
+    assert summary["totals"]["sleep"]["count"] == 1
+    assert profiling.get_profile(summary["id"])["stacks"] == {}
+
+
+def test_ring_buffer_keeps_the_last_profiles(client):
+    ids = [client.get("/sleep/0", headers={"X-Profile": "1"}).headers["X-Profile-Id"] for _ in range(5)]
+
+    assert [summary["id"] for summary in profiling.profiles()] == [int(i) for i in reversed(ids[-3:])]
+
+
+def test_nothing_is_recorded_when_disabled(client, monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", False)
+
+    response = client.get("/sleep/0", headers={"X-Profile": "1"})
+
+    assert "X-Profile-Id" not in response.headers
+    assert profiling.profiles() == []
+    with TestClient(main_app) as main_client:
+        assert main_client.get("/api/debug/profiles").status_code == 404
+
+
+def test_debug_endpoints(client):
+    capture_id = client.get("/sleep/0", headers={"X-Profile": "1"}).headers["X-Profile-Id"]
+
+    with TestClient(main_app) as main_client:
+        assert main_client.get("/api/debug/profiles").json()[0]["id"] == int(capture_id)
+        assert main_client.get(f"/api/debug/profiles/{capture_id}").json()["path"] == "/sleep/0"
+        assert main_client.get("/api/debug/profiles/999999").status_code == 404
@@ -0,0 +1,135 @@
+from datetime import date, datetime
+
+import pytest
+
+from database.db_interface import Education, Experience, Profile
+from features import prompt_fragments
+from features.prompt_fragments import (
+    format_education,
+    format_experience,
+    format_profile_contacts,
+    format_profile_summary,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    prompt_fragments.clear_fragment_cache()
+    yield
+    prompt_fragments.clear_fragment_cache()
+
+
+@pytest.fixture
+def educations():
+    return [
+        Education(
+            id=1,
+            institution="University of Example",
+            degree="Computer Science",
+            start_date=date(2014, 9, 1),
+            end_date=date(2018, 6, 1),
+            additional_info="Honors",
+            updated_at=datetime(2024, 1, 1),
+        ),
+        Education(
+            id=2,
+            institution="Example Tech",
+            degree="MSc",
+            start_date=date(2018, 9, 1),
+            updated_at=datetime(2024, 1, 1),
+        ),
+    ]
+
+
+@pytest.fixture
+def experiences():
+    return [
+        Experience(
+            id=1,
+            job_title="Engineer",
+            company="Tech Corp",
+            start_date=date(2018, 1, 1),
+            description="Built things",
+            updated_at=datetime(2024, 1, 1),
+        )
+    ]
+
+
+def test_format_education(educations):
+    assert format_education(educations) == (
+        "- University of Example, Computer Science, 2014-09 to 2018-06, Honors\n"
+        "- Example Tech, MSc, 2018-09 to Present"
+    )
+    assert format_education([]) == "No formal education provided"
+
+
+def test_format_experience(experiences):
+    assert format_experience(experiences) == "- Tech Corp, Engineer, 2018-01-01 to Present\n  Built things"
+    assert format_experience([]) == "No work experience provided"
+
+
+def test_format_profile():
+    profile = Profile(id=1, first_name="John", last_name="Doe", email="john@example.com", city="Berlin")
+
+    assert format_profile_summary(profile) == "Name: John Doe\nAbout: Not provided"
+    contacts = format_profile_contacts(profile)
+    assert contacts.startswith("Full Name: John Doe\nEmail: john@example.com\nLocation: Berlin, , ")
+    assert contacts.endswith("About Me: Not provided")
+
+
+def test_fragments_are_cached_until_row_changes(experiences):
+    first = format_experience(experiences)
+    experiences[0].description = "Changed without bumping updated_at"
+    assert format_experience(experiences) == first
+
+    experiences[0].updated_at = datetime(2024, 2, 1)
+    assert "Changed without bumping updated_at" in format_experience(experiences)
+
+
+def test_unsaved_rows_are_not_cached(experiences):
+    experiences[0].id = None
+    format_experience(experiences)
+    experiences[0].description = "Edited"
+    assert "Edited" in format_experience(experiences)
+
+
+def test_all_features_share_the_prompt_prefix(educations, experiences):
+    from unittest.mock import patch
+
+    from features.cover_letter_generator import generate_ai_content
+    from features.gap_analyzer import analyze_gaps
+    from features.md_cv_generator import md_cv_from_user_and_job
+    from features.review_user_application import review_from_user_and_job
+    from models import JobDescriptionResponse
+
+    profile = Profile(
+        id=1, first_name="John", last_name="Doe", email="john@example.com", updated_at=datetime(2024, 1, 1)
+    )
+    job_description = JobDescriptionResponse(
+        company_name="Tech Corp",
+        company_address="",
+        company_city="Berlin",
+        company_postal_code="",
+        recruiter_name="Jane Smith",
+        title="Senior Developer",
+        description="Python is required.",
+    )
+
+    prefixes = []
+    for module, call in [
+        ("review_user_application", lambda: review_from_user_and_job(profile, educations, experiences, job_description)),
+        ("gap_analyzer", lambda: analyze_gaps(profile, educations, experiences, job_description)),
+        ("md_cv_generator", lambda: md_cv_from_user_and_job(profile, educations, experiences, job_description)),
+        (
+            "cover_letter_generator",
+            lambda: generate_ai_content(profile, job_description, "professional", "", experiences, educations),
+        ),
+    ]:
+        with patch(f"features.{module}.request_model", return_value=None) as mock_request:
+            call()
+        prefixes.append(mock_request.call_args.kwargs["shared_prefix"])
+
+    assert len(set(prefixes)) == 1
+    assert "Full Name: John Doe" in prefixes[0]
+    assert "Job Description: Python is required." in prefixes[0]
+    assert "Tech Corp, Engineer" in prefixes[0]
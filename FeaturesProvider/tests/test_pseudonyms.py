@@ -0,0 +1,105 @@
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from database.db_interface import Experience, Profile
+from features import ai_api, pseudonyms
+from features.cache import LRUCache
+from features.md_cv_generator import md_cv_from_user_and_job
+from features.pseudonyms import Pseudonyms, for_profile
+from models import JobDescriptionResponse
+
+JOB = JobDescriptionResponse(
+    company_name="Tech Corp",
+    company_address="",
+    company_city="Berlin",
+    company_postal_code="",
+    recruiter_name="Jane Smith",
+    title="Senior Developer",
+    description="Python is required.",
+)
+
+
+def make_profile(first_name: str, last_name: str, email: str, phone: str) -> Profile:
+    return Profile(
+        first_name=first_name,
+        last_name=last_name,
+        email=email,
+        phone=phone,
+        github_url=f"https://github.com/{first_name.lower()}",
+        about_me=f"I am {first_name}, reach me at {email}.",
+    )
+
+
+def model_response(content: str) -> MagicMock:
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"choices": [{"message": {"content": content}}]}
+    return response
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    ai_api.clear_response_cache()
+    yield
+    ai_api.clear_response_cache()
+
+
+def test_apply_and_restore_round_trip():
+    profile = make_profile("Will", "Doe", "will@doe.io", "+1 555 123 4567")
+    names = for_profile(profile)
+    text = "Will Doe (will@doe.io, +1 555 123 4567) is willing; Will signs, Doe approves. https://github.com/will"
+
+    masked = names.apply(text)
+
+    assert masked == (
+        "{{CANDIDATE_NAME}} ({{CANDIDATE_EMAIL}}, {{CANDIDATE_PHONE}}) is willing; "
+        "{{CANDIDATE_FIRST_NAME}} signs, {{CANDIDATE_LAST_NAME}} approves. {{CANDIDATE_GITHUB}}"
+    )
+    assert names.restore(masked) == text
+    assert names.restore("{{ CANDIDATE_NAME }} and {{UNKNOWN}}") == "Will Doe and {{UNKNOWN}}"
+
+
+def test_empty_values_are_ignored():
+    names = Pseudonyms({"CANDIDATE_PHONE": "", "CANDIDATE_OTHER_URL": None, "CANDIDATE_FIRST_NAME": "A"})
+
+    assert not names
+    assert names.apply("A call") == "A call"
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(pseudonyms, "ENABLED", False)
+
+    assert for_profile(make_profile("John", "Doe", "john@doe.io", "555 123 4567")) is None
+
+
+def test_prompts_of_different_candidates_are_identical():
+    experiences = [Experience(job_title="Engineer", company="Tech Corp", start_date=date(2020, 1, 1))]
+    sent = []
+    for profile in [
+        make_profile("John", "Doe", "john@doe.io", "555 123 4567"),
+        make_profile("Anna", "Berg", "anna@berg.io", "555 765 4321"),
+    ]:
+        with patch("features.ai_api._session.post", return_value=model_response("# {{CANDIDATE_NAME}}")) as mock_post:
+            cv = md_cv_from_user_and_job(profile, [], experiences, JOB)
+        sent.append(mock_post.call_args.kwargs["json"]["messages"])
+        assert cv.cv_text == f"# {profile.first_name} {profile.last_name}"
+
+    assert sent[0] == sent[1]
+    prefix = sent[0][0]["content"][0]["text"]
+    assert "Full Name: {{CANDIDATE_NAME}}" in prefix
+    assert "john" not in prefix.lower()
+    assert prefix.endswith(pseudonyms.INSTRUCTION)
+
+
+def test_response_cache_is_shared_between_candidates(monkeypatch):
+    monkeypatch.setattr(ai_api, "RESPONSE_CACHE_TTL", 60.0)
+    monkeypatch.setattr(ai_api, "_responses", LRUCache(ttl=60.0))
+    first = make_profile("John", "Doe", "john@doe.io", "555 123 4567")
+    second = make_profile("Anna", "Berg", "anna@berg.io", "555 765 4321")
+
+    with patch("features.ai_api._session.post", return_value=model_response("Hi {{CANDIDATE_FIRST_NAME}}")) as mock_post:
+        assert ai_api.request_model("Greet John", pseudonyms=for_profile(first)) == "Hi John"
+        assert ai_api.request_model("Greet Anna", pseudonyms=for_profile(second)) == "Hi Anna"
+
+    mock_post.assert_called_once()
@@ -0,0 +1,150 @@
+import asyncio
+import zlib
+from datetime import date
+
+import brotli
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from benchmarks import bench_responses
+from database.db_interface import DatabaseManager
+from features.responses import CompressionMiddleware, accepted_encodings
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    db_manager = DatabaseManager(db_url=f"sqlite:///{tmp_path / 'responses.db'}")
+    db_manager.create_tables()
+    session = db_manager.get_session()
+    profile = db_manager.add_profile(session, {"first_name": "Jane", "last_name": "Doe", "email": "jane@example.com"})
+    for i in range(50):
+        db_manager.add_experience(
+            session,
+            profile.id,
+            {
+                "job_title": f"Engineer {i}",
+                "company": "SomeCorp",
+                "start_date": date(2015, 1, 1),
+                "description": "Built and ran the billing services. " * 5,
+            },
+        )
+    db_manager.close_session(session)
+    monkeypatch.setattr("main.db_manager", db_manager)
+    from main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+def test_orm_rows_are_serialized_like_the_response_model(client):
+    response = client.get("/api/1/experiences", headers={"Accept-Encoding": "identity"})
+
+    assert response.headers["content-type"] == "application/json"
+    assert "content-encoding" not in response.headers
+    experiences = response.json()
+    assert len(experiences) == 50
+    assert experiences[0] == {
+        "id": 1,
+        "profile_id": 1,
+        "job_title": "Engineer 0",
+        "company": "SomeCorp",
+        "start_date": "2015-01-01",
+        "end_date": None,
+        "description": "Built and ran the billing services. " * 5,
+    }
+    assert client.get("/api/1/experiences").json() == experiences
+    assert client.get("/api/2/experiences").status_code == 404
+
+
+def test_created_rows_are_serialized_like_the_response_model(client):
+    response = client.post("/api/profile", json={"first_name": "Jane", "last_name": "Roe", "email": "jane@example.com"})
+
+    assert response.status_code == 201
+    profile = response.json()
+    assert {k: profile[k] for k in ("id", "first_name", "last_name", "email", "about_me")} == {
+        "id": 1,
+        "first_name": "Jane",
+        "last_name": "Roe",
+        "email": "jane@example.com",
+        "about_me": None,
+    }
+    education = {"institution": "NTNU", "degree": "MSc", "start_date": "2010-08-01"}
+    response = client.post("/api/profile/1/education", json=education)
+    assert response.status_code == 201
+    assert response.json() == {
+        "id": 1,
+        "institution": "NTNU",
+        "degree": "MSc",
+        "start_date": "2010-08-01",
+        "end_date": None,
+        "additional_info": None,
+    }
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_large_responses_are_compressed(client, encoding):
+    response = client.get("/api/1/experiences", headers={"Accept-Encoding": encoding})
+
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(response.content) / 5
+    assert len(response.json()) == 50
+    # Small bodies are sent as they are
+    assert "content-encoding" not in client.get("/", headers={"Accept-Encoding": encoding}).headers
+
+
+def test_refused_encodings_are_ignored():
+    assert accepted_encodings("gzip, deflate, br;q=0") == {"gzip", "deflate"}
+    assert accepted_encodings("br;q=0.5, gzip") == {"br", "gzip"}
+
+
+@pytest.mark.parametrize(
+    "encoding, decompressor",
+    [("gzip", lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)), ("br", brotli.Decompressor)],
+)
+def test_streamed_lines_are_flushed_one_by_one(encoding, decompressor):
+    app = FastAPI()
+
+    @app.get("/lines")
+    def lines():
+        return StreamingResponse((f'{{"line": {i}, "text": "{"x" * 600}"}}\n' for i in range(3)))
+
+    messages = []
+
+    async def run():
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.4"},  # no disconnect listener
+            "method": "GET",
+            "path": "/lines",
+            "raw_path": b"/lines",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"accept-encoding", encoding.encode())],
+        }
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        await CompressionMiddleware(app, minimum_size=500)(scope, receive, send)
+
+    asyncio.run(run())
+
+    assert (b"content-encoding", encoding.encode()) in messages[0]["headers"]
+    stream = decompressor()
+    chunks = [stream.process(m["body"]) if encoding == "br" else stream.decompress(m["body"]) for m in messages[1:]]
+    # Every chunk decompresses to its whole line right away
+    assert [chunk.decode().count("\n") for chunk in chunks[:3]] == [1, 1, 1]
+
+
+def test_benchmark_runs():
+    results = bench_responses.measure(20)
+
+    assert results["/experiences", "optimized"][1] == results["/experiences", "default"][1]
+    assert results["/experiences", "optimized"][0] < results["/experiences", "default"][0]
+    assert results["/cv", "br"][1] < results["/cv", "optimized"][1] / 5
@@ -0,0 +1,87 @@
+import multiprocessing
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from database.db_interface import JobPosting, Profile
+from features import job_ranking, shared_cache
+from features.cache import LRUCache
+from features.shared_cache import SharedCache, generation, invalidate, make_cache
+
+
+@pytest.fixture
+def path(tmp_path, monkeypatch):
+    path = str(tmp_path / "shared.sqlite3")
+    monkeypatch.setattr(shared_cache, "PATH", path)
+    yield path
+    job_ranking._indexes.clear()
+
+
+def in_other_worker(target, *args) -> None:
+    """Run `target` in a forked process, as another uvicorn worker would"""
+    process = multiprocessing.get_context("fork").Process(target=target, args=args)
+    process.start()
+    process.join(10)
+    assert process.exitcode == 0
+
+
+def test_entries_expire_and_are_evicted(path):
+    cache = SharedCache("test", maxsize=2, ttl=0.2, path=path)
+    cache.set(("profile", 1), {"text": "a"})
+    cache.set("b", "b")
+    cache.set("c", "c")
+
+    assert cache.get(("profile", 1)) == {"text": "a"}
+    cache.evict()
+    assert (cache.get(("profile", 1)), len(cache)) == (None, 2)
+    assert cache.pop("b") == "b" and cache.get("b", "gone") == "gone"
+    time.sleep(0.25)
+    assert cache.get("c") is None
+
+
+def test_workers_share_entries_and_generations(path):
+    cache = SharedCache("responses", path=path)
+    cache.set("answered", "by this worker")  # connection opened before the fork
+
+    def other_worker():
+        cache.set("answered", "by another worker")
+        assert cache.get("answered") == "by another worker"
+        SharedCache("responses", path=path).pop("gone")
+        invalidate("job-postings:1")
+
+    in_other_worker(other_worker)
+
+    assert cache.get("answered") == "by another worker"
+    assert generation("job-postings:1") == 1
+    assert generation("job-postings:2") == 0
+
+
+def test_without_database_everything_stays_in_process(monkeypatch):
+    monkeypatch.setattr(shared_cache, "PATH", "")
+
+    assert isinstance(make_cache("test"), LRUCache)
+    before = generation("scope")
+    assert invalidate("scope") == before + 1
+
+
+def test_ranking_index_follows_writes_of_other_workers(path):
+    profile = Profile(id=1, first_name="Jane", last_name="Doe", about_me="Python developer")
+    postings = [
+        JobPosting(id=i, profile_id=1, company_name="SomeCorp", title="Python developer", description="Python")
+        for i in (1, 2)
+    ]
+    load_postings = MagicMock(return_value=postings)
+
+    def rank():
+        return job_ranking.rank_job_postings(profile, [], [], len(postings), load_postings)
+
+    rank()
+    job_ranking.index_job_posting(postings[0])  # this worker's own write keeps its index
+    rank()
+    assert load_postings.call_count == 1
+
+    # Another worker replaces a posting: same count, but the index has to be rebuilt
+    in_other_worker(job_ranking.remove_job_posting, 1, 2)
+    rank()
+    assert load_postings.call_count == 2
@@ -0,0 +1,243 @@
+import json
+from datetime import date, datetime
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from database.db_interface import Education, Experience, Profile
+from features import skills_index
+from features.skills_index import (
+    extract_job_requirements,
+    extract_skills,
+    find_skill_gaps,
+    index_experience,
+    merge_gaps,
+    profile_skills_index,
+    remove_experience,
+)
+from main import app
+from models import JobDescriptionResponse
+
+
+@pytest.fixture(autouse=True)
+def clear_indexes():
+    skills_index._indexes.clear()
+    yield
+    skills_index._indexes.clear()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def profile():
+    return Profile(
+        id=1,
+        first_name="John",
+        last_name="Doe",
+        email="john.doe@example.com",
+        about_me="Backend developer who loves Python.",
+        updated_at=datetime(2024, 1, 1),
+    )
+
+
+@pytest.fixture
+def educations():
+    return [
+        Education(
+            id=1,
+            profile_id=1,
+            institution="University of Example",
+            degree="Computer Science",
+            start_date=date(2014, 9, 1),
+            additional_info="Thesis on machine learning",
+            updated_at=datetime(2024, 1, 1),
+        )
+    ]
+
+
+@pytest.fixture
+def experiences():
+    return [
+        Experience(
+            id=1,
+            profile_id=1,
+            job_title="Software Engineer",
+            company="Tech Corp",
+            start_date=date(2018, 1, 1),
+            description="Built services with Django and PostgreSQL, deployed with Docker.",
+            updated_at=datetime(2024, 1, 1),
+        )
+    ]
+
+
+@pytest.fixture
+def job_description():
+    return JobDescriptionResponse(
+        company_name="Cloud Corp",
+        company_address="",
+        company_city="Berlin",
+        company_postal_code="",
+        recruiter_name="",
+        title="Senior Python Engineer",
+        description=(
+            "Experience with Kubernetes and Docker is required. "
+            "You must know PostgreSQL. Terraform is a plus."
+        ),
+    )
+
+
+def test_extract_skills_handles_aliases_and_ngrams():
+    assert extract_skills("We run k8s on Google Cloud, code in C++ and Node.js.") == {
+        "Kubernetes",
+        "GCP",
+        "C++",
+        "Node.js",
+    }
+    assert extract_skills("") == set()
+
+
+def test_everyday_words_are_not_skills():
+    assert extract_skills("You must excel at communication and get some rest.") == set()
+    assert extract_skills("Excel at teamwork; spring into action; be swift") == set()
+    assert extract_skills("Reporting in Excel, APIs in REST") == {"Excel", "REST"}
+    assert extract_skills("Skills:\n- React, Vue\n- Rust\nSwift feedback matters") == {"React", "Vue", "Rust"}
+
+
+def test_ambiguous_skills_as_subject_of_a_requirement():
+    assert extract_skills("React is required.") == {"React"}
+    assert extract_skills("Swift is a must. Rust experience is a plus") == {"Swift", "Rust"}
+
+
+def test_profile_text_is_matched_leniently():
+    text = "React developer with 6 years of experience. I also work with rust and spring boot daily"
+
+    assert extract_skills(text) == {"Spring"}  # "spring boot" is unambiguous
+    assert extract_skills(text, strict=False) == {"React", "Rust", "Spring"}
+
+
+def test_extract_job_requirements(job_description):
+    assert extract_job_requirements(job_description) == {
+        "Python": True,
+        "Kubernetes": True,
+        "Docker": True,
+        "PostgreSQL": True,
+        "Terraform": False,
+    }
+
+
+def test_find_skill_gaps(profile, educations, experiences, job_description):
+    gaps = find_skill_gaps(profile, educations, experiences, job_description)
+
+    assert [gap["severity"] for gap in gaps] == ["Critical", "Nice-to-have"]
+    assert gaps[0]["gap_text"].startswith("Kubernetes")
+    assert gaps[1]["gap_text"].startswith("Terraform")
+
+
+def test_ambiguous_skills_in_the_profile_are_no_gaps(profile, educations, experiences, job_description):
+    profile.about_me = "React developer with 6 years of experience. I also work with rust and spring boot daily"
+    job_description.description = "Experience with React is required. Must know Rust and Spring."
+
+    assert extract_job_requirements(job_description) == {"Python": True, "React": True, "Rust": True, "Spring": True}
+    assert find_skill_gaps(profile, educations, experiences, job_description) == [
+        {
+            "gap_text": "Python is required for this position but is not mentioned anywhere in your profile",
+            "severity": "Critical",
+            "suggestion": "If you have worked with Python, describe where and how in the matching experience "
+            "or education entry; otherwise consider a project or course that covers it.",
+        }
+    ]
+
+
+def test_index_is_maintained_on_write(profile, educations, experiences):
+    index = profile_skills_index(profile, educations, experiences)
+    assert "Kubernetes" not in index
+
+    new_experience = Experience(
+        id=2, profile_id=1, description="Operated Kubernetes clusters", updated_at=datetime(2024, 2, 1)
+    )
+    index_experience(new_experience)
+    assert index.rows_for("Kubernetes") == {("experience", 2)}
+
+    remove_experience(1, 2)
+    assert "Kubernetes" not in index
+
+
+def test_index_resyncs_rows_changed_elsewhere(profile, educations, experiences):
+    profile_skills_index(profile, educations, experiences)
+
+    experiences[0].description = "Now also running Kubernetes"
+    experiences[0].updated_at = datetime(2024, 3, 1)
+    index = profile_skills_index(profile, educations, experiences[:1])
+    assert "Kubernetes" in index
+    assert "Django" not in index
+
+    index = profile_skills_index(profile, educations, [])
+    assert "Kubernetes" not in index
+
+
+def test_merge_gaps_drops_duplicated_skills():
+    skill_gaps = [{"gap_text": "Kubernetes is required", "severity": "Critical", "suggestion": "Add it"}]
+    model_gaps = [
+        {"gap_text": "No Kubernetes experience", "severity": "Critical", "suggestion": "..."},
+        {"gap_text": "No leadership examples", "severity": "Important", "suggestion": "..."},
+    ]
+
+    merged = merge_gaps(skill_gaps, model_gaps)
+    assert [gap["gap_text"] for gap in merged] == ["Kubernetes is required", "No leadership examples"]
+
+
+def test_analyze_gaps_endpoint_merges_model_gaps(client, profile, educations, experiences, job_description):
+    model_response = """
+    CRITICAL:
+    - No Kubernetes experience | Add cluster work
+    IMPORTANT:
+    - Missing mentoring examples | Describe mentoring of juniors
+    """
+    with (
+        patch("main.db_manager.get_profile", return_value=profile),
+        patch("main.db_manager.get_educations", return_value=educations),
+        patch("main.db_manager.get_experiences", return_value=experiences),
+        patch("features.gap_analyzer.request_model", return_value=model_response) as mock_request,
+    ):
+        response = client.post("/api/analyze-gaps", params={"profile_id": 1}, json=job_description.model_dump())
+
+    assert response.status_code == 200
+    gaps = response.json()["gaps"]
+    assert [gap["gap_text"].split()[0] for gap in gaps] == ["Kubernetes", "Terraform", "Missing"]
+    assert "Kubernetes, Terraform" in mock_request.call_args[0][0]
+
+
+def test_analyze_gaps_endpoint_without_model(client, profile, educations, experiences, job_description):
+    with (
+        patch("main.db_manager.get_profile", return_value=profile),
+        patch("main.db_manager.get_educations", return_value=educations),
+        patch("main.db_manager.get_experiences", return_value=experiences),
+        patch("features.gap_analyzer.request_model", return_value=None),
+    ):
+        response = client.post("/api/analyze-gaps", params={"profile_id": 1}, json=job_description.model_dump())
+
+    assert response.status_code == 200
+    assert [gap["severity"] for gap in response.json()["gaps"]] == ["Critical", "Nice-to-have"]
+
+
+def test_analyze_gaps_endpoint_stream(client, profile, educations, experiences, job_description):
+    with (
+        patch("main.db_manager.get_profile", return_value=profile),
+        patch("main.db_manager.get_educations", return_value=educations),
+        patch("main.db_manager.get_experiences", return_value=experiences),
+        patch("features.gap_analyzer.request_model", return_value="IMPORTANT:\n- Missing mentoring | Add it"),
+    ):
+        response = client.post(
+            "/api/analyze-gaps", params={"profile_id": 1, "stream": True}, json=job_description.model_dump()
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    first, final = [json.loads(line) for line in response.text.splitlines()]
+    assert first["final"] is False and len(first["gaps"]) == 2
+    assert final["final"] is True and len(final["gaps"]) == 3
@@ -0,0 +1,41 @@
+import pytest
+
+import features
+from benchmarks import bench_startup
+from database.db_interface import SCHEMA_VERSION, DatabaseManager
+from features import gap_analyzer
+
+
+def test_importing_main_leaves_the_features_unloaded():
+    # Which modules get imported is what matters; wall-clock time is left to the benchmark
+    _, _, modules = bench_startup.measure(1)
+
+    assert {name for name in modules if name.startswith("features.")} <= {
+        "features.log_config",
+        "features.metrics",
+        "features.profiling",
+        "features.responses",
+        "features.warmup",
+    }
+    assert not {"requests", "httpx", "numpy", "dotenv"} & set(modules)
+
+
+def test_features_load_on_first_use():
+    from features import analyze_gaps
+
+    assert analyze_gaps is gap_analyzer.analyze_gaps
+    assert features.job_heuristics.__name__ == "features.job_heuristics"
+    assert "analyze_gaps" in dir(features)
+    with pytest.raises(AttributeError):
+        features.no_such_feature
+
+
+def test_schema_is_created_once(tmp_path):
+    manager = DatabaseManager(db_url=f"sqlite:///{tmp_path / 'schema.db'}")
+
+    assert manager.schema_version() is None
+    assert manager.ensure_schema() is True
+    assert manager.schema_version() == SCHEMA_VERSION
+    assert manager.ensure_schema() is False
+    # A second worker (another manager) only checks the version
+    assert DatabaseManager(db_url=f"sqlite:///{tmp_path / 'schema.db'}").ensure_schema() is False
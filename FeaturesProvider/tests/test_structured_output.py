@@ -0,0 +1,153 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from features import structured_output
+from features.ai_api import request_model
+from features.gap_analyzer import analyze_gaps
+from features.job_description import job_description_from_text
+from features.review_user_application import review_from_user_and_job
+from features.structured_output import extract_json, parse_or_repair, parse_stats
+from models import JobDescriptionResponse
+from pydantic import BaseModel
+
+
+class Answer(BaseModel):
+    score: int
+    notes: list[str] = []
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    structured_output.reset_parse_stats()
+    yield
+    structured_output.reset_parse_stats()
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"score": 7}',
+        '```json\n{"score": 7}\n```',
+        'Here is the result: {"score": 7} Hope this helps {"score": 1}',
+        'Use {braces} sparingly. {"score": 7}',
+    ],
+)
+def test_extract_json_finds_the_first_complete_object(text):
+    assert extract_json(text) == {"score": 7}
+
+
+def test_extract_json_without_object():
+    with pytest.raises(ValueError):
+        extract_json("SCORE: 7")
+
+
+def test_valid_answer_needs_no_repair():
+    request = MagicMock()
+
+    assert parse_or_repair('{"score": 7, "notes": ["a"]}', Answer, request, feature="t") == Answer(score=7, notes=["a"])
+    request.assert_not_called()
+    assert parse_stats() == {"t": {"parsed": 1, "fallback_parser": 0, "repaired": 0, "failed": 0}}
+
+
+def test_invalid_answer_is_repaired_once():
+    request = MagicMock(return_value='{"score": 7}')
+
+    assert parse_or_repair('{"score": "high"}', Answer, request, feature="t") == Answer(score=7)
+    request.assert_called_once()
+    repair = request.call_args[0][0]
+    assert '{"score": "high"}' in repair and "score:" in repair
+    assert parse_stats()["t"]["repaired"] == 1
+
+
+def test_unrepairable_answer_gives_none():
+    request = MagicMock(return_value="Sorry, I cannot do that")
+
+    assert parse_or_repair("no JSON here", Answer, request, feature="t") is None
+    request.assert_called_once()
+    assert parse_stats()["t"]["failed"] == 1
+
+
+def test_fallback_parser_avoids_the_repair():
+    request = MagicMock()
+
+    answer = parse_or_repair("SCORE: 3", Answer, request, feature="t", fallback_parser=lambda text: Answer(score=3))
+
+    assert answer == Answer(score=3)
+    request.assert_not_called()
+    assert parse_stats()["t"]["fallback_parser"] == 1
+
+
+@pytest.mark.parametrize("model, structured", [("google/gemini-2.0-flash-exp:free", True), ("anthropic/claude", False)])
+def test_response_format_is_requested_when_supported(monkeypatch, model, structured):
+    monkeypatch.setattr("features.ai_api.MODEL_NAME", model)
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"choices": [{"message": {"content": "{}"}}]}
+
+    with patch("features.ai_api._session.post", return_value=response) as mock_post:
+        request_model("Task", feature="t", output_model=Answer)
+
+    sent = mock_post.call_args.kwargs["json"]
+    assert ("response_format" in sent) is structured
+    if structured:
+        assert sent["response_format"]["json_schema"]["schema"]["required"] == ["score"]
+
+
+def test_job_description_is_repaired(monkeypatch):
+    monkeypatch.setattr("features.job_heuristics.ENABLED", False)
+    answers = ['{"company_name": "Acme", "title": ', '{"company_name": "Acme", "title": "Engineer"}']
+    with patch("features.job_description.request_model", side_effect=answers) as mock_request:
+        job = job_description_from_text("Acme hires an engineer.")
+
+    assert mock_request.call_count == 2
+    assert (job.company_name, job.title, job._extracted_by) == ("Acme", "Engineer", "ai")
+
+
+def job() -> JobDescriptionResponse:
+    return JobDescriptionResponse(
+        company_name="SomeCorp",
+        company_address="",
+        company_city="",
+        company_postal_code="",
+        recruiter_name="",
+        title="Engineer",
+        description="Python and Kubernetes",
+    )
+
+
+@pytest.mark.parametrize(
+    "answer",
+    [
+        '```json\n{"matchScore": 140.4, "suggestions": ["Mention mentoring", " "]}\n```',
+        "SCORE: 100\nSUGGESTIONS:\n- Mention mentoring",
+    ],
+)
+def test_review_reads_json_and_legacy_answers(answer):
+    with patch("features.review_user_application.request_model", return_value=answer) as mock_request:
+        review = review_from_user_and_job(MagicMock(), [], [], job())
+
+    mock_request.assert_called_once()
+    assert (review.matchScore, review.suggestions) == (100, ["Mention mentoring"])
+
+
+def test_review_with_an_infinite_score_is_repaired():
+    answers = ['{"matchScore": Infinity, "suggestions": []}', '{"matchScore": 70, "suggestions": []}']
+    with patch("features.review_user_application.request_model", side_effect=answers) as mock_request:
+        review = review_from_user_and_job(MagicMock(), [], [], job())
+
+    assert mock_request.call_count == 2
+    assert review.matchScore == 70
+
+
+def test_gaps_read_json_with_loose_severities():
+    answer = (
+        '{"gaps": [{"gap_text": "No mentoring", "severity": "nice to have", "suggestion": "Describe it"},'
+        ' {"gap_text": "No on-call", "severity": "CRITICAL", "suggestion": "Add it"}]}'
+    )
+    with patch("features.gap_analyzer.request_model", return_value=answer):
+        gaps = analyze_gaps(MagicMock(), [], [], job(), skill_gaps=[])["gaps"]
+
+    assert {(gap["gap_text"], gap["severity"]) for gap in gaps} == {
+        ("No mentoring", "Nice-to-have"),
+        ("No on-call", "Critical"),
+    }
@@ -0,0 +1,104 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+
+from database.db_interface import DatabaseManager
+from features import ai_api, warmup
+from main import app
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    """Local stand-in for the AI provider, counting the connections it accepts"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    connections = 0
+    methods: list = []
+
+    def setup(self):
+        super().setup()
+        _StandIn.connections += 1
+
+    def do_HEAD(self):
+        _StandIn.methods.append("HEAD")
+        self.send_response(405)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        _StandIn.methods.append("POST")
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({"choices": [{"message": {"content": "Hello"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    _StandIn.connections, _StandIn.methods = 0, []
+    monkeypatch.setattr(ai_api, "API_URL", f"http://127.0.0.1:{httpd.server_address[1]}/api/v1/chat/completions")
+    monkeypatch.setattr(warmup, "WARM_LLM", True)
+    yield
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def ready_afterwards():
+    yield
+    warmup.skip()
+
+
+def test_every_step_is_warmed_up(tmp_path, stand_in):
+    manager = DatabaseManager(db_url=f"sqlite:///{tmp_path / 'warmup.db'}")
+
+    report = warmup.run(manager.engine)
+
+    assert report["status"] == "ready" and warmup.ready()
+    assert {name: step["status"] for name, step in report["steps"].items()} == {
+        "database": "ok",
+        "llm": "ok",
+        "features": "ok",
+        "pii": "ok",
+        "templates": "ok",
+        "gazetteer": "ok",
+    }
+    assert report["steps"]["database"]["detail"] == "4 connections"
+    assert manager.engine.pool.checkedin() == 4
+    assert report["steps"]["llm"]["detail"] == "HTTP 405"
+    # The first model call goes over the connection opened by the warm-up
+    assert ai_api.request_model("Greet Jane", feature="greet") == "Hello"
+    assert (_StandIn.methods, _StandIn.connections) == (["HEAD", "POST"], 1)
+
+
+def test_a_failing_step_does_not_block_readiness(monkeypatch):
+    monkeypatch.setattr(warmup, "WARM_LLM", True)
+    monkeypatch.setattr(ai_api, "API_URL", "http://127.0.0.1:9/api/v1/chat/completions")
+
+    report = warmup.run()
+
+    assert report["status"] == "ready"
+    assert report["steps"]["llm"]["status"] == "error"
+    assert report["steps"]["database"]["detail"] == "skipped"
+    assert report["steps"]["templates"]["status"] == "ok"
+
+
+def test_readiness_waits_for_the_warm_up(monkeypatch):
+    with TestClient(app) as client:
+        assert client.get("/ready").json() == {"status": "ready", "steps": {}}
+
+        monkeypatch.setitem(warmup._state, "status", "warming_up")
+        response = client.get("/ready")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming_up"